@@ -0,0 +1,550 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import sqlite3
+import asyncio
+import argparse
+import datetime
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from listing_parser import parse_listing, next_page_url, SeenStore, PAGE_SIZE
+
+try:
+    import aiohttp
+    aiohttp_available = True
+except ImportError:
+    aiohttp_available = False
+
+# Request errors worth retrying
+RETRY_ERRORS = (OSError, asyncio.TimeoutError) + ((aiohttp.ClientError,) if aiohttp_available else ())
+
+# Conditional, concurrent fetching of the NCA listing and article pages.
+#
+# Replaces the n8n HTTP Request nodes that re-download all-news and every
+# article on each run.  Each URL's ETag, Last-Modified and body hash are kept
+# in a SQLite store and sent back as If-None-Match / If-Modified-Since, so an
+# unchanged page costs a 304 instead of a download.  Requests run
+# concurrently with per-host concurrency and rate limits, over pooled
+# keep-alive connections when aiohttp is installed (otherwise urllib on a
+# thread pool).  Article bodies are written atomically into the extractor's
+# input folder under a stable name per URL, so a changed article replaces
+# its previous file (and --watch picks it up).  With a SeenStore (see
+# listing_parser.py) a crawl stops paging at the first listing page with
+# nothing new and downloads only new or changed articles.
+
+BASE_URL = "https://www.nationalcrimeagency.gov.uk"
+LISTING_URL = BASE_URL + "/news/all-news"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT,
+    bytes INTEGER,
+    path TEXT,
+    status INTEGER,
+    fetched_at TEXT,
+    changed_at TEXT
+);
+"""
+
+
+def now_iso():
+    return datetime.datetime.now().isoformat()
+
+
+def article_filename(url):
+    """Stable file name for a URL: its last path segment plus a short hash of the whole URL."""
+    segment = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1] or "index"
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '-', segment).strip("-")[:80] or "article"
+    return f"{slug}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.html"
+
+
+def write_atomic(path, body):
+    """Write bytes via a temporary file and rename, so readers never see a partial article."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # The temporary name does not end in .html, so watchers ignore it until the rename
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".fetch-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ValidatorStore:
+    """SQLite record of each URL's validators, body hash and where its body was written."""
+
+    def __init__(self, db_path):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def get(self, url):
+        row = self.conn.execute("SELECT * FROM validators WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, url, status, etag=None, last_modified=None, body_hash=None, size=None, path=None,
+               changed=False):
+        existing = self.get(url) or {}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO validators "
+            "(url, etag, last_modified, body_hash, bytes, path, status, fetched_at, changed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, etag or existing.get("etag"), last_modified or existing.get("last_modified"),
+             body_hash or existing.get("body_hash"), size if size is not None else existing.get("bytes"),
+             path or existing.get("path"), status, now_iso(),
+             now_iso() if changed else existing.get("changed_at"))
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class HostLimiter:
+    """At most `concurrency` requests in flight to one host, started at most `rate` per second."""
+
+    def __init__(self, concurrency, rate=None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self.lock:
+                now = time.monotonic()
+                wait = self.next_slot - now
+                self.next_slot = max(now, self.next_slot) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class AiohttpClient:
+    """Pooled keep-alive client; returns (status, lower-cased headers, body)."""
+
+    name = "aiohttp"
+
+    def __init__(self, concurrency, per_host, timeout):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            headers={"User-Agent": USER_AGENT}
+        )
+
+    async def get(self, url, headers):
+        async with self.session.get(url, headers=headers) as response:
+            body = await response.read()
+            return response.status, {k.lower(): v for k, v in response.headers.items()}, body
+
+    async def close(self):
+        await self.session.close()
+
+
+class UrllibClient:
+    """Fallback without aiohttp: blocking urllib requests on a thread pool."""
+
+    name = "urllib"
+
+    def __init__(self, concurrency, per_host, timeout):
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch")
+        self.timeout = timeout
+
+    def _get(self, url, headers):
+        request = urllib.request.Request(url, headers=dict(headers, **{"User-Agent": USER_AGENT}))
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, {k.lower(): v for k, v in response.headers.items()}, response.read()
+        except urllib.error.HTTPError as e:
+            # urllib raises for 304 and every error status
+            return e.code, {k.lower(): v for k, v in e.headers.items()}, e.read()
+
+    async def get(self, url, headers):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._get, url, headers)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class FetchStats:
+    """Counts of what each request turned into."""
+
+    def __init__(self):
+        self.requests = 0
+        self.outcomes = {"fetched": 0, "not_modified": 0, "unchanged": 0, "failed": 0}
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self.started = time.perf_counter()
+
+    def summary(self):
+        seconds = time.perf_counter() - self.started
+        return dict(self.outcomes, **{
+            "requests": self.requests,
+            "seconds": round(seconds, 3),
+            "requestsPerSec": round(self.requests / seconds, 2) if seconds else 0.0,
+            "bytesDownloaded": self.bytes_downloaded,
+            "bytesSaved": self.bytes_saved
+        })
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"Fetched {summary['fetched']}, not modified {summary['not_modified']}, "
+              f"unchanged {summary['unchanged']}, failed {summary['failed']} "
+              f"({summary['requests']} requests, {summary['requestsPerSec']:.1f}/s, "
+              f"{summary['bytesDownloaded'] / 1024:.0f} KB downloaded, {summary['bytesSaved'] / 1024:.0f} KB saved)")
+
+
+class Fetcher:
+    """Conditional concurrent GETs; use inside `async with`."""
+
+    def __init__(self, output_dir, store, listing_dir=None, concurrency=8, per_host=4, rate=None,
+                 timeout=30, retries=2):
+        self.output_dir = output_dir
+        self.listing_dir = listing_dir or os.path.join(output_dir, ".listings")
+        self.store = store
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.retries = retries
+        self.limiters = {}
+        self.stats = FetchStats()
+        self.client = None
+
+    async def __aenter__(self):
+        client_class = AiohttpClient if aiohttp_available else UrllibClient
+        self.client = client_class(self.concurrency, self.per_host, self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.close()
+
+    def limiter(self, url):
+        host = urlparse(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.per_host, self.rate)
+        return self.limiters[host]
+
+    async def request(self, url, headers):
+        """GET with retries on connection errors, 429 and 5xx (honouring Retry-After)."""
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.limiter(url):
+                    self.stats.requests += 1
+                    status, response_headers, body = await self.client.get(url, headers)
+            except RETRY_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                print(f"  Retrying {url}: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if (status == 429 or status >= 500) and attempt < self.retries:
+                retry_after = response_headers.get("retry-after", "")
+                await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+                continue
+            return status, response_headers, body
+
+    async def fetch(self, url, path, keep_body=False):
+        """Fetch url into path unless it is unchanged; returns an outcome dict.
+
+        An unchanged body is not written again, even when its file has since
+        been processed and removed; the outcome's path is None then.  With
+        keep_body (listing pages) the body is always left at path, fetched
+        without validators when a 304 finds the file gone.
+        """
+        known = self.store.get(url) or {}
+        headers = {}
+        # Sent whenever an earlier body was downloaded, whether or not its file is still there
+        if known.get("body_hash"):
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+        while True:
+            try:
+                status, response_headers, body = await self.request(url, headers)
+            except Exception as e:
+                print(f"  Error fetching {url}: {str(e)}")
+                self.stats.outcomes["failed"] += 1
+                return {"url": url, "outcome": "failed", "error": str(e)}
+            if status != 304 or not keep_body or not headers or os.path.exists(path):
+                break
+            headers = {}
+
+        if status == 304:
+            self.stats.outcomes["not_modified"] += 1
+            self.stats.bytes_saved += known.get("bytes") or 0
+            self.store.record(url, status)
+            return {"url": url, "outcome": "not_modified", "path": path if os.path.exists(path) else None}
+        if status != 200:
+            print(f"  Error fetching {url}: HTTP {status}")
+            self.stats.outcomes["failed"] += 1
+            return {"url": url, "outcome": "failed", "error": f"HTTP {status}"}
+
+        self.stats.bytes_downloaded += len(body)
+        body_hash = hashlib.sha256(body).hexdigest()
+        etag, last_modified = response_headers.get("etag"), response_headers.get("last-modified")
+        # Servers without validators still send the same bytes; don't rewrite the file then
+        if known.get("body_hash") == body_hash and (os.path.exists(path) or not keep_body):
+            self.stats.outcomes["unchanged"] += 1
+            self.store.record(url, status, etag, last_modified, body_hash, len(body), path)
+            return {"url": url, "outcome": "unchanged", "path": path if os.path.exists(path) else None}
+        write_atomic(path, body)
+        self.stats.outcomes["fetched"] += 1
+        self.store.record(url, status, etag, last_modified, body_hash, len(body), path, changed=True)
+        return {"url": url, "outcome": "fetched", "path": path}
+
+    async def fetch_articles(self, urls):
+        """Fetch article pages concurrently into the output folder."""
+        tasks = [self.fetch(url, os.path.join(self.output_dir, article_filename(url))) for url in urls]
+        return await asyncio.gather(*tasks)
+
+    async def fetch_listing(self, url):
+        """Fetch a listing page (kept outside the output folder); returns (outcome, articles, next page URL)."""
+        outcome = await self.fetch(url, os.path.join(self.listing_dir, article_filename(url)), keep_body=True)
+        if outcome["outcome"] == "failed" or outcome["path"] is None:
+            return outcome, [], None
+        with open(outcome["path"], 'rb') as f:
+            html = f.read().decode('utf-8', errors='replace')
+        return outcome, parse_listing(html, url), next_page_url(html, url)
+
+    async def crawl(self, listing_url=LISTING_URL, seen=None, max_pages=50):
+        """Fetch listing pages, then the articles on them.
+
+        Without a SeenStore every page (up to max_pages) and every listed
+        article is requested.  With one, paging stops at the first page with
+        nothing new or changed, only those articles are requested, and they
+        are marked seen once downloaded.
+        """
+        articles = []
+        listed = set()
+        url = listing_url
+        pages = 0
+        while url and pages < max_pages:
+            outcome, page_articles, url = await self.fetch_listing(url)
+            pages += 1
+            # Stop when a page only repeats articles (e.g. a ?start= past the end)
+            page_articles = [article for article in page_articles if article["url"] not in listed]
+            listed.update(article["url"] for article in page_articles)
+            if seen is not None:
+                page_articles = seen.diff(page_articles)
+            articles.extend(page_articles)
+            if not page_articles:
+                break
+        print(f"Listing: {pages} pages, {len(listed)} articles listed, {len(articles)} to fetch"
+              + (f" ({sum(a['listingStatus'] == 'new' for a in articles)} new)" if seen is not None else ""))
+
+        outcomes = await self.fetch_articles([article["url"] for article in articles])
+        if seen is not None:
+            seen.mark_seen([article for article, outcome in zip(articles, outcomes) if outcome["outcome"] != "failed"])
+        return outcomes
+
+
+def run_crawl(listing_url, output_dir, state_db, seen_db=None, max_pages=50, **options):
+    """Synchronous entry point: crawl once and return (outcomes, stats summary)."""
+    store = ValidatorStore(state_db)
+    seen = SeenStore(seen_db) if seen_db else None
+
+    async def main():
+        async with Fetcher(output_dir, store, **options) as fetcher:
+            outcomes = await fetcher.crawl(listing_url, seen, max_pages)
+            return outcomes, fetcher.stats
+
+    try:
+        outcomes, stats = asyncio.run(main())
+    finally:
+        store.close()
+        if seen is not None:
+            seen.close()
+    stats.print_summary()
+    return outcomes, stats.summary()
+
+
+# Local stand-in for the NCA site, for tests and the benchmark
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a folder of article HTML as /news/<name> plus a paged /news/all-news listing.
+
+    The listing is newest first (by file mtime), PAGE_SIZE articles per
+    ?start=N page, with a pagination-next link while more remain.
+
+    Responses carry an ETag and Last-Modified and honour conditional
+    requests; latency simulates the network round trip.
+    """
+
+    corpus_dir = None
+    latency = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, body, modified):
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        last_modified = formatdate(modified, usegmt=True)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            StandInHandler.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        mtimes = {name[:-5]: os.path.getmtime(os.path.join(self.corpus_dir, name))
+                  for name in os.listdir(self.corpus_dir) if name.endswith(".html")}
+        names = sorted(mtimes, key=lambda name: (mtimes[name], name), reverse=True)
+        url = urlparse(self.path)
+        path = url.path
+        if path == "/news/all-news":
+            start = int(parse_qs(url.query).get("start", ["0"])[0])
+            page = names[start:start + PAGE_SIZE]
+            items = "".join(
+                f'<div class="items-row"><div class="item column-1"><div class="page-header">'
+                f'<h3><a href="/news/{name}">{name}</a></h3></div></div></div>' for name in page)
+            if start + PAGE_SIZE < len(names):
+                items += f'<ul><li class="pagination-next"><a href="/news/all-news?start={start + PAGE_SIZE}">Next</a></li></ul>'
+            body = f"<html><body>{items}</body></html>".encode("utf-8")
+            self.respond(body, max([mtimes[name] for name in page] or [0]))
+        elif path.startswith("/news/") and path[len("/news/"):] in mtimes:
+            file_path = os.path.join(self.corpus_dir, path[len("/news/"):] + ".html")
+            with open(file_path, 'rb') as f:
+                self.respond(f.read(), os.path.getmtime(file_path))
+        else:
+            self.send_error(404)
+
+
+def start_stand_in(corpus_dir, latency_ms=0, port=0):
+    """Start the stand-in site on a background thread; returns (server, listing URL)."""
+    handler = type("CorpusHandler", (StandInHandler,), {"corpus_dir": corpus_dir, "latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/news/all-news"
+
+
+def run_benchmark(corpus_dir, latency_ms=50, new_articles=3, **options):
+    """Crawl a stand-in site cold, then conditionally, then incrementally after new articles appear."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        site_dir = os.path.join(work_dir, "site")
+        shutil.copytree(corpus_dir, site_dir)
+        server, listing_url = start_stand_in(site_dir, latency_ms)
+        output_dir = os.path.join(work_dir, "articles")
+        state_db = os.path.join(work_dir, "fetch.db")
+        seen_db = os.path.join(work_dir, "seen.db")
+        client = "aiohttp" if aiohttp_available else "urllib"
+        runs = {}
+        try:
+            print(f"Cold crawl ({client} client):")
+            runs["cold"] = run_crawl(listing_url, output_dir, state_db, seen_db, **options)[1]
+            print("Conditional crawl of everything listed:")
+            runs["conditional"] = run_crawl(listing_url, output_dir, state_db, **options)[1]
+
+            # Publish a few articles (copies of existing ones under new names, newest first)
+            names = sorted(name for name in os.listdir(site_dir) if name.endswith(".html"))
+            for index, name in enumerate(names[:new_articles]):
+                target = os.path.join(site_dir, f"new-{index}-{name}")
+                shutil.copyfile(os.path.join(site_dir, name), target)
+                os.utime(target, (time.time() + 60 + index, time.time() + 60 + index))
+            print(f"Incremental crawl after {new_articles} new articles:")
+            runs["incremental"] = run_crawl(listing_url, output_dir, state_db, seen_db, **options)[1]
+        finally:
+            server.shutdown()
+    conditional, incremental = runs["conditional"], runs["incremental"]
+    return dict(runs, **{
+        "corpus": os.path.abspath(corpus_dir),
+        "client": client,
+        "latencyMs": latency_ms,
+        "bytesSavedFraction": round(conditional["bytesSaved"] / (conditional["bytesSaved"] + conditional["bytesDownloaded"]), 4)
+        if conditional["bytesSaved"] + conditional["bytesDownloaded"] else 0.0,
+        "incrementalRequestFraction": round(incremental["requests"] / conditional["requests"], 4)
+        if conditional["requests"] else 0.0
+    })
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch NCA listing and article pages with conditional requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight overall")
+    parser.add_argument("--per-host", type=int, default=4, help="Requests in flight per host")
+    parser.add_argument("--rate", type=float, help="Requests started per second per host")
+    parser.add_argument("--timeout", type=float, default=30)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="Fetch the listing and its articles")
+    crawl_parser.add_argument("output_dir", help="Extractor input folder, e.g. /home/n8n/gpu_input_articles")
+    crawl_parser.add_argument("--state-db", required=True, help="Validator store (SQLite)")
+    crawl_parser.add_argument("--listing-url", default=LISTING_URL)
+    crawl_parser.add_argument("--seen-db", help="Seen-article store: fetch only new or changed articles")
+    crawl_parser.add_argument("--max-pages", type=int, default=50, help="Listing pages followed at most")
+
+    fetch_parser = subparsers.add_parser("fetch", help="Fetch the given article URLs")
+    fetch_parser.add_argument("output_dir")
+    fetch_parser.add_argument("urls", nargs="+")
+    fetch_parser.add_argument("--state-db", required=True)
+
+    bench_parser = subparsers.add_parser("benchmark", help="Cold, conditional and incremental crawls of a local stand-in site")
+    bench_parser.add_argument("corpus_dir", help="Folder of article HTML served by the stand-in")
+    bench_parser.add_argument("--latency-ms", type=float, default=50, help="Simulated per-request latency")
+    bench_parser.add_argument("--new-articles", type=int, default=3, help="Articles published before the last crawl")
+    bench_parser.add_argument("--output", help="Write the JSON report here")
+    options = parser.parse_args()
+
+    fetch_options = {"concurrency": options.concurrency, "per_host": options.per_host, "rate": options.rate,
+                     "timeout": options.timeout}
+    if options.command == "crawl":
+        run_crawl(options.listing_url, options.output_dir, options.state_db, options.seen_db, options.max_pages,
+                  **fetch_options)
+    elif options.command == "fetch":
+        store = ValidatorStore(options.state_db)
+
+        async def fetch_urls():
+            async with Fetcher(options.output_dir, store, **fetch_options) as fetcher:
+                outcomes = await fetcher.fetch_articles(options.urls)
+                fetcher.stats.print_summary()
+                return outcomes
+
+        for outcome in asyncio.run(fetch_urls()):
+            print(json.dumps(outcome))
+        store.close()
+    else:
+        report = run_benchmark(options.corpus_dir, options.latency_ms, options.new_articles, **fetch_options)
+        print(json.dumps(report, indent=2))
+        if options.output:
+            with open(options.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {options.output}")
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+import calendar
+import sqlite3
+import argparse
+import datetime
+
+from result_writers import article_id, read_jsonl
+
+# Full-text and entity index over processed articles.
+#
+# Article text lives in an SQLite FTS5 table; people, locations,
+# organisations, charges, drugs and categories live in a normalised entities
+# table.  ArticleIndex has the same write/close interface as the result
+# writers, so it can be passed to process_folder as a sink and updated as
+# each article finishes.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    article_id TEXT NOT NULL UNIQUE,
+    source TEXT,
+    title TEXT,
+    url TEXT,
+    published TEXT,
+    processed_at TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, content, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS entities (
+    article_id TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    value_norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entities_lookup ON entities (entity_type, value_norm);
+CREATE INDEX IF NOT EXISTS entities_article ON entities (article_id);
+CREATE INDEX IF NOT EXISTS articles_published ON articles (published);
+"""
+
+ENTITY_TYPES = ["person", "location", "organization", "charge", "drug", "category"]
+
+DRUG_TERMS = [
+    'cocaine', 'heroin', 'cannabis', 'mdma', 'ketamine', 'amphetamine', 'methamphetamine',
+    'crack cocaine', 'ecstasy', 'fentanyl', 'nitazenes', 'opium', 'spice'
+]
+
+MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+
+DATE_FORMATS = [
+    (re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(' + MONTHS + r')\s+(\d{4})\b', re.IGNORECASE), ("day", "month", "year")),
+    (re.compile(r'\b(' + MONTHS + r')\s+(\d{1,2})(?:st|nd|rd|th)?,\s+(\d{4})\b', re.IGNORECASE), ("month", "day", "year")),
+    (re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b'), ("year", "month_num", "day"))
+]
+
+
+def parse_date(text):
+    """Return an ISO date for the first recognisable date in text, or None."""
+    if not text:
+        return None
+    for pattern, fields in DATE_FORMATS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        parts = dict(zip(fields, match.groups()))
+        try:
+            if "month_num" in parts:
+                month = int(parts["month_num"])
+            else:
+                month = MONTHS.lower().split("|").index(parts["month"].lower()) + 1
+            return datetime.date(int(parts["year"]), month, int(parts["day"])).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def published_date(result):
+    """Best guess at an article's publication date.
+
+    Uses the explicit date when the result has one, otherwise the latest
+    timeline date not after processing time, otherwise the processing date.
+    """
+    explicit = parse_date(result.get("date"))
+    if explicit:
+        return explicit
+    processed = (result.get("processedAt") or "")[:10] or None
+    candidates = [parse_date(entry) for entry in result.get("timeline") or []]
+    candidates = [d for d in candidates if d and (processed is None or d <= processed)]
+    if candidates:
+        return max(candidates)
+    return processed
+
+
+def result_entities(result, content):
+    """Yield (entity_type, value) pairs from a process_article result."""
+    for perpetrator in result.get("perpetrators") or []:
+        name = perpetrator.get("name") if isinstance(perpetrator, dict) else perpetrator
+        if name:
+            yield "person", name
+    # bert_article_analyzer results keep entities under a nested dict
+    nested = result.get("entities") or {}
+    for name in nested.get("people", []):
+        yield "person", name
+    for location in (result.get("locations") or []) + nested.get("locations", []):
+        yield "location", location
+    for organization in (result.get("organizations") or []) + nested.get("organizations", []):
+        yield "organization", organization
+    for charge in result.get("charges") or []:
+        yield "charge", charge
+    for category in result.get("categories") or []:
+        yield "category", category
+    for drug in result.get("drugQuantities") or []:
+        if drug.get("drug"):
+            yield "drug", drug["drug"]
+    lowered = content.lower()
+    for term in DRUG_TERMS:
+        if re.search(r'\b' + re.escape(term) + r'\b', lowered):
+            yield "drug", term
+
+
+class ArticleIndex:
+    """Incrementally updated FTS5 + entity index over process_article results."""
+
+    def __init__(self, db_path, commit_every=50):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.commit_every = max(1, commit_every)
+        self.pending = 0
+        self.written = 0
+
+    def write(self, result):
+        """Add or replace one article in the index."""
+        if result.get("error") or not result.get("content"):
+            return
+        aid = article_id(result)
+        content = result["content"]
+        existing = self.conn.execute("SELECT id FROM articles WHERE article_id = ?", (aid,)).fetchone()
+        if existing:
+            self.conn.execute("DELETE FROM articles_fts WHERE rowid = ?", (existing["id"],))
+            self.conn.execute("DELETE FROM entities WHERE article_id = ?", (aid,))
+            self.conn.execute("DELETE FROM articles WHERE id = ?", (existing["id"],))
+
+        cursor = self.conn.execute(
+            "INSERT INTO articles (article_id, source, title, url, published, processed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (aid, result.get("source"), result.get("title"), result.get("url"),
+             published_date(result), result.get("processedAt"))
+        )
+        # The FTS row shares the article's rowid so replacement is a keyed delete
+        self.conn.execute(
+            "INSERT INTO articles_fts (rowid, title, content) VALUES (?, ?, ?)",
+            (cursor.lastrowid, result.get("title") or "", content)
+        )
+        seen = set()
+        for entity_type, value in result_entities(result, content):
+            value = value.strip()
+            key = (entity_type, value.lower())
+            if value and key not in seen:
+                seen.add(key)
+                self.conn.execute(
+                    "INSERT INTO entities (article_id, entity_type, value, value_norm) VALUES (?, ?, ?, ?)",
+                    (aid, entity_type, value, value.lower())
+                )
+
+        self.written += 1
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.conn.commit()
+            self.pending = 0
+
+    def flush(self):
+        """Commit pending articles so other connections can query them."""
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def query(self, text=None, entities=None, since=None, until=None, limit=50):
+        """Return articles matching full-text terms, entity filters and a date range.
+
+        entities is a list of (entity_type, value) pairs that must all be
+        present; values match case-insensitively, and as a substring for
+        charges.
+        """
+        clauses = []
+        params = []
+        select = "SELECT a.article_id, a.source, a.title, a.url, a.published"
+        source = "FROM articles a"
+        order = "a.published DESC"
+
+        if text:
+            select += ", snippet(articles_fts, 1, '[', ']', '...', 12) AS snippet"
+            source += " JOIN articles_fts ON articles_fts.rowid = a.id"
+            clauses.append("articles_fts MATCH ?")
+            params.append(text)
+            order = "bm25(articles_fts), a.published DESC"
+
+        for entity_type, value in entities or []:
+            if entity_type == "charge":
+                clauses.append("EXISTS (SELECT 1 FROM entities e WHERE e.article_id = a.article_id "
+                               "AND e.entity_type = ? AND e.value_norm LIKE ?)")
+                params.extend([entity_type, f"%{value.lower()}%"])
+            else:
+                clauses.append("EXISTS (SELECT 1 FROM entities e WHERE e.article_id = a.article_id "
+                               "AND e.entity_type = ? AND e.value_norm = ?)")
+                params.extend([entity_type, value.lower()])
+
+        if since:
+            clauses.append("a.published >= ?")
+            params.append(since)
+        if until:
+            clauses.append("a.published <= ?")
+            params.append(until)
+
+        sql = f"{select} {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def stats(self):
+        counts = {
+            row["entity_type"]: row["n"]
+            for row in self.conn.execute("SELECT entity_type, COUNT(*) AS n FROM entities GROUP BY entity_type")
+        }
+        articles = self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        return {"articles": articles, "entities": counts}
+
+
+def load_results(path):
+    """Yield results from a JSON array, single JSON object or JSONL file."""
+    if path.endswith(".jsonl"):
+        yield from read_jsonl(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [data]
+    yield from data
+
+
+def normalise_since(value):
+    """Accept YYYY, YYYY-MM or YYYY-MM-DD for date filters."""
+    if value and re.fullmatch(r'\d{4}', value):
+        return f"{value}-01-01"
+    if value and re.fullmatch(r'\d{4}-\d{2}', value):
+        return f"{value}-01"
+    return value
+
+
+def normalise_until(value):
+    """Accept YYYY, YYYY-MM or YYYY-MM-DD for the end of a range, taken to the end of that period."""
+    if value and re.fullmatch(r'\d{4}', value):
+        return f"{value}-12-31"
+    if value and re.fullmatch(r'\d{4}-\d{2}', value):
+        year, month = int(value[:4]), int(value[5:])
+        if 1 <= month <= 12:
+            return f"{value}-{calendar.monthrange(year, month)[1]:02d}"
+    return value
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text and entity index over processed NCA articles")
+    parser.add_argument("index", help="Path to the SQLite index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Add results files (JSON or JSONL) to the index")
+    ingest.add_argument("files", nargs="+")
+
+    query = commands.add_parser("query", help="Search the index")
+    query.add_argument("text", nargs="?", help="FTS5 query over title and content, e.g. 'cocaine AND Liverpool'")
+    for entity_type in ENTITY_TYPES:
+        query.add_argument(f"--{entity_type}", action="append", default=[],
+                           help=f"Require a {entity_type} entity (repeatable)")
+    query.add_argument("--since", help="Published on or after (YYYY, YYYY-MM or YYYY-MM-DD)")
+    query.add_argument("--until", help="Published on or before, to the end of a year or month "
+                                       "(YYYY, YYYY-MM or YYYY-MM-DD)")
+    query.add_argument("--limit", type=int, default=50)
+
+    commands.add_parser("stats", help="Show index size")
+
+    args = parser.parse_args()
+    index = ArticleIndex(args.index)
+
+    if args.command == "ingest":
+        for path in args.files:
+            before = index.written
+            for result in load_results(path):
+                index.write(result)
+            print(f"Indexed {index.written - before} articles from {path}")
+    elif args.command == "query":
+        filters = [(entity_type, value) for entity_type in ENTITY_TYPES for value in getattr(args, entity_type)]
+        started = time.perf_counter()
+        matches = index.query(args.text, filters, normalise_since(args.since), normalise_until(args.until),
+                              args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(json.dumps({"count": len(matches), "tookMs": round(elapsed_ms, 2), "articles": matches},
+                         indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(index.stats(), indent=2))
+
+    index.close()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import signal
+import multiprocessing
+from collections import deque, Counter
+from multiprocessing.connection import wait
+
+from stage_runner import StageRunner
+from stage_metrics import StageMetrics
+
+# Supervised worker processes for nlp_extractor.py --workers.
+#
+# process_folder catches errors but has no time limit, so one page that sends
+# the content or perpetrator patterns into heavy backtracking stalls the
+# whole run.  Here articles run in worker processes forked from the parent
+# after the models are loaded.  Each worker reports the stage it starts and
+# the output of every stage it finishes over its own pipe.  A worker whose
+# article runs past the article deadline, or whose current stage runs past
+# the stage deadline, is killed and replaced; the outputs of the stages it
+# finished are handed back with the ArticleStopped outcome, so the caller
+# can keep a partial result.  A worker that dies on its own is treated the
+# same way.  The other workers keep going throughout.
+
+ARTICLE_TIMEOUT = 300.0
+STAGE_TIMEOUT = 120.0
+# Timed-out articles are retried once, after the rest, with deadlines this many times longer
+RETRY_TIMEOUT_FACTOR = 2.0
+
+POLL_INTERVAL = 0.1
+
+
+class ArticleStopped(Exception):
+    """An article whose worker was stopped at a deadline or died."""
+
+    def __init__(self, message, stage, elapsed, outputs):
+        super().__init__(message)
+        self.stage = stage
+        self.elapsed = elapsed
+        # Outputs of the stages that finished, by stage name
+        self.outputs = outputs
+
+
+class ForwardedMetrics(StageMetrics):
+    """StageMetrics that sends its records to the supervisor instead of keeping them."""
+
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def record(self, *args, **kwargs):
+        self.conn.send(("record", args, kwargs))
+
+
+class ReportingRunner(StageRunner):
+    """StageRunner that tells the supervisor which stage it is in and what each stage produced."""
+
+    def __init__(self, conn, store=None):
+        super().__init__(store=store, metrics=ForwardedMetrics(conn))
+        self.conn = conn
+
+    def run(self, name, version, func, *args, key=None):
+        self.conn.send(("stage", name))
+        output = super().run(name, version, func, *args, key=key)
+        self.conn.send(("output", name, output))
+        return output
+
+
+def worker_main(conn, process, store, initializer, counters):
+    # Ctrl-C and SIGTERM are the supervisor's to handle
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if initializer is not None:
+        initializer()
+    runner = ReportingRunner(conn, store)
+    sent = counters() if counters is not None else {}
+    while True:
+        try:
+            file_path = conn.recv()
+        except EOFError:
+            return
+        if file_path is None:
+            return
+        name = os.path.basename(file_path)
+        runner.begin_article(name)
+        try:
+            with runner.metrics.timer(name, "article") as timer:
+                result = process(file_path, runner)
+                timer.output = [result]
+            message = ("result", result)
+        except Exception as e:
+            message = ("error", str(e))
+        if counters is not None:
+            current = counters()
+            conn.send(("counters", {key: value - sent.get(key, 0) for key, value in current.items()}))
+            sent = current
+        conn.send(message)
+
+
+class Worker:
+    """One worker process and the article it is on."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.file_path = None
+
+    def assign(self, file_path):
+        self.conn.send(file_path)
+        self.file_path = file_path
+        self.started = self.stage_started = time.monotonic()
+        self.stage = None
+        self.outputs = {}
+
+
+class SupervisedWorkers:
+    """Runs process(file_path, runner) for articles in worker processes, with article and stage deadlines.
+
+    runner is the parent's StageRunner: its store is shared with the workers,
+    and its metrics and reuse counts take the stage records they send back.
+    initializer runs once in every new worker (e.g. to reopen database
+    connections).  counters, when given, returns numeric totals kept by
+    objects in the worker (cache hits and the like); the deltas are summed
+    into self.counters.
+    """
+
+    def __init__(self, process, workers=2, article_timeout=ARTICLE_TIMEOUT, stage_timeout=STAGE_TIMEOUT,
+                 runner=None, initializer=None, counters=None):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Supervised workers need the fork start method (Linux or macOS)")
+        self.context = multiprocessing.get_context("fork")
+        self.process = process
+        self.article_timeout = article_timeout
+        self.stage_timeout = stage_timeout
+        self.runner = runner if runner is not None else StageRunner(metrics=StageMetrics())
+        self.initializer = initializer
+        self.counter_totals = counters
+        self.counters = Counter()
+        self.stopped = Counter()
+        self.workers = [self._start() for _ in range(max(1, workers))]
+
+    def _start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=worker_main, name="extract-worker", daemon=True,
+            args=(child_conn, self.process, self.runner.store, self.initializer, self.counter_totals))
+        process.start()
+        child_conn.close()
+        return Worker(process, parent_conn)
+
+    def _replace(self, worker):
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(5)
+        worker.conn.close()
+        self.workers[self.workers.index(worker)] = self._start()
+
+    def _stop(self, worker, message, kind):
+        """Kill or bury a worker and return its article's ArticleStopped outcome."""
+        elapsed = time.monotonic() - worker.started
+        self._replace(worker)
+        self.stopped[kind] += 1
+        name = os.path.basename(worker.file_path)
+        self.runner.metrics.record(name, "article", elapsed, 0.0, failed=True)
+        return worker.file_path, ArticleStopped(message, worker.stage, elapsed, worker.outputs)
+
+    def _receive(self, worker):
+        """Handle a worker's messages; returns (file_path, outcome) once its article is finished."""
+        while True:
+            try:
+                if not worker.conn.poll():
+                    return None
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join(1)
+                where = f" in {worker.stage}" if worker.stage else ""
+                return self._stop(worker, f"Worker exited with code {worker.process.exitcode}{where}", "crashed")
+            kind = message[0]
+            if kind == "stage":
+                worker.stage = message[1]
+                worker.stage_started = time.monotonic()
+            elif kind == "output":
+                worker.outputs[message[1]] = message[2]
+                worker.stage = None
+                worker.stage_started = time.monotonic()
+            elif kind == "record":
+                args, kwargs = message[1], message[2]
+                self.runner.metrics.record(*args, **kwargs)
+                stage = args[1]
+                if stage != "article":
+                    if kwargs.get("reused"):
+                        self.runner.reused[stage] += 1
+                    elif not kwargs.get("failed"):
+                        self.runner.computed[stage] += 1
+            elif kind == "counters":
+                self.counters.update(message[1])
+            else:
+                file_path = worker.file_path
+                worker.file_path = None
+                return file_path, message[1] if kind == "result" else RuntimeError(message[1])
+
+    def _overdue(self, worker, timeout_factor):
+        """Return (message, kind) when the worker's article or stage is past its deadline."""
+        now = time.monotonic()
+        article_timeout = self.article_timeout * timeout_factor
+        stage_timeout = self.stage_timeout * timeout_factor
+        if now - worker.started > article_timeout:
+            where = f" in {worker.stage}" if worker.stage else ""
+            return f"Timed out{where} after {article_timeout:.0f}s (article deadline)", "article"
+        if worker.stage is not None and now - worker.stage_started > stage_timeout:
+            return f"Timed out in {worker.stage} after {stage_timeout:.0f}s (stage deadline)", "stage"
+        return None
+
+    def run(self, file_paths, timeout_factor=1.0):
+        """Yield (file_path, outcome) for every article as it finishes, in completion order.
+
+        outcome is the result, the exception the article raised (as a
+        RuntimeError with its message), or an ArticleStopped.
+        """
+        pending = deque(file_paths)
+        while pending or any(worker.file_path is not None for worker in self.workers):
+            for worker in self.workers:
+                if worker.file_path is None and pending:
+                    worker.assign(pending.popleft())
+            busy = [worker for worker in self.workers if worker.file_path is not None]
+            ready = wait([worker.conn for worker in busy], timeout=POLL_INTERVAL)
+            for worker in busy:
+                if worker.conn in ready:
+                    finished = self._receive(worker)
+                    if finished is not None:
+                        yield finished
+            for worker in busy:
+                if worker.file_path is None or worker not in self.workers:
+                    continue
+                overdue = self._overdue(worker, timeout_factor)
+                if overdue is not None:
+                    yield self._stop(worker, *overdue)
+
+    def close(self):
+        for worker in self.workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+
+    def print_summary(self):
+        stopped = sum(self.stopped.values())
+        print(f"Workers: {len(self.workers)} processes, {stopped} articles stopped "
+              f"({self.stopped['stage']} at a stage deadline, {self.stopped['article']} at the article deadline, "
+              f"{self.stopped['crashed']} worker exits)")
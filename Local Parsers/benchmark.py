@@ -0,0 +1,662 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+import datetime
+import platform
+import importlib
+import resource
+import subprocess
+
+from stage_runner import StageRunner
+from stage_metrics import StageMetrics
+from memory_metrics import read_status_kb
+from model_cache import model_dir, hub_cache_dir, evict_from_page_cache
+
+# Reproducible benchmark for the NLP extractors.
+#
+# "generate" writes a synthetic corpus of NCA-style press-release pages with
+# configurable size and entity density.  "run" processes that corpus with each
+# extractor in its own subprocess (so load time and peak RSS are not shared)
+# and writes articles/sec, latency percentiles, per-stage timings and peak RSS
+# as JSON.  "compare" flags slowdowns between two such reports.  "startup"
+# measures time-to-first-article with the real models for cold and warm
+# starts, loading from the Hugging Face cache and from the mapped cache.
+#
+# By default the models are replaced with cheap stand-ins so the harness
+# measures everything around the models; --models real loads the configured
+# models instead.
+
+EXTRACTORS = {
+    "cpu": {"module": "nlp_extractor", "env": {}},
+    # The GPU extractor with CUDA hidden, i.e. its CPU code path
+    "gpu-cpu": {"module": "nlp_extractor_gpu", "env": {"CUDA_VISIBLE_DEVICES": ""}},
+    "bert": {"module": "bert_article_analyzer", "env": {}}
+}
+
+FIRST_NAMES = [
+    "James", "Mohammed", "Daniel", "Connor", "Liam", "Aaron", "Jamie", "Lee", "Sean", "Kyle",
+    "Sarah", "Emma", "Kelly", "Aisha", "Michael", "Tomasz", "Arben", "Gary", "Craig", "Nathan"
+]
+SURNAMES = [
+    "Smith", "Hussain", "Kelly", "Walsh", "Brown", "Morgan", "Price", "Khan", "Murphy", "Evans",
+    "Nowak", "Krasniqi", "Hughes", "Thompson", "Patel", "Doyle", "Campbell", "Robinson", "Shaw", "Lewis"
+]
+TOWNS = [
+    "Liverpool", "Manchester", "Birmingham", "Leeds", "Bristol", "Glasgow", "Dover", "Felixstowe",
+    "Southampton", "Newcastle", "Sheffield", "Nottingham", "Cardiff", "Belfast", "Croydon", "Essex"
+]
+DRUGS = ["cocaine", "heroin", "cannabis", "MDMA"]
+DRUG_UNITS = ["kg", "kilos", "tonnes", "grams"]
+CHARGES = [
+    "conspiracy to import class A drugs",
+    "conspiracy to supply cocaine",
+    "money laundering",
+    "possession of a firearm with intent to endanger life",
+    "facilitating illegal immigration",
+    "fraud by false representation",
+    "possession of criminal property"
+]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August",
+          "September", "October", "November", "December"]
+FILLER = [
+    "The investigation was led by the National Crime Agency working with partners in Border Force.",
+    "Officers executed warrants at a number of addresses as part of the operation.",
+    "Encrypted messages recovered by investigators revealed how the group organised shipments.",
+    "The NCA continues to target the organised crime groups behind the supply of drugs and firearms.",
+    "Anyone with information about organised criminality can contact Crimestoppers anonymously.",
+    "Financial investigators are now pursuing confiscation proceedings against the group.",
+    "The network used a haulage company as a front for moving consignments through UK ports."
+]
+BOILERPLATE_LINK = '<li><a href="/news/{0}">Related news {0}</a></li>'
+
+
+# Synthetic corpus
+def random_date(rng):
+    return f"{rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(2019, 2024)}"
+
+
+def random_person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+
+
+def entity_sentence(rng, people, expected):
+    """Return one sentence carrying sentences, charges, money or drug quantities."""
+    person = rng.choice(people)
+    kind = rng.randrange(5)
+    if kind == 0:
+        years = rng.randint(2, 24)
+        expected["sentences"] += 1
+        return (f"{person} was sentenced to {years} years' imprisonment at "
+                f"{rng.choice(TOWNS)} Crown Court on {random_date(rng)}.")
+    if kind == 1:
+        expected["charges"] += 1
+        return f"{person} pleaded guilty to {rng.choice(CHARGES)}."
+    if kind == 2:
+        expected["moneyAmounts"] += 1
+        amount = rng.choice([f"{rng.randint(5, 950)},000", f"{rng.randint(1, 40)}.{rng.randint(1, 9)} million"])
+        return f"Officers seized £{amount} in cash from an address linked to {person}."
+    if kind == 3:
+        expected["drugQuantities"] += 1
+        return (f"Border Force officers found {rng.randint(2, 900)} {rng.choice(DRUG_UNITS)} of "
+                f"{rng.choice(DRUGS)} hidden in a lorry at {rng.choice(TOWNS)} on {random_date(rng)}.")
+    return (f"NCA Branch Commander {random_person(rng)} said: \"{person} thought he could hide behind "
+            f"his legitimate business, but he was wrong.\"")
+
+
+def synthetic_article(rng, paragraphs, density, boilerplate_kb):
+    """Return (slug, html, expected) for one synthetic press release."""
+    expected = {"perpetrators": [], "sentences": 0, "charges": 0, "moneyAmounts": 0, "drugQuantities": 0}
+    people = []
+    for _ in range(rng.randint(1, 4)):
+        name = random_person(rng)
+        if name not in people:
+            people.append(name)
+    town = rng.choice(TOWNS)
+    drug = rng.choice(DRUGS)
+    title = f"{people[0]} jailed after {drug} importation plot uncovered in {town}"
+
+    body = []
+    for person in people:
+        expected["perpetrators"].append(person)
+        expected["charges"] += 1
+        body.append(f"{person}, {rng.randint(19, 64)}, of {rng.choice(TOWNS)}, was arrested by NCA officers "
+                    f"on {random_date(rng)} and charged with {rng.choice(CHARGES)}.")
+    for _ in range(max(0, paragraphs - len(people))):
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            if rng.random() < density:
+                sentences.append(entity_sentence(rng, people, expected))
+            else:
+                sentences.append(rng.choice(FILLER))
+        body.append(" ".join(sentences))
+
+    slug = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+    links = "".join(BOILERPLATE_LINK.format(i) for i in range(max(0, boilerplate_kb * 1024 // 45)))
+    paragraphs_html = "\n".join(f"<p>{p}</p>" for p in body)
+    html = f"""<!DOCTYPE html>
+<html lang="en-gb">
+<head>
+<meta charset="utf-8">
+<title>{title} - National Crime Agency</title>
+<link rel="canonical" href="https://www.nationalcrimeagency.gov.uk/news/{slug}">
+<meta name="date" content="{random_date(rng)}">
+</head>
+<body>
+<div class="tm-page">
+<nav class="uk-navbar"><ul>{links}</ul></nav>
+<main class="tm-main">
+<article class="uk-article">
+<h1 class="uk-article-title">{title}</h1>
+<time>{random_date(rng)}</time>
+{paragraphs_html}
+</article>
+</main>
+<footer><p>National Crime Agency, Units 1 - 6 Citadel Place, Tinworth Street, London, SE11 5EF</p></footer>
+</div>
+</body>
+</html>
+"""
+    return slug, html, expected
+
+
+def generate_corpus(output_dir, articles=100, paragraphs=(6, 14), density=0.5, boilerplate_kb=8, seed=1):
+    """Write a synthetic corpus plus a manifest of what each page contains."""
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    total_bytes = 0
+    for i in range(articles):
+        slug, html, expected = synthetic_article(rng, rng.randint(*paragraphs), density, boilerplate_kb)
+        file_name = f"{i:05d}-{slug[:60]}.html"
+        data = html.encode('utf-8')
+        with open(os.path.join(output_dir, file_name), 'wb') as f:
+            f.write(data)
+        total_bytes += len(data)
+        files.append({"file": file_name, "bytes": len(data), "expected": expected})
+
+    manifest = {
+        "generator": {
+            "articles": articles,
+            "paragraphs": list(paragraphs),
+            "density": density,
+            "boilerplateKb": boilerplate_kb,
+            "seed": seed
+        },
+        "bytes": total_bytes,
+        "files": files
+    }
+    with open(os.path.join(output_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# Model stand-ins
+PERSON_PATTERN = re.compile(r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b(?!\s+(?:Crown|Court|Force|Agency))')
+PLACE_PATTERN = re.compile(r'\b(?:of|in|at|from) ([A-Z][a-z]+)\b')
+ORG_PATTERN = re.compile(r'\b(National Crime Agency|Border Force|NCA|[A-Z][a-z]+ Crown Court)\b')
+DATE_PATTERN = re.compile(r'\b(\d{1,2} (?:' + "|".join(MONTHS) + r') \d{4})\b')
+
+
+class StandInEntity:
+    def __init__(self, text, label):
+        self.text = text
+        self.label_ = label
+
+
+class StandInDoc:
+    def __init__(self, ents):
+        self.ents = ents
+
+
+class StandInModel:
+    """Base for the stand-ins: an optional fixed delay per call in place of inference."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def wait(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StandInSpacy(StandInModel):
+    """Regex NER with the parts of the spaCy Language/Doc interface the extractors use."""
+    meta = {"name": "stand_in", "version": "0"}
+
+    def __call__(self, text):
+        self.wait()
+        ents = [StandInEntity(m.group(1), "PERSON") for m in PERSON_PATTERN.finditer(text)]
+        ents += [StandInEntity(m.group(1), "GPE") for m in PLACE_PATTERN.finditer(text)]
+        ents += [StandInEntity(m.group(1), "ORG") for m in ORG_PATTERN.finditer(text)]
+        ents += [StandInEntity(m.group(1), "DATE") for m in DATE_PATTERN.finditer(text)]
+        return StandInDoc(ents)
+
+
+class StandInNER(StandInModel):
+    """Returns transformers "ner" pipeline output (aggregation_strategy="simple")."""
+
+    def __call__(self, text):
+        self.wait()
+        found = []
+        for pattern, group in ((PERSON_PATTERN, "PER"), (PLACE_PATTERN, "LOC"), (ORG_PATTERN, "ORG")):
+            for match in pattern.finditer(text):
+                found.append({"entity_group": group, "score": 0.99, "word": match.group(1),
+                              "start": match.start(1), "end": match.end(1)})
+        return found
+
+
+class StandInClassifier(StandInModel):
+    """Returns zero-shot-classification output scored by keyword overlap."""
+
+    def __call__(self, text, candidate_labels, multi_label=True):
+        self.wait()
+        lowered = text.lower()
+        scores = []
+        for label in candidate_labels:
+            words = [w for w in re.findall(r'[a-z]+', label.lower()) if len(w) > 3]
+            hits = sum(1 for w in words if w[:5] in lowered)
+            scores.append(round(0.1 + 0.8 * hits / max(1, len(words)), 4))
+        ranked = sorted(zip(candidate_labels, scores), key=lambda item: -item[1])
+        return {"sequence": text, "labels": [l for l, _ in ranked], "scores": [s for _, s in ranked]}
+
+
+def install_stand_ins(module, latency_ms):
+    """Replace an NLP extractor's model globals with stand-ins."""
+    module.nlp = StandInSpacy(latency_ms)
+    module.ner_pipeline = StandInNER(latency_ms)
+    module.classifier = StandInClassifier(latency_ms)
+    module.models_loaded = True
+
+
+# Measurement (runs inside the worker subprocess)
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timed_method(metrics, stage, func):
+    """Wrap func so each call is recorded as stage under the current article."""
+    def wrapper(*args, **kwargs):
+        with metrics.timer(metrics.current_article, stage, args) as timer:
+            timer.output = func(*args, **kwargs)
+        return timer.output
+    return wrapper
+
+
+def run_worker(extractor, corpus_dir, models, latency_ms, warmup, repeat):
+    """Process the corpus with one extractor and return its measurements."""
+    load_start = time.perf_counter()
+    module = importlib.import_module(EXTRACTORS[extractor]["module"])
+    if extractor == "bert":
+        if models == "real":
+            processor = module.BERTProcessor()
+        else:
+            processor = module.BERTProcessor.__new__(module.BERTProcessor)
+            processor.ner_pipeline = StandInNER(latency_ms)
+            processor.entity_mode = "bert"
+    elif models != "real":
+        install_stand_ins(module, latency_ms)
+    load_seconds = time.perf_counter() - load_start
+    rss_after_load = peak_rss_mb()
+
+    files = sorted(glob.glob(os.path.join(corpus_dir, "*.html")))
+    if not files:
+        raise RuntimeError(f"No HTML files found in {corpus_dir}")
+
+    metrics = StageMetrics()
+    metrics.current_article = None
+    if extractor == "bert":
+        for f in files[:warmup]:
+            module.process_article(f, processor)
+        # bert_article_analyzer has no stage runner, so time its steps directly
+        module.extract_content_from_html = timed_method(metrics, "content", module.extract_content_from_html)
+        for stage, method in (("entities", "extract_named_entities"), ("categories", "classify_text"),
+                              ("relationships", "extract_relationships"), ("quotes", "extract_key_quotes"),
+                              ("summary", "summarize")):
+            setattr(processor, method, timed_method(metrics, stage, getattr(processor, method)))
+        process = lambda path: module.process_article(path, processor)
+    else:
+        for f in files[:warmup]:
+            module.process_article(f)
+        runner = StageRunner(metrics=metrics)
+        process = lambda path: module.process_article(path, None, runner)
+
+    failed = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for path in files:
+            metrics.current_article = os.path.basename(path)
+            with metrics.timer(metrics.current_article, "article") as timer:
+                result = process(path)
+                timer.output = [result]
+            if result.get("error") or result.get("extraction_error"):
+                failed += 1
+    elapsed = time.perf_counter() - started
+
+    summary = metrics.summary()
+    article = summary.pop("article")
+    processed = len(files) * repeat
+    return {
+        "module": EXTRACTORS[extractor]["module"],
+        "articles": processed,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "articlesPerSec": round(processed / elapsed, 3) if elapsed else None,
+        "p50Ms": article["p50Ms"],
+        "p90Ms": article["p90Ms"],
+        "p99Ms": article["p99Ms"],
+        "maxMs": article["maxMs"],
+        "cpuS": article["cpuS"],
+        "loadSeconds": round(load_seconds, 3),
+        "rssAfterLoadMb": rss_after_load,
+        "peakRssMb": peak_rss_mb(),
+        "stages": {
+            stage: {key: s[key] for key in ("count", "p50Ms", "p99Ms", "totalS", "share", "charsPerS")}
+            for stage, s in summary.items()
+        }
+    }
+
+
+def startup_worker(extractor, corpus_dir, spawned_at, entity_mode=None):
+    """Load the real models, process the first article and report the times since the process was spawned."""
+    from model_registry import registry
+    ready = time.time() - spawned_at
+    module = importlib.import_module(EXTRACTORS[extractor]["module"])
+    if extractor == "bert":
+        processor = module.BERTProcessor()
+        process = lambda path: module.process_article(path, processor)
+    else:
+        if entity_mode:
+            module.ENTITY_MODE = entity_mode
+        process = lambda path: module.process_article(path)
+    loaded = time.time() - spawned_at
+
+    files = sorted(glob.glob(os.path.join(corpus_dir, "*.html")))
+    if not files:
+        raise RuntimeError(f"No HTML files found in {corpus_dir}")
+    result = process(files[0])
+    first_article = time.time() - spawned_at
+
+    # Mapped weights are file-backed (shareable) memory, copied weights anonymous memory
+    status = read_status_kb("RssAnon", "RssFile")
+    return {
+        "interpreterSeconds": round(ready, 3),
+        "loadSeconds": round(loaded, 3),
+        "firstArticleSeconds": round(first_article, 3),
+        "failed": bool(result.get("error") or result.get("extraction_error")),
+        "rssAnonMb": round(status["RssAnon"] / 1024, 1) if status["RssAnon"] is not None else None,
+        "rssFileMb": round(status["RssFile"] / 1024, 1) if status["RssFile"] is not None else None,
+        "models": [info["model"] for info in registry.resident() if info["kind"] != "spacy"]
+    }
+
+
+# Orchestration
+def spawn_startup(extractor, corpus_dir, env, entity_mode=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.abspath(__file__), "startup-worker", extractor, os.path.abspath(corpus_dir),
+               "--spawned-at", repr(time.time())]
+    if entity_mode:
+        command += ["--entity-mode", entity_mode]
+    completed = subprocess.run(command, cwd=script_dir, env=env, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = (completed.stderr or completed.stdout).strip().splitlines()[-5:]
+        raise RuntimeError(" | ".join(error))
+    return json.loads(lines[-1])
+
+
+def run_startup(corpus_dir, extractor="cpu", warm_runs=2, entity_mode=None):
+    """Time-to-first-article for cold and warm starts, loading from the hub cache and from the mapped cache.
+
+    Each loading mode is primed once (downloads, conversion), then the model
+    files are dropped from the page cache for the cold run; the warm runs
+    follow immediately.  Eviction only covers the transformer weights, not
+    the spaCy package, and cannot drop pages another process has mapped.
+    """
+    report = {
+        "createdAt": datetime.datetime.now().isoformat(),
+        "extractor": extractor,
+        "entityMode": entity_mode,
+        "loading": {}
+    }
+    for loading, mmap_flag in (("hub", "0"), ("mmap", "1")):
+        env = dict(os.environ)
+        env.update(EXTRACTORS[extractor]["env"])
+        env["NCA_MMAP_MODELS"] = mmap_flag
+        print(f"Startup {extractor} ({loading}): priming...")
+        primed = spawn_startup(extractor, corpus_dir, env, entity_mode)
+        paths = [hub_cache_dir(model_id) for model_id in primed["models"]]
+        paths += [model_dir(model_id) for model_id in primed["models"]]
+        evicted = evict_from_page_cache(paths)
+        cold = spawn_startup(extractor, corpus_dir, env, entity_mode)
+        warm = [spawn_startup(extractor, corpus_dir, env, entity_mode) for _ in range(warm_runs)]
+        report["loading"][loading] = {
+            "evictedMb": round(evicted / (1024 * 1024), 1),
+            "cold": cold,
+            "warm": min(warm, key=lambda run: run["firstArticleSeconds"]) if warm else None
+        }
+        warm_text = f", warm {report['loading'][loading]['warm']['firstArticleSeconds']}s" if warm else ""
+        print(f"  first article: cold {cold['firstArticleSeconds']}s{warm_text}")
+
+    hub, mapped = report["loading"]["hub"], report["loading"]["mmap"]
+    report["coldSpeedup"] = round(hub["cold"]["firstArticleSeconds"] / mapped["cold"]["firstArticleSeconds"], 2)
+    if hub["warm"] and mapped["warm"]:
+        report["warmSpeedup"] = round(hub["warm"]["firstArticleSeconds"] / mapped["warm"]["firstArticleSeconds"], 2)
+    return report
+
+
+def run_benchmark(corpus_dir, extractors, models="stand-in", latency_ms=0.0, warmup=2, repeat=1):
+    """Run each extractor in a fresh subprocess and collect one report."""
+    manifest = {}
+    manifest_path = os.path.join(corpus_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    report = {
+        "createdAt": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "corpus": {
+            "path": os.path.abspath(corpus_dir),
+            "articles": len(glob.glob(os.path.join(corpus_dir, "*.html"))),
+            "bytes": manifest.get("bytes"),
+            "generator": manifest.get("generator")
+        },
+        "models": models,
+        "standInLatencyMs": latency_ms if models != "real" else None,
+        "warmup": warmup,
+        "repeat": repeat,
+        "extractors": {}
+    }
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    for extractor in extractors:
+        env = dict(os.environ)
+        env.update(EXTRACTORS[extractor]["env"])
+        if models != "real":
+            env["NCA_SKIP_MODEL_LOAD"] = "1"
+        command = [sys.executable, os.path.abspath(__file__), "worker", extractor, os.path.abspath(corpus_dir),
+                   "--models", models, "--latency-ms", str(latency_ms),
+                   "--warmup", str(warmup), "--repeat", str(repeat)]
+        print(f"Benchmarking {extractor} ({EXTRACTORS[extractor]['module']}, models: {models})...")
+        completed = subprocess.run(command, cwd=script_dir, env=env, capture_output=True, text=True)
+        # The worker prints its measurements as the last line of stdout
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            error = (completed.stderr or completed.stdout).strip().splitlines()[-5:]
+            print(f"  {extractor} failed: {' | '.join(error)}")
+            report["extractors"][extractor] = {"error": "\n".join(error)}
+            continue
+        measured = json.loads(lines[-1])
+        report["extractors"][extractor] = measured
+        print(f"  {measured['articlesPerSec']} articles/s, p50 {measured['p50Ms']} ms, "
+              f"p99 {measured['p99Ms']} ms, peak RSS {measured['peakRssMb']} MB")
+    return report
+
+
+# Metrics compared by "compare": (path, higher_is_better)
+COMPARED_METRICS = [
+    ("articlesPerSec", True),
+    ("p50Ms", False),
+    ("p99Ms", False),
+    ("peakRssMb", False)
+]
+
+
+def compare_reports(baseline, current, threshold=0.10, min_ms=1.0):
+    """Return one row per compared metric, flagging changes worse than threshold.
+
+    Latencies where both values are below min_ms are reported but never
+    flagged, since they are dominated by timer noise.
+    """
+    rows = []
+    for extractor, base in baseline.get("extractors", {}).items():
+        cur = current.get("extractors", {}).get(extractor)
+        if not cur or "error" in base or "error" in cur:
+            continue
+        checks = [(name, base.get(name), cur.get(name), higher) for name, higher in COMPARED_METRICS]
+        for stage, base_stage in base.get("stages", {}).items():
+            cur_stage = cur.get("stages", {}).get(stage)
+            if cur_stage:
+                checks.append((f"stages.{stage}.p50Ms", base_stage["p50Ms"], cur_stage["p50Ms"], False))
+        for name, before, after, higher in checks:
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher else change
+            noisy = name.endswith("Ms") and before < min_ms and after < min_ms
+            rows.append({
+                "extractor": extractor,
+                "metric": name,
+                "baseline": before,
+                "current": after,
+                "change": round(change, 4),
+                "regression": worse > threshold and not noisy
+            })
+    return rows
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the NCA NLP extractors on a synthetic corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a synthetic NCA press-release corpus")
+    generate.add_argument("output_dir")
+    generate.add_argument("--articles", type=int, default=100)
+    generate.add_argument("--paragraphs", default="6-14", help="Paragraphs per article, N or MIN-MAX")
+    generate.add_argument("--density", type=float, default=0.5,
+                          help="Share of sentences carrying sentences, charges, money or drugs (0-1)")
+    generate.add_argument("--boilerplate-kb", type=int, default=8, help="Navigation markup per page")
+    generate.add_argument("--seed", type=int, default=1)
+
+    run = commands.add_parser("run", help="Benchmark extractors on a corpus")
+    run.add_argument("corpus_dir")
+    run.add_argument("--extractor", action="append", choices=sorted(EXTRACTORS),
+                     help="Extractor to run (repeatable, default all)")
+    run.add_argument("--models", choices=["stand-in", "real"], default="stand-in")
+    run.add_argument("--latency-ms", type=float, default=0.0, help="Simulated delay per stand-in model call")
+    run.add_argument("--warmup", type=int, default=2, help="Articles processed before timing starts")
+    run.add_argument("--repeat", type=int, default=1, help="Passes over the corpus")
+    run.add_argument("--output", help="Write the JSON report here")
+
+    compare = commands.add_parser("compare", help="Flag slowdowns between two reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    compare.add_argument("--min-ms", type=float, default=1.0, help="Ignore latencies below this")
+    compare.add_argument("--json", action="store_true")
+
+    startup = commands.add_parser("startup", help="Time-to-first-article for cold and warm starts (real models)")
+    startup.add_argument("corpus_dir")
+    startup.add_argument("--extractor", choices=sorted(EXTRACTORS), default="cpu")
+    startup.add_argument("--warm-runs", type=int, default=2, help="Warm starts after the cold one (best is kept)")
+    startup.add_argument("--entity-mode", help="nlp_extractor entity mode (cascade also loads the NER model)")
+    startup.add_argument("--output", help="Write the JSON report here")
+
+    startup_worker_parser = commands.add_parser("startup-worker")
+    startup_worker_parser.add_argument("extractor", choices=sorted(EXTRACTORS))
+    startup_worker_parser.add_argument("corpus_dir")
+    startup_worker_parser.add_argument("--spawned-at", type=float, required=True)
+    startup_worker_parser.add_argument("--entity-mode")
+
+    worker = commands.add_parser("worker")
+    worker.add_argument("extractor", choices=sorted(EXTRACTORS))
+    worker.add_argument("corpus_dir")
+    worker.add_argument("--models", default="stand-in")
+    worker.add_argument("--latency-ms", type=float, default=0.0)
+    worker.add_argument("--warmup", type=int, default=2)
+    worker.add_argument("--repeat", type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        low, _, high = args.paragraphs.partition("-")
+        manifest = generate_corpus(args.output_dir, args.articles, (int(low), int(high or low)),
+                                   args.density, args.boilerplate_kb, args.seed)
+        print(f"Wrote {args.articles} articles ({manifest['bytes'] / 1e6:.1f} MB) to {args.output_dir}")
+    elif args.command == "run":
+        report = run_benchmark(args.corpus_dir, args.extractor or sorted(EXTRACTORS), args.models,
+                               args.latency_ms, args.warmup, args.repeat)
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + "\n")
+            print(f"Report saved to {args.output}")
+        else:
+            print(output)
+    elif args.command == "compare":
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        rows = compare_reports(baseline, current, args.threshold, args.min_ms)
+        regressions = [row for row in rows if row["regression"]]
+        if args.json:
+            print(json.dumps({"threshold": args.threshold, "regressions": len(regressions), "rows": rows}, indent=2))
+        else:
+            for row in rows:
+                flag = "REGRESSION" if row["regression"] else ""
+                print(f"{row['extractor']:<8}{row['metric']:<32}{row['baseline']:>12}{row['current']:>12}"
+                      f"{row['change']:>+9.1%}  {flag}")
+            print(f"{len(regressions)} regressions beyond {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+    elif args.command == "startup":
+        try:
+            report = run_startup(args.corpus_dir, args.extractor, args.warm_runs, args.entity_mode)
+        except RuntimeError as e:
+            print(f"Startup benchmark failed: {str(e)}")
+            sys.exit(1)
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + "\n")
+            print(f"Report saved to {args.output}")
+        else:
+            print(output)
+    elif args.command == "startup-worker":
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        measured = startup_worker(args.extractor, args.corpus_dir, args.spawned_at, args.entity_mode)
+        sys.stdout = stdout
+        print(json.dumps(measured))
+    else:
+        # Keep the extractors' progress output off the line the parent parses
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        measured = run_worker(args.extractor, args.corpus_dir, args.models, args.latency_ms,
+                              args.warmup, args.repeat)
+        sys.stdout = stdout
+        print(json.dumps(measured))
@@ -5,11 +5,17 @@ import json
 import re
 import datetime
 from bs4 import BeautifulSoup
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline, AutoModelForSequenceClassification
+from model_settings import model_precision, inference_backend
+from cascade_ner import cascade_entities, CascadeStats
+from model_registry import registry
 
 # Define the basic information
 SCRIPT_VERSION = "1.0.0"
 DESCRIPTION = "BERT-based article analyzer for NCA workflow"
+NER_MODEL = "dslim/bert-base-NER"
+SPACY_MODEL = "en_core_web_lg"
+# bert: BERT NER over every chunk; cascade: spaCy first, BERT only on uncertain or crime-relevant sentences
+ENTITY_MODES = ("bert", "cascade")
 
 # Helper functions
 def clean_text(text):
@@ -109,29 +115,31 @@ def extract_content_from_html(html_path):
 
 # BERT-specific functions
 class BERTProcessor:
-    def __init__(self, model_name="google-bert/bert-base-cased"):
+    # Define crime categories for classification
+    crime_categories = [
+        "Drug Trafficking", 
+        "Money Laundering", 
+        "Firearms Offenses", 
+        "Fraud",
+        "Human Trafficking",
+        "Cybercrime",
+        "Terrorism"
+    ]
+    
+    def __init__(self, model_name="google-bert/bert-base-cased", entity_mode="bert"):
+        # model_name is kept for the CLI; classify_text is keyword-based, so no classification
+        # model is loaded (the untrained bert-base-cased head it used to load was never called)
         print(f"Initializing BERT Processor with model: {model_name}")
+        self.model_name = model_name
         
-        # Initialize tokenizer and NER model
-        self.ner_tokenizer = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
-        self.ner_model = AutoModelForTokenClassification.from_pretrained("dslim/bert-base-NER")
-        self.ner_pipeline = pipeline("ner", model=self.ner_model, tokenizer=self.ner_tokenizer, aggregation_strategy="simple")
-        
-        # Initialize classification model
-        self.cls_tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.cls_model = AutoModelForSequenceClassification.from_pretrained(model_name, num_labels=7)
-        self.cls_pipeline = pipeline("text-classification", model=self.cls_model, tokenizer=self.cls_tokenizer)
+        self.entity_mode = entity_mode
+        self.cascade_stats = CascadeStats()
+        if entity_mode == "cascade":
+            self.nlp = registry.get("spacy", SPACY_MODEL)
         
-        # Define crime categories for classification
-        self.crime_categories = [
-            "Drug Trafficking", 
-            "Money Laundering", 
-            "Firearms Offenses", 
-            "Fraud",
-            "Human Trafficking",
-            "Cybercrime",
-            "Terrorism"
-        ]
+        # Shared NER pipeline (the same instance nlp_extractor.py uses in this process);
+        # NCA_BACKEND=onnx runs it through ONNX Runtime
+        self.ner_pipeline = registry.get("ner", NER_MODEL, -1, model_precision("ner"), inference_backend())
         
         print("BERT models loaded successfully")
     
@@ -140,6 +148,12 @@ class BERTProcessor:
         if not text:
             return []
         
+        if self.entity_mode == "cascade":
+            entities, _ = cascade_entities(text, self.nlp, self.ner_pipeline, self.cascade_stats)
+            # Same shape as the BERT-only output
+            entities.pop("dates")
+            return entities
+        
         # Split into chunks to handle token limits
         chunks = text_to_chunks(text)
         all_entities = []
@@ -340,14 +354,14 @@ def process_article(file_path, bert_processor):
     return result
 
 # Process multiple files
-def process_folder(folder_path, output_file=None, model_name="google-bert/bert-base-cased"):
+def process_folder(folder_path, output_file=None, model_name="google-bert/bert-base-cased", entity_mode="bert"):
     """Process all HTML files in a folder."""
     if not os.path.isdir(folder_path):
         print(f"Error: {folder_path} is not a valid directory")
         return
     
     # Initialize BERT processor
-    bert_processor = BERTProcessor(model_name)
+    bert_processor = BERTProcessor(model_name, entity_mode)
     
     # Get all HTML files in the folder
     html_files = []
@@ -378,6 +392,9 @@ def process_folder(folder_path, output_file=None, model_name="google-bert/bert-b
                 "processedAt": datetime.datetime.now().isoformat()
             })
     
+    bert_processor.cascade_stats.print_summary()
+    registry.print_summary()
+    
     # Save results to a JSON file if output_file is specified
     if output_file:
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -392,19 +409,27 @@ if __name__ == "__main__":
     print(f"BERT Article Analyzer v{SCRIPT_VERSION}")
     print(f"Description: {DESCRIPTION}")
     
-    if len(sys.argv) < 2:
-        print("Usage: python bert_article_analyzer.py <html_file_or_folder> [output_file] [model_name]")
+    args = sys.argv[1:]
+    entity_mode = "bert"
+    if "--entity-mode" in args:
+        index = args.index("--entity-mode")
+        entity_mode = args[index + 1] if index + 1 < len(args) else ""
+        del args[index:index + 2]
+    
+    if len(args) < 1 or entity_mode not in ENTITY_MODES:
+        print("Usage: python bert_article_analyzer.py <html_file_or_folder> [output_file] [model_name] "
+              "[--entity-mode bert|cascade]")
         sys.exit(1)
     
-    path = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
-    model_name = sys.argv[3] if len(sys.argv) > 3 else "google-bert/bert-base-cased"
+    path = args[0]
+    output_file = args[1] if len(args) > 1 else None
+    model_name = args[2] if len(args) > 2 else "google-bert/bert-base-cased"
     
     print(f"Using model: {model_name}")
     
     if os.path.isdir(path):
         # Process all HTML files in the folder
-        results = process_folder(path, output_file, model_name)
+        results = process_folder(path, output_file, model_name, entity_mode)
         if not output_file:
             # Print the results as JSON if no output file is specified
             print(json.dumps(results, indent=2, ensure_ascii=False))
@@ -412,7 +437,7 @@ if __name__ == "__main__":
         # Process a single file
         try:
             # Initialize BERT processor
-            bert_processor = BERTProcessor(model_name)
+            bert_processor = BERTProcessor(model_name, entity_mode)
             
             # Process the article
             result = process_article(path, bert_processor)
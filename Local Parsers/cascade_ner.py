@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+# Cascaded entity extraction: spaCy over the whole article, transformer NER
+# only where spaCy is likely to be wrong or where names matter most.
+#
+# A sentence is escalated when it has an entity spaCy labels inconsistently
+# across the article, an entity type spaCy often confuses, a proper noun no
+# entity covers, or an arrest/charge/sentencing indicator next to a name.
+# Consecutive escalated sentences are sent to the NER pipeline together (up
+# to max_words) and its PER/LOC/ORG/MISC entities replace spaCy's inside
+# those sentences; dates always come from spaCy.
+
+# Sentences reporting what happened to someone: the perpetrator names must be right here
+CRIME_INDICATORS = re.compile(
+    r"\b(arrest|charg|convict|sentenc|jail|imprison|plead|pled|guilty|remand|extradit|"
+    r"traffick|smuggl|launder|seiz|raid)\w*", re.IGNORECASE)
+
+# spaCy labels that are frequently wrong for names in press releases
+UNCERTAIN_LABELS = {"NORP", "FAC", "PRODUCT", "WORK_OF_ART", "LAW", "EVENT", "LANGUAGE"}
+
+SPACY_KEYS = {
+    "PERSON": "people",
+    "GPE": "locations",
+    "LOC": "locations",
+    "ORG": "organizations",
+    "DATE": "dates",
+    "TIME": "dates"
+}
+SPACY_KEYS.update({label: "miscellaneous" for label in UNCERTAIN_LABELS})
+
+BERT_KEYS = {"PER": "people", "LOC": "locations", "ORG": "organizations", "MISC": "miscellaneous"}
+
+ENTITY_KEYS = ("people", "locations", "organizations", "dates", "miscellaneous")
+
+
+class CascadeStats:
+    """Running totals of how much text the cascade escalated and why."""
+
+    def __init__(self):
+        self.articles = 0
+        self.sentences = 0
+        self.escalated = 0
+        self.chars = 0
+        self.escalated_chars = 0
+        self.ner_calls = 0
+        self.reasons = Counter()
+
+    def add(self, stats):
+        self.articles += 1
+        self.sentences += stats["sentences"]
+        self.escalated += stats["escalatedSentences"]
+        self.chars += stats["chars"]
+        self.escalated_chars += stats["escalatedChars"]
+        self.ner_calls += stats["nerCalls"]
+        self.reasons.update(stats["reasons"])
+
+    def summary(self):
+        return {
+            "articles": self.articles,
+            "sentences": self.sentences,
+            "escalatedSentences": self.escalated,
+            "escalatedFraction": round(self.escalated_chars / self.chars, 4) if self.chars else 0.0,
+            "nerCalls": self.ner_calls,
+            "reasons": dict(self.reasons)
+        }
+
+    def print_summary(self):
+        if not self.articles:
+            return
+        summary = self.summary()
+        reasons = ", ".join(f"{reason} {count}" for reason, count in self.reasons.most_common())
+        print(f"Cascaded NER: {summary['escalatedSentences']}/{summary['sentences']} sentences "
+              f"({summary['escalatedFraction']:.1%} of text) sent to the transformer in "
+              f"{summary['nerCalls']} calls ({reasons or 'none'})")
+
+
+def escalation_reasons(sentence, labels_by_text):
+    """Why a spaCy sentence should go to the transformer (empty when spaCy can be trusted)."""
+    reasons = []
+    ents = list(sentence.ents)
+    covered = {token.i for ent in ents for token in ent}
+    has_name = any(token.pos_ == "PROPN" for token in sentence)
+
+    if any(len(labels_by_text[ent.text]) > 1 for ent in ents):
+        reasons.append("conflicting_labels")
+    if any(ent.label_ in UNCERTAIN_LABELS for ent in ents):
+        reasons.append("uncertain_label")
+    if any(token.pos_ == "PROPN" and token.i not in covered and not token.is_sent_start for token in sentence):
+        reasons.append("untagged_proper_noun")
+    if has_name and CRIME_INDICATORS.search(sentence.text):
+        reasons.append("crime_indicator")
+    return reasons
+
+
+def escalated_spans(sentences, escalate, max_words):
+    """Group consecutive escalated sentences into (start_char, end_char) spans of at most max_words."""
+    spans = []
+    current = None
+    words = 0
+    for sentence, selected in zip(sentences, escalate):
+        length = len(sentence)
+        if not selected:
+            current = None
+            continue
+        if current is not None and words + length <= max_words:
+            current[1] = sentence.end_char
+            words += length
+        else:
+            current = [sentence.start_char, sentence.end_char]
+            spans.append(current)
+            words = length
+    return [tuple(span) for span in spans]
+
+
+def cascade_entities(text, nlp, ner, stats=None, max_words=250, min_score=0.5, escalate_all=False):
+    """Extract entities with spaCy, escalating uncertain or crime-relevant sentences to the NER pipeline.
+
+    Returns the entities by type (deduplicated, like extract_entities_spacy)
+    and a dict describing what was escalated; escalate_all=True runs the
+    transformer over every sentence for comparison.
+    """
+    entities = {key: set() for key in ENTITY_KEYS}
+    report = {"sentences": 0, "escalatedSentences": 0, "chars": len(text), "escalatedChars": 0,
+              "nerCalls": 0, "reasons": Counter()}
+    if not text:
+        return {key: [] for key in ENTITY_KEYS}, report
+
+    doc = nlp(text)
+    labels_by_text = defaultdict(set)
+    for ent in doc.ents:
+        labels_by_text[ent.text].add(ent.label_)
+
+    sentences = list(doc.sents)
+    escalate = []
+    for sentence in sentences:
+        reasons = ["all"] if escalate_all else escalation_reasons(sentence, labels_by_text)
+        report["reasons"].update(reasons)
+        escalate.append(bool(reasons))
+    report["sentences"] = len(sentences)
+    report["escalatedSentences"] = sum(escalate)
+
+    # Spans the transformer actually covered; spaCy's entities stay wherever it failed
+    spans = []
+    for start, end in escalated_spans(sentences, escalate, max_words):
+        span_text = text[start:end]
+        try:
+            found = ner(span_text)
+        except Exception as e:
+            print(f"Error in transformers NER: {str(e)}")
+            continue
+        spans.append((start, end))
+        report["escalatedChars"] += end - start
+        report["nerCalls"] += 1
+        for entity in found:
+            key = BERT_KEYS.get(entity.get("entity_group"))
+            if key is None or entity.get("score", 1.0) < min_score:
+                continue
+            if "start" in entity and entity["start"] is not None:
+                word = span_text[entity["start"]:entity["end"]].strip()
+            else:
+                word = entity.get("word", "").strip()
+            if len(word) > 1:
+                entities[key].add(word)
+
+    for ent in doc.ents:
+        key = SPACY_KEYS.get(ent.label_)
+        if key is None:
+            continue
+        # Names inside escalated spans are the transformer's call; dates stay with spaCy
+        if key != "dates" and any(start <= ent.start_char < end for start, end in spans):
+            continue
+        entities[key].add(ent.text)
+
+    report["reasons"] = dict(report["reasons"])
+    if stats is not None:
+        stats.add(report)
+    return {key: list(values) for key, values in entities.items()}, report
+
+
+# Benchmark
+def agreement(reference, candidate, keys=("people", "locations", "organizations")):
+    """Micro precision/recall of candidate entities against the reference, over the given types."""
+    matched = expected = found = 0
+    for ref, cand in zip(reference, candidate):
+        for key in keys:
+            ref_set, cand_set = set(ref[key]), set(cand[key])
+            matched += len(ref_set & cand_set)
+            expected += len(ref_set)
+            found += len(cand_set)
+    return {
+        "precision": round(matched / found, 4) if found else 1.0,
+        "recall": round(matched / expected, 4) if expected else 1.0
+    }
+
+
+def run_benchmark(corpus_dir, size, max_words=250):
+    """Time the cascade against running the transformer over every sentence on a fixed sample."""
+    import nlp_extractor
+    if not nlp_extractor.models_loaded:
+        raise RuntimeError("The spaCy and transformer models could not be loaded")
+
+    texts = []
+    for html_path in sorted(glob.glob(os.path.join(corpus_dir, "*.html")))[:size]:
+        content = nlp_extractor.clean_text(nlp_extractor.extract_content_from_html(html_path).get("content", ""))
+        if content:
+            texts.append(content)
+    if not texts:
+        raise ValueError(f"No articles with content in {corpus_dir}")
+    print(f"Benchmarking on {len(texts)} articles")
+
+    nlp, ner = nlp_extractor.nlp, nlp_extractor.get_ner_pipeline()
+    # Warm up both models so neither side pays first-call costs
+    cascade_entities(texts[0], nlp, ner, escalate_all=True)
+
+    results = {}
+    for mode, escalate_all in (("always", True), ("cascade", False)):
+        stats = CascadeStats()
+        outputs = []
+        started = time.perf_counter()
+        for text in texts:
+            outputs.append(cascade_entities(text, nlp, ner, stats, max_words, escalate_all=escalate_all)[0])
+        seconds = time.perf_counter() - started
+        results[mode] = dict(stats.summary(), seconds=round(seconds, 3),
+                             articlesPerSec=round(len(texts) / seconds, 3), entities=outputs)
+
+    always, cascade = results["always"], results["cascade"]
+    return {
+        "corpus": os.path.abspath(corpus_dir),
+        "samples": len(texts),
+        "escalatedFraction": cascade["escalatedFraction"],
+        "reasons": cascade["reasons"],
+        "alwaysArticlesPerSec": always["articlesPerSec"],
+        "cascadeArticlesPerSec": cascade["articlesPerSec"],
+        "throughputGain": round(always["seconds"] / cascade["seconds"], 2),
+        "agreementWithAlways": agreement(always.pop("entities"), cascade.pop("entities"))
+    }
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cascaded NER against always running the transformer")
+    parser.add_argument("corpus_dir", help="Folder of article HTML files")
+    parser.add_argument("--sample", type=int, default=50, help="Number of articles (first N by name)")
+    parser.add_argument("--max-words", type=int, default=250, help="Largest span sent to the transformer")
+    parser.add_argument("--output", help="Write the JSON report here")
+    options = parser.parse_args()
+
+    try:
+        report = run_benchmark(options.corpus_dir, options.sample, options.max_words)
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(json.dumps(report, indent=2))
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {options.output}")
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import queue
+import argparse
+import datetime
+import threading
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import nlp_extractor
+from result_cache import ResultCache
+from stage_runner import StageRunner, cache_paths
+from near_duplicates import NearDuplicateIndex, DEFAULT_THRESHOLD
+from relevance_gate import RelevanceGate, DEFAULT_MIN_SCORE
+from stage_metrics import percentile
+
+# HTTP extraction service for the n8n HTTP Request node.
+#
+# Runs nlp_extractor.process_article over articles posted in the request
+# body and returns the structured result as JSON, so the workflow needs no
+# temp files and no scraping of JSON out of a script's stdout.
+#
+#   POST /extract   text/html body: one article (name it with ?source=...)
+#                   JSON {"html": ..., "source": ...} or {"title": ...,
+#                   "content": ..., "source": ...}: one article
+#                   JSON list, or {"articles": [...]}: {"results": [...]}
+#   GET  /health    models loaded, queue depth
+#   GET  /stats     request, batching and latency figures
+#
+# Articles run on a fixed pool of worker threads.  The model calls they make
+# (spaCy, the zero-shot classifier and, in cascade mode, the NER pipeline)
+# are funnelled through one micro-batcher per model, which groups calls
+# arriving within max_wait_ms into a single batched call.  When more than
+# max_queue articles are queued or running, requests are refused with 503
+# and a Retry-After header instead of piling up.
+
+
+class Saturated(Exception):
+    """Raised when accepting a request would exceed the queue limit."""
+
+
+class MicroBatcher:
+    """Turns single calls from many threads into batched calls on one worker thread.
+
+    call_batch(inputs, options) must return one output per input; calls are
+    only batched with others that pass the same options.  When a batched
+    call raises, its inputs are retried one at a time, so only the calls
+    that fail on their own see the exception.
+    """
+
+    def __init__(self, name, call_batch, max_batch=8, max_wait_ms=10):
+        self.name = name
+        self.call_batch = call_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        # Batches that raised and were retried one input at a time
+        self.fallbacks = 0
+        self.thread = threading.Thread(target=self._worker, name=f"batch-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, item, options):
+        future = Future()
+        self.requests.put((item, options, future))
+        return future.result()
+
+    def _collect(self):
+        """Block for one request, then gather more for up to max_wait."""
+        pending = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(pending) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def _worker(self):
+        while True:
+            groups = {}
+            for item, options, future in self._collect():
+                groups.setdefault(repr(sorted(options.items())), []).append((item, options, future))
+            for group in groups.values():
+                inputs = [item for item, _, _ in group]
+                try:
+                    outputs = self.call_batch(inputs, group[0][1])
+                except Exception as e:
+                    if len(group) == 1:
+                        group[0][2].set_exception(e)
+                    else:
+                        # One bad input should not fail the rest of the batch: call each on its own
+                        self.fallbacks += 1
+                        for single in group:
+                            self._call_one(*single)
+                    continue
+                self._record(len(group))
+                for (_, _, future), output in zip(group, outputs):
+                    future.set_result(output)
+
+    def _call_one(self, item, options, future):
+        try:
+            output = self.call_batch([item], options)[0]
+        except Exception as e:
+            future.set_exception(e)
+            return
+        self._record(1)
+        future.set_result(output)
+
+    def _record(self, size):
+        self.batches += 1
+        self.items += size
+        self.largest = max(self.largest, size)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "meanBatch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largestBatch": self.largest,
+            "fallbacks": self.fallbacks
+        }
+
+
+class BatchedModel:
+    """Stands in for a model object; calls go through a MicroBatcher, everything else to the model."""
+
+    def __init__(self, model, batcher):
+        self.model = model
+        self.batcher = batcher
+
+    def __call__(self, inputs, **options):
+        return self.batcher.submit(inputs, options)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def spacy_batch(nlp):
+    return lambda texts, options: list(nlp.pipe(texts))
+
+
+def pipeline_batch(pipe, batchable):
+    """Batch calls for a transformers pipeline; the ONNX classes take one input at a time."""
+    def call(inputs, options):
+        if not batchable or len(inputs) == 1:
+            return [pipe(item, **options) for item in inputs]
+        return pipe(inputs, batch_size=len(inputs), **options)
+    return call
+
+
+def install_batching(max_batch=8, max_wait_ms=10):
+    """Route the extractor's model calls through micro-batchers; returns them by name."""
+    batchers = {}
+    if not nlp_extractor.models_loaded:
+        return batchers
+    batchable = nlp_extractor.INFERENCE_BACKEND == "pytorch"
+    batchers["spacy"] = MicroBatcher("spacy", spacy_batch(nlp_extractor.nlp), max_batch, max_wait_ms)
+    nlp_extractor.nlp = BatchedModel(nlp_extractor.nlp, batchers["spacy"])
+    batchers["zero-shot"] = MicroBatcher("zero-shot", pipeline_batch(nlp_extractor.classifier, batchable),
+                                         max_batch, max_wait_ms)
+    nlp_extractor.classifier = BatchedModel(nlp_extractor.classifier, batchers["zero-shot"])
+    if nlp_extractor.ENTITY_MODE == "cascade":
+        ner = nlp_extractor.get_ner_pipeline()
+        batchers["ner"] = MicroBatcher("ner", pipeline_batch(ner, batchable), max_batch, max_wait_ms)
+        nlp_extractor.ner_pipeline = BatchedModel(ner, batchers["ner"])
+    return batchers
+
+
+class ExtractionService:
+    """Runs articles from concurrent requests on a bounded worker pool."""
+
+    def __init__(self, cache=None, stage_store=None, workers=4, max_queue=64, max_batch=8, max_wait_ms=10,
+                 dedup=None, gate=None):
+        self.cache = cache
+        self.dedup = dedup
+        self.gate = gate
+        self.stage_store = stage_store
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+        self.workers = workers
+        self.max_queue = max(1, max_queue)
+        self.batchers = install_batching(max_batch, max_wait_ms)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.counts = Counter()
+        self.latencies = deque(maxlen=1000)
+        self.started = time.time()
+
+    def runner(self):
+        """One StageRunner per worker thread; they share the stage store."""
+        if not hasattr(self.local, "runner"):
+            self.local.runner = StageRunner(store=self.stage_store)
+        return self.local.runner
+
+    def admit(self, count):
+        with self.lock:
+            if self.queued + count > self.max_queue:
+                self.counts["rejected"] += 1
+                raise Saturated(f"{self.queued} articles queued, limit {self.max_queue}")
+            self.queued += count
+            self.counts["requests"] += 1
+
+    def extract_item(self, item, index):
+        source = item.get("source") or f"article-{index}.html"
+        started = time.perf_counter()
+        failed = False
+        try:
+            if item.get("html"):
+                result = nlp_extractor.process_html(item["html"], source, self.cache, self.runner(), self.dedup,
+                                                    self.gate)
+            else:
+                article_data = {
+                    "title": item.get("title") or "",
+                    "content": item.get("content") or "",
+                    "html_path": source,
+                    "extraction_method": "request_json"
+                }
+                self.runner().begin_article(source)
+                result = nlp_extractor.process_content(article_data, source, self.cache, self.runner(),
+                                                       self.dedup, self.gate)
+            if item.get("url"):
+                result["url"] = item["url"]
+        except Exception as e:
+            print(f"Error processing {source}: {str(e)}")
+            failed = True
+            result = {
+                "error": str(e),
+                "source": source,
+                "processedAt": datetime.datetime.now().isoformat()
+            }
+        with self.lock:
+            self.queued -= 1
+            self.counts["articles"] += 1
+            self.counts["failed"] += int(failed)
+            self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def extract(self, items):
+        """Process items concurrently and return their results in order; raises Saturated when full."""
+        self.admit(len(items))
+        futures = [self.pool.submit(self.extract_item, item, index) for index, item in enumerate(items)]
+        return [future.result() for future in futures]
+
+    def health(self):
+        return {
+            "status": "ok" if nlp_extractor.models_loaded else "degraded",
+            "modelsLoaded": nlp_extractor.models_loaded,
+            "entityMode": nlp_extractor.ENTITY_MODE,
+            "queued": self.queued,
+            "maxQueue": self.max_queue
+        }
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        stats = dict(self.health(), **{
+            "uptimeSeconds": round(time.time() - self.started, 1),
+            "workers": self.workers,
+            "requests": self.counts["requests"],
+            "articles": self.counts["articles"],
+            "failed": self.counts["failed"],
+            "rejected": self.counts["rejected"],
+            "articleP50Ms": round(percentile(latencies, 0.5) * 1000, 1),
+            "articleP95Ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "batching": {name: batcher.stats() for name, batcher in self.batchers.items()}
+        })
+        if self.dedup is not None:
+            stats["nearDuplicates"] = {"checked": self.dedup.checked, "matched": self.dedup.matched,
+                                       "threshold": self.dedup.threshold}
+        if self.gate is not None:
+            stats["relevanceGate"] = self.gate.stats()
+        return stats
+
+
+def request_items(body, content_type, query):
+    """Turn a request body into (items, single) where single means one result is returned unwrapped."""
+    if "json" not in content_type:
+        source = (query.get("source") or [None])[0]
+        return [{"html": body.decode("utf-8", errors="replace"), "source": source}], True
+    payload = json.loads(body)
+    if isinstance(payload, list):
+        return payload, False
+    if isinstance(payload, dict) and "articles" in payload:
+        return payload["articles"], False
+    return [payload], True
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    service = None
+    max_body = 20 * 1024 * 1024
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, self.service.health())
+        elif path == "/stats":
+            self.send_json(200, self.service.stats())
+        else:
+            self.send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/extract":
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.max_body:
+            self.send_json(413, {"error": f"Body larger than {self.max_body} bytes"})
+            return
+        try:
+            items, single = request_items(self.rfile.read(length), self.headers.get("Content-Type", ""),
+                                          parse_qs(url.query))
+            if not items or not all(isinstance(item, dict) for item in items):
+                raise ValueError("expected an article object or a list of article objects")
+        except ValueError as e:
+            self.send_json(400, {"error": f"Invalid request: {str(e)}"})
+            return
+        if len(items) > self.service.max_queue:
+            # Retrying would never help, unlike a 503
+            self.send_json(413, {"error": f"{len(items)} articles exceed the queue limit of "
+                                          f"{self.service.max_queue}; split the batch"})
+            return
+        try:
+            results = self.service.extract(items)
+        except Saturated as e:
+            self.send_json(503, {"error": f"Service saturated: {str(e)}"}, {"Retry-After": "1"})
+            return
+        self.send_json(200, results[0] if single else {"results": results})
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve nlp_extractor over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4, help="Articles processed concurrently")
+    parser.add_argument("--max-queue", type=int, default=64, help="Queued + running articles before 503")
+    parser.add_argument("--max-batch", type=int, default=8, help="Largest batched model call")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="How long a model call waits for company")
+    parser.add_argument("--max-body-mb", type=float, default=20)
+    parser.add_argument("--cache-dir", help="Result and stage cache, as for nlp_extractor.py")
+    parser.add_argument("--dedup-db", help="Near-duplicate index, as for nlp_extractor.py")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--relevance-gate", action="store_true", help="Light extraction for non-crime articles")
+    parser.add_argument("--relevance-min-score", type=int, default=DEFAULT_MIN_SCORE)
+    parser.add_argument("--entity-mode", choices=nlp_extractor.ENTITY_MODES, default=nlp_extractor.ENTITY_MODE)
+    options = parser.parse_args()
+
+    nlp_extractor.ENTITY_MODE = options.entity_mode
+    cache = stage_store = None
+    if options.cache_dir:
+        results_dir, stages_dir = cache_paths(options.cache_dir)
+        cache = ResultCache(results_dir)
+        stage_store = ResultCache(stages_dir)
+    dedup = NearDuplicateIndex(options.dedup_db, options.dedup_threshold) if options.dedup_db else None
+    gate = RelevanceGate(options.relevance_min_score) if options.relevance_gate else None
+
+    ExtractionHandler.service = ExtractionService(cache, stage_store, options.workers, options.max_queue,
+                                                  options.max_batch, options.max_wait_ms, dedup, gate)
+    ExtractionHandler.max_body = int(options.max_body_mb * 1024 * 1024)
+    server = ThreadingHTTPServer((options.host, options.port), ExtractionHandler)
+    server.daemon_threads = True
+    print(f"Serving extraction on http://{options.host}:{options.port} "
+          f"({options.workers} workers, queue limit {options.max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down")
+    finally:
+        server.server_close()
+        ExtractionHandler.service.pool.shutdown(wait=True)
+        if cache is not None:
+            cache.save_stats()
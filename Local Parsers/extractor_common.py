@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from result_cache import ResultCache
+from stage_runner import StageRunner, cache_paths
+from result_writers import ParquetWriter
+from article_index import ArticleIndex
+from stage_metrics import StageMetrics
+from memory_metrics import MemoryTracker
+from stage_profiler import StageProfiler
+from near_duplicates import NearDuplicateIndex, DEFAULT_THRESHOLD
+from relevance_gate import RelevanceGate, DEFAULT_MIN_SCORE
+
+# Pieces shared by nlp_extractor.py and nlp_extractor_gpu.py.
+#
+# The helpers take the extractor module itself and look its models, stage
+# tables and pattern functions up when called, so they see models loaded
+# after import and the stand-ins benchmark.py installs.
+
+# Pattern-based fields: (result field, stage name, extractor function).
+# Near-duplicates recompute them and gated articles keep them.
+PATTERN_FIELDS = [
+    ("victims", "victims", "extract_victims"),
+    ("sentences", "sentences", "extract_sentences"),
+    ("charges", "charges", "extract_charges"),
+    ("moneyAmounts", "money_amounts", "extract_money_amounts"),
+    ("drugQuantities", "drug_quantities", "extract_drug_quantities")
+]
+
+COMMON_USAGE = (
+    "[--cache-dir DIR] [--cache-max-mb N] [--cache-max-age-days N] [--fsync-every N] "
+    "[--parquet-dir DIR] [--index-db PATH] [--metrics-file PATH] [--track-memory] [--tracemalloc] "
+    "[--memory-ceiling-mb N] [--profile DIR] [--profile-every N] [--profile-mode sample|cprofile|both] "
+    "[--profile-slower-than-ms N] [--dedup-db PATH] [--dedup-threshold 0..1] [--relevance-gate] "
+    "[--relevance-min-score N]"
+)
+
+
+def stage_version(extractor, name):
+    """Return the full version of a stage, including the model it runs when model-backed."""
+    version = extractor.STAGE_VERSIONS[name]
+    model_id = extractor.STAGE_MODELS.get(name)
+    if model_id is None:
+        return version
+    if not extractor.models_loaded:
+        return f"{version}:{model_id}:unloaded"
+    spacy_version = f"{extractor.SPACY_MODEL}-{extractor.nlp.meta.get('version', '')}"
+    if model_id == extractor.SPACY_MODEL:
+        return f"{version}:{spacy_version}"
+    precisions = getattr(extractor, "STAGE_PRECISIONS", {})
+    backend = getattr(extractor, "INFERENCE_BACKEND", "pytorch")
+    precision = precisions.get(name, "fp32")
+    suffix = "" if precision == "fp32" else f":{precision}"
+    if name in precisions and backend != "pytorch":
+        suffix += f":{backend}"
+    if name == "cascade_entities":
+        # spaCy runs first in the cascade, so its version matters too
+        suffix += f"+{spacy_version}"
+    return f"{version}:{model_id}{suffix}"
+
+
+def pattern_fields(extractor, content, stage):
+    """Run the pattern-based stages on content through stage(name, func, *args)."""
+    return {field: stage(name, getattr(extractor, func), content) for field, name, func in PATTERN_FIELDS}
+
+
+def patch_near_duplicate(extractor, match, article_data, source, stage):
+    """Result for a near-duplicate of an earlier article.
+
+    The model-derived fields (entities, perpetrators, timeline, categories)
+    are taken from the earlier result; the cheap pattern-based fields are
+    recomputed on this article's content, so edited figures are picked up.
+    """
+    content = article_data["content"]
+    result = dict(match["result"])
+    result.update({
+        "title": article_data["title"],
+        "content": content,
+        "source": source,
+        "processedAt": datetime.datetime.now().isoformat(),
+        **pattern_fields(extractor, content, stage),
+        **(article_data.get("page") or {}),
+        "nearDuplicateOf": match["source"],
+        "similarity": round(match["similarity"], 3)
+    })
+    return result
+
+
+def light_result(extractor, article_data, source, stage, score):
+    """Result for an article the relevance gate kept from the models: the pattern-based fields only."""
+    content = article_data["content"]
+    return {
+        "title": article_data["title"],
+        "content": content,
+        "source": source,
+        "processedAt": datetime.datetime.now().isoformat(),
+        "locations": [],
+        "organizations": [],
+        "timeline": [],
+        "perpetrators": [],
+        **pattern_fields(extractor, content, stage),
+        "categories": [],
+        **(article_data.get("page") or {}),
+        "relevance": score,
+        "gated": True
+    }
+
+
+def pop_flag(args, name):
+    """Remove a bare "--name" flag from args and return whether it was present."""
+    if name in args:
+        args.remove(name)
+        return True
+    return False
+
+
+def pop_option(args, name, default=None):
+    """Remove "--name value" from args and return the value."""
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1] if index + 1 < len(args) else default
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def pop_common_options(args):
+    """Remove the options both extractors take (COMMON_USAGE) from args and return them by name."""
+    return {
+        "cache_dir": pop_option(args, "--cache-dir"),
+        "cache_max_mb": pop_option(args, "--cache-max-mb"),
+        "cache_max_age_days": pop_option(args, "--cache-max-age-days"),
+        "fsync_every": int(pop_option(args, "--fsync-every", 10)),
+        "parquet_dir": pop_option(args, "--parquet-dir"),
+        "index_db": pop_option(args, "--index-db"),
+        "metrics_file": pop_option(args, "--metrics-file"),
+        "memory_ceiling_mb": pop_option(args, "--memory-ceiling-mb"),
+        "track_memory": pop_flag(args, "--track-memory"),
+        "use_tracemalloc": pop_flag(args, "--tracemalloc"),
+        "profile_dir": pop_option(args, "--profile"),
+        "profile_every": int(pop_option(args, "--profile-every", 1)),
+        "profile_mode": pop_option(args, "--profile-mode", "both"),
+        "profile_slower_than_ms": pop_option(args, "--profile-slower-than-ms"),
+        "dedup_db": pop_option(args, "--dedup-db"),
+        "dedup_threshold": float(pop_option(args, "--dedup-threshold", DEFAULT_THRESHOLD)),
+        "relevance_gate": pop_flag(args, "--relevance-gate"),
+        "relevance_min_score": int(pop_option(args, "--relevance-min-score", DEFAULT_MIN_SCORE))
+    }
+
+
+def build_pipeline(options):
+    """Return (cache, runner, profiler, dedup, gate) for the options from pop_common_options."""
+    # Whole-article results and per-stage outputs live side by side under --cache-dir
+    cache = None
+    memory = None
+    memory_ceiling_mb = options["memory_ceiling_mb"]
+    if options["track_memory"] or options["use_tracemalloc"] or memory_ceiling_mb:
+        memory = MemoryTracker(options["use_tracemalloc"], float(memory_ceiling_mb) if memory_ceiling_mb else None)
+    runner = StageRunner(metrics=StageMetrics(options["metrics_file"], memory))
+    slower_than_ms = options["profile_slower_than_ms"]
+    profiler = StageProfiler(options["profile_dir"], options["profile_every"], options["profile_mode"],
+                             slower_than_ms=float(slower_than_ms) if slower_than_ms else None)
+    if options["cache_dir"]:
+        results_dir, stages_dir = cache_paths(options["cache_dir"])
+        max_bytes = int(float(options["cache_max_mb"]) * 1024 * 1024) if options["cache_max_mb"] else None
+        max_age_days = float(options["cache_max_age_days"]) if options["cache_max_age_days"] else None
+        cache = ResultCache(results_dir, max_bytes=max_bytes, max_age_days=max_age_days)
+        runner.store = ResultCache(stages_dir, max_bytes=max_bytes, max_age_days=max_age_days)
+    dedup = NearDuplicateIndex(options["dedup_db"], options["dedup_threshold"]) if options["dedup_db"] else None
+    gate = RelevanceGate(options["relevance_min_score"]) if options["relevance_gate"] else None
+    return cache, runner, profiler, dedup, gate
+
+
+def build_sinks(options):
+    """Extra result sinks for a folder run: Parquet files and the article index."""
+    sinks = []
+    if options["parquet_dir"]:
+        sinks.append(ParquetWriter(options["parquet_dir"]))
+    if options["index_db"]:
+        sinks.append(ArticleIndex(options["index_db"]))
+    return sinks
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import errno
+import fnmatch
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Watch-folder ingestion for the extractors (--watch).
+#
+# New or rewritten files in the input folder are reported through inotify
+# (Linux, via libc) or, where that is unavailable, by polling the folder.
+# A file is only handed out once its size and mtime have stayed the same
+# for settle_seconds and, with inotify, its writer has closed it or renamed
+# it into place, so partially written articles are not parsed.  A file left
+# open longer than open_timeout_seconds is taken once it has settled.  An
+# empty file gets the same open_timeout_seconds to be written and is then
+# skipped until it changes.
+# Ready files are grouped into batches opportunistically: a batch goes out
+# as soon as it is full, when nothing else is still being written, or when
+# its oldest file has waited max_wait_seconds.
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+EVENT_HEADER = struct.Struct("iIII")
+
+# Seconds between checks for handed-out files that have since left the folder
+PRUNE_INTERVAL = 60.0
+
+
+def load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+libc = load_libc()
+inotify_available = libc is not None
+
+
+class InotifyEvents:
+    """Changes to files in one folder, as (name, complete) pairs.
+
+    complete is True when the writer closed the file or it was renamed into
+    the folder, False while it is still being written.
+    """
+
+    def __init__(self, folder):
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; return the changes (None after a queue overflow)."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        names = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; the caller rescans the folder
+                    return None
+                if name:
+                    names.append((os.fsdecode(name), bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingEvents:
+    """Fallback that rescans the folder; reports every file whose size or mtime changed.
+
+    Polling cannot see when a writer closes a file, so every change counts as
+    complete and only the settle time guards against partial writes.
+    """
+
+    def __init__(self, folder, interval=1.0):
+        self.folder = folder
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self.scan()
+        changed = [(name, True) for name, signature in snapshot.items() if self.snapshot.get(name) != signature]
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """Yields batches of fully written files from a folder as they arrive.
+
+    Files already in the folder are picked up first.  A file is handed out
+    again only if it is rewritten (new size or mtime).  batches() returns
+    when stop() is called or, with idle_exit_seconds, after that long with
+    nothing pending.
+    """
+
+    def __init__(self, folder, pattern="*.html", settle_seconds=0.5, batch_size=8, max_wait_seconds=1.0,
+                 poll_interval=1.0, idle_exit_seconds=None, open_timeout_seconds=30.0, use_inotify=True):
+        self.folder = folder
+        self.pattern = pattern
+        self.settle = settle_seconds
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_seconds
+        self.poll_interval = poll_interval
+        self.idle_exit = idle_exit_seconds
+        self.open_timeout = open_timeout_seconds
+        self.pending = {}   # path -> [signature, last change, ready since, complete]
+        # path -> signature of files handed out, and of empty files skipped
+        self.handed_out = {}
+        self.skipped = {}
+        self.last_prune = time.monotonic()
+        self.stopped = False
+        # Called before every wait, e.g. to write results finished in the background
+        self.on_wait = None
+        self.source = None
+        if use_inotify and inotify_available:
+            try:
+                self.source = InotifyEvents(folder)
+                self.mode = "inotify"
+            except OSError as e:
+                print(f"inotify unavailable ({str(e)}), polling {folder}")
+        if self.source is None:
+            self.source = PollingEvents(folder, poll_interval)
+            self.mode = "polling"
+
+    def stop(self):
+        self.stopped = True
+
+    def signature(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def touch(self, name, now, complete=True):
+        if not fnmatch.fnmatch(name, self.pattern):
+            return
+        path = os.path.join(self.folder, name)
+        signature = self.signature(path)
+        if signature is None or signature in (self.handed_out.get(path), self.skipped.get(path)):
+            return
+        entry = self.pending.get(path)
+        if entry is None or entry[0] != signature:
+            self.pending[path] = [signature, now, None, complete]
+        else:
+            # The latest event decides whether the writer is done
+            entry[3] = complete
+
+    def rescan(self, now):
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        for name in sorted(names):
+            self.touch(name, now)
+
+    def ready(self, now):
+        """Pending files unchanged for the settle time, oldest first."""
+        ready = []
+        for path, entry in list(self.pending.items()):
+            if now - entry[1] < self.settle:
+                continue
+            if not entry[3] and now - entry[1] < self.open_timeout:
+                # Still open for writing
+                continue
+            signature = self.signature(path)
+            if signature is None:
+                del self.pending[path]
+            elif signature != entry[0]:
+                # Still being written
+                self.pending[path] = [signature, now, None, entry[3]]
+            elif signature[0] == 0:
+                if now - entry[1] >= self.open_timeout:
+                    del self.pending[path]
+                    self.skipped[path] = signature
+            else:
+                if entry[2] is None:
+                    entry[2] = now
+                ready.append((entry[2], path))
+        return [path for _, path in sorted(ready)]
+
+    def prune(self, now):
+        """Forget handed-out and skipped files no longer in the folder."""
+        self.last_prune = now
+        for seen in (self.handed_out, self.skipped):
+            for path in [path for path in seen if not os.path.exists(path)]:
+                del seen[path]
+
+    def batches(self):
+        self.rescan(time.monotonic())
+        last_activity = time.monotonic()
+        try:
+            while not self.stopped:
+                now = time.monotonic()
+                ready = self.ready(now)
+                settling = len(self.pending) - len(ready)
+                if ready:
+                    oldest = self.pending[ready[0]][2]
+                    if len(ready) >= self.batch_size or not settling or now - oldest >= self.max_wait:
+                        batch = ready[:self.batch_size]
+                        for path in batch:
+                            self.handed_out[path] = self.pending.pop(path)[0]
+                        last_activity = time.monotonic()
+                        yield batch
+                        continue
+                elif not self.pending and self.idle_exit is not None and now - last_activity >= self.idle_exit:
+                    return
+
+                if now - self.last_prune >= PRUNE_INTERVAL:
+                    self.prune(now)
+                if self.on_wait is not None:
+                    self.on_wait()
+                timeout = self.settle / 2 if self.pending else self.poll_interval
+                changed = self.source.wait(max(0.05, timeout))
+                now = time.monotonic()
+                if changed is None:
+                    self.rescan(now)
+                    continue
+                for name, complete in changed:
+                    self.touch(name, now, complete)
+                if changed:
+                    last_activity = now
+        finally:
+            self.source.close()
@@ -0,0 +1,730 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import math
+import shutil
+import argparse
+import datetime
+import tempfile
+import subprocess
+import importlib.util
+from decimal import Decimal, ROUND_HALF_UP
+from email.utils import parsedate_to_datetime
+
+from bs4 import BeautifulSoup
+
+# Pure-Python port of localFullArticleParser.js.
+#
+# build_report() returns the report.json entry processFolder() builds for an
+# article (same fields, order and values) from one BeautifulSoup parse, and
+# page_fields() gives the page-level part of it (url, intro, date, imageUrl)
+# so the NLP extractors can add it from the soup they already parse.  The
+# regular expressions keep JavaScript semantics: \w, \d and \b are ASCII and
+# \s is JavaScript's whitespace set.  Reports also carry the victims the JS
+# parser computes but never wrote.  Lengths and offsets count code points,
+# not UTF-16 units, so text with characters outside the BMP can differ; the
+# parity mode (--compare / --run-js) reports any other difference.
+#
+# cheerio.load() parses with parse5, which follows the HTML5 algorithm: an
+# unclosed <p> ends at the next block element and stray end tags are dropped.
+# html5lib implements the same algorithm, so it is used when installed.
+# html.parser is faster but nests unclosed paragraphs, so pages with broken
+# markup can come out differently with it.
+
+html5lib_available = importlib.util.find_spec("html5lib") is not None
+HTML_PARSER = "html5lib" if html5lib_available else "html.parser"
+
+BASE_URL = "https://www.nationalcrimeagency.gov.uk"
+
+UK_LOCATIONS = [
+    'London', 'Manchester', 'Birmingham', 'Leeds', 'Liverpool', 'Glasgow', 'Edinburgh',
+    'Bristol', 'Sheffield', 'Newcastle', 'Nottingham', 'Cardiff', 'Belfast', 'Derby',
+    'Leicester', 'Southampton', 'Portsmouth', 'Brighton', 'Plymouth', 'Aberdeen',
+    'Greater London', 'West Midlands', 'Greater Manchester', 'West Yorkshire',
+    'South Yorkshire', 'West Country', 'East Anglia', 'Home Counties',
+    'Kent', 'Surrey', 'Essex', 'Hampshire', 'Devon', 'Lancashire', 'Cheshire',
+    'UK', 'England', 'Scotland', 'Wales', 'Northern Ireland', 'Republic of Ireland',
+    'Dover', 'Hull', 'Leicester', 'Bradford', 'Rotherham', 'Sunderland', 'Bolton',
+    'West London', 'East London', 'North London', 'South London', 'Midlands',
+    'Yorkshire', 'Merseyside', 'Teesside', 'Tyneside', 'Heathrow', 'Gatwick'
+]
+
+LAW_ENFORCEMENT_ORGS = [
+    'National Crime Agency', 'NCA', 'Metropolitan Police', 'Met Police', 'Police Scotland',
+    'City of London Police', 'British Transport Police', 'Border Force', 'HM Revenue & Customs',
+    'Crown Prosecution Service', 'CPS', 'National Police Chiefs Council', 'Interpol', 'Europol',
+    'Organised Crime Partnership', 'OCP', 'Armed Operations Unit', 'Home Office Immigration Enforcement',
+    'Cleveland Police', 'West Midlands Police', 'Derbyshire Police', 'Metropolitan Police', 'HMRC'
+]
+
+VICTIM_KEYWORDS = [
+    'victim', 'victims', 'targeted', 'assaulted', 'injured', 'killed', 'murdered',
+    'exploited', 'abused', 'harmed', 'attacked', 'affected', 'vulnerable', 'survivor',
+    'survivors', 'child victims', 'sexually exploited', 'trafficked', 'missing person',
+    'migrants', 'minor', 'minors', 'young girl', 'young boy', 'children'
+]
+
+PERP_KEYWORDS = [
+    'arrested', 'charged', 'convicted', 'sentenced', 'pleaded', 'admitted', 'defendant',
+    'accused', 'suspect', 'perpetrator', 'offender', 'gang member', 'conspirator',
+    'smuggler', 'trafficker', 'dealer', 'criminal', 'ringleader', 'mastermind', 'fugitive'
+]
+
+CATEGORY_KEYWORDS = {
+    'Drug trafficking': ['drug', 'cocaine', 'heroin', 'cannabis', 'ketamine', 'amphetamine', 'class A', 'narcotic'],
+    'Firearms': ['gun', 'firearm', 'pistol', 'weapon', 'ammunition', 'shotgun', 'rifle'],
+    'Money laundering': ['money laundering', 'launder', 'cash', 'financial', 'proceeds of crime'],
+    'People smuggling': ['smuggling', 'small boat', 'migrant', 'channel crossing', 'immigration'],
+    'Human trafficking': ['trafficking', 'modern slavery', 'forced labor', 'exploitation'],
+    'Child sexual abuse': ['child', 'sexual abuse', 'indecent', 'sexual exploitation'],
+    'Cyber crime': ['cyber', 'online', 'internet', 'dark web', 'hack', 'ransomware'],
+    'Organized crime': ['organised crime', 'organized crime', 'criminal group', 'gang', 'network'],
+    'Fraud': ['fraud', 'scam', 'counterfeit', 'fake', 'forgery']
+}
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+
+# Fields of a report.json entry, in processFolder's order (victims added)
+REPORT_FIELDS = ("title", "content", "source", "processedAt", "locations", "organizations", "timeline",
+                 "perpetrators", "victims", "sentences", "charges", "moneyAmounts", "drugQuantities",
+                 "categories", "url", "intro", "date", "imageUrl")
+PAGE_FIELDS = ("url", "intro", "date", "imageUrl")
+
+ARTICLE_PARAGRAPHS = 'article p, .uk-article p, .tm-main p'
+
+# JavaScript's \s, which is also what String.prototype.trim() strips
+JS_SPACE = "\t\n\v\f\r \u00a0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+JS_TRIM = "\t\n\v\f\r \u00a0\u1680" + "".join(map(chr, range(0x2000, 0x200b))) + "\u2028\u2029\u202f\u205f\u3000\ufeff"
+
+
+def js_regex(pattern, flags=0):
+    """Compile a JavaScript regular expression: ASCII \\w, \\d and \\b, JavaScript's \\s."""
+    translated = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern):
+            if pattern[i + 1] == 's':
+                translated.append(JS_SPACE if in_class else f"[{JS_SPACE}]")
+            else:
+                translated.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        translated.append(char)
+        i += 1
+    return re.compile("".join(translated), flags | re.ASCII)
+
+
+def js_trim(text):
+    return text.strip(JS_TRIM)
+
+
+def js_number(value):
+    """A float as JSON.stringify would write it: integral values without .0, NaN as null."""
+    if math.isnan(value) or math.isinf(value):
+        return None
+    if value.is_integer() and abs(value) < 1e21:
+        return int(value)
+    return value
+
+
+def js_number_text(value):
+    """A number as JavaScript turns it into a string."""
+    if math.isnan(value):
+        return "NaN"
+    number = js_number(value)
+    return str(number) if number is not None else ("Infinity" if value > 0 else "-Infinity")
+
+
+def js_parse_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
+
+
+LOCATION_PATTERNS = [js_regex(r'\b' + location + r'\b', re.IGNORECASE) for location in UK_LOCATIONS]
+POSTCODE_PATTERN = js_regex(r'([A-Z]{1,2}\d{1,2}[A-Z]?\s\d[A-Z]{2})')
+LOCATION_CONTEXT_PATTERNS = [
+    js_regex(r'(?:in|near|from|at)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'),
+    js_regex(r'([A-Z][a-z]+\s(?:City|Town|Village|County))\b'),
+    js_regex(r'[A-Z][a-z]+ (?:Street|Road|Avenue|Lane|Park|Square)'),
+    js_regex(r'(?:port of|area of|region of)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)')
+]
+PERSON_PATTERNS = [
+    js_regex(r'(\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2}\b)(?:\s*,\s*(\d{1,2}))?(?:\s*,\s*(?:from|of)\s+'
+             r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*))?\s+(?:was|has been|had been|is|were|have been)\s+'
+             r'(?:arrested|charged|convicted|jailed|sentenced|found guilty)'),
+    js_regex(r'(\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2}\b)(?:\s*,\s*(\d{1,2}))?(?:\s*,\s*(?:from|of)\s+'
+             r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*))?\s+(?:pleaded|admitted)')
+]
+NAME_PATTERN = js_regex(r'(\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2}\b)')
+AGE_PATTERNS = [
+    js_regex(r'\b(?:aged|age)\s+(\d{1,2})\b'),
+    js_regex(r'(\d{1,2})\s+(?:year|years)\s+old'),
+    js_regex(r'(\d{1,2})-year-old')
+]
+PERSON_LOCATION_PATTERNS = [
+    js_regex(r'(?:from|in|of|residing in)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'),
+    js_regex(r'(?:address in|house in|property in)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)')
+]
+ORGANIZATION_PATTERNS = [
+    js_regex(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(Police|Unit|Task Force|Agency|Force)\b'),
+    js_regex(r'(?:working with|partnered with|alongside)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'),
+    js_regex(r'(?:Operation|op)\s+([A-Z][a-z]+)'),
+    js_regex(r'([A-Z][A-Z0-9]+)\s+(?:officers|investigation|operation)')
+]
+DATE_PATTERNS = [
+    js_regex(r'\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}'),
+    js_regex(r'\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}'),
+    js_regex(r'(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th)?,\s+\d{4}'),
+    js_regex(r'\d{4}-\d{2}-\d{2}'),
+    js_regex(r'(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday),\s+\w+\s+\d{1,2},\s+\d{4}')
+]
+YEAR_MENTION_PATTERN = js_regex(r'\b(in|during|since|from|until|by|before|after)\s+(\d{4})\b')
+SENTENCE_PATTERNS = [
+    js_regex(r'sentenced to\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'jailed for\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'imprisonment of\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'(?:received|given) (?:a|an)\s+([^\.;]+)\s+(?:sentence|term|custodial)', re.IGNORECASE),
+    js_regex(r'ordered to (?:pay|forfeit|repay)\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'(\d+[- ](?:year|month)(?:s)?\s+(?:sentence|imprisonment|jail term|custodial sentence))', re.IGNORECASE),
+    js_regex(r'(\d+\s+years?\s+(?:and|&)\s+\d+\s+months?)', re.IGNORECASE)
+]
+CHARGE_PATTERNS = [
+    js_regex(r'(?:pleaded guilty to|admitted|convicted of|charged with)\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'(?:charges of|accused of|committed)\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'found guilty of\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'arrested (?:on suspicion of|for)\s+([^\.;]+)', re.IGNORECASE),
+    js_regex(r'prosecuted for\s+([^\.;]+)', re.IGNORECASE)
+]
+MONEY_PATTERNS = [
+    js_regex(r'£\s*([\d,]+(?:\.\d+)?)\s*(million|billion|k|thousand)?'),
+    js_regex(r'(\d[\d,]*(?:\.\d+)?)\s*(million|billion|k|thousand)?\s*pounds', re.IGNORECASE),
+    js_regex(r'(\d[\d,]*(?:\.\d+)?)\s*(million|billion|k|thousand)?\s*sterling', re.IGNORECASE)
+]
+MULTIPLIERS = {"thousand": 1e3, "k": 1e3, "million": 1e6, "billion": 1e9}
+DRUG_UNITS = r'(kg|kilo|kilos|kilogram|kilograms|grams?|tonnes?|lb|pounds?)'
+# (pattern, whether the substance comes before the quantity)
+DRUG_PATTERNS = [
+    (js_regex(r'(\d+(?:\.\d+)?)\s*' + DRUG_UNITS + r'\s+(?:of\s+)?(\w+)', re.IGNORECASE), False),
+    (js_regex(r'(\d+(?:\.\d+)?)\s*' + DRUG_UNITS + r'\s+(?:worth of\s+)?(\w+)', re.IGNORECASE), False),
+    (js_regex(r'(\w+)\s+weighing\s+(\d+(?:\.\d+)?)\s*' + DRUG_UNITS, re.IGNORECASE), True)
+]
+DRUG_CLASS_PATTERN = js_regex(r'class\s+[A-D]', re.IGNORECASE)
+DRUG_CLASS_NAME_PATTERN = js_regex(r'class\s+[A-D]\s+\w+', re.IGNORECASE)
+SPACE_RUN = js_regex(r'\s+')
+INTRO_SPLIT = js_regex(r'\.\s+')
+
+
+def element_text(element):
+    return element.get_text() if element is not None else ""
+
+
+def first(soup, selector):
+    return soup.select_one(selector)
+
+
+def extract_title(soup):
+    for selector in ['h1.uk-article-title', 'h1.page-header', 'article h1', 'meta[property="og:title"]', 'title']:
+        element = first(soup, selector)
+        if element is not None:
+            title = element.get('content') or js_trim(element_text(element))
+            if title and title != 'News':
+                return title.replace(' - National Crime Agency', '', 1)
+    return 'No title found'
+
+
+def paragraph_texts(elements):
+    return [text for text in (js_trim(element_text(p)) for p in elements) if len(text) > 0]
+
+
+def extract_content(soup):
+    """Paragraphs of the article body joined by blank lines, as extractContent() picks them."""
+    paragraphs = []
+    for selector in ['article p', '.uk-article p', '.tm-main p', '.article-body p', '.content-area p',
+                     '.entry-content p', '.main-content p']:
+        selected = paragraph_texts(soup.select(selector))
+        if len(selected) > len(paragraphs):
+            paragraphs = selected
+    if not paragraphs:
+        for container in ['article', '.article', '.post', '.entry', 'main', '.content', '#content',
+                          '.main-content', '.article-content']:
+            if soup.select_one(container) is not None:
+                paragraphs = paragraph_texts(soup.select(f"{container} p"))
+                if paragraphs:
+                    break
+    if not paragraphs:
+        paragraphs = paragraph_texts(soup.find_all('p'))
+    return "\n\n".join(paragraphs)
+
+
+def extract_intro(soup, content):
+    first_paragraph = js_trim(element_text(first(soup, ARTICLE_PARAGRAPHS)))
+    if first_paragraph and 20 < len(first_paragraph) < 300:
+        return first_paragraph
+    if content:
+        sentences = INTRO_SPLIT.split(content)
+        return sentences[0] + ('. ' + sentences[1] if len(sentences) > 1 else '')
+    return ''
+
+
+def resolve_url(src):
+    if src.startswith('http'):
+        return src
+    if src.startswith('/'):
+        return f"{BASE_URL}{src}"
+    return f"{BASE_URL}/{src}"
+
+
+def extract_main_image(soup):
+    for selector in ['.tm-article-image img', 'article img', '.uk-article img', 'meta[property="og:image"]',
+                     '.tm-main img']:
+        element = first(soup, selector)
+        if element is not None:
+            src = element.get('content') or element.get('src')
+            if src:
+                return resolve_url(src)
+    return ''
+
+
+def create_url_from_title(title):
+    if not title:
+        return ''
+    slug = js_regex(r'[^\w\s-]').sub('', title.lower())
+    slug = js_regex(r'\s+').sub('-', slug)
+    slug = re.sub(r'-+', '-', slug)
+    return BASE_URL + "/news/" + slug
+
+
+def determine_categories(content, title):
+    combined_text = content.lower() + ' ' + title.lower()
+    return [category for category, keywords in CATEGORY_KEYWORDS.items()
+            if any(keyword.lower() in combined_text for keyword in keywords)]
+
+
+def unique(values):
+    """Values in first-seen order without repeats, like Array.from(new Set(values))."""
+    return list(dict.fromkeys(values))
+
+
+def extract_locations(content):
+    locations = [postcode.upper() for postcode in POSTCODE_PATTERN.findall(content)]
+    locations += [location for location, pattern in zip(UK_LOCATIONS, LOCATION_PATTERNS) if pattern.search(content)]
+    for pattern in LOCATION_CONTEXT_PATTERNS:
+        for match in pattern.finditer(content):
+            location = js_trim(match.group(1) if pattern.groups and match.group(1) else match.group(0))
+            if location and len(location) > 3:
+                locations.append(location)
+    return unique(locations)
+
+
+def get_context(text, term, window_size):
+    index = text.find(term)
+    if index == -1:
+        return ''
+    return text[max(0, index - window_size):min(len(text), index + len(term) + window_size)]
+
+
+def extract_age(context):
+    for pattern in AGE_PATTERNS:
+        match = pattern.search(context)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def extract_location_from_context(context):
+    for pattern in PERSON_LOCATION_PATTERNS:
+        match = pattern.search(context)
+        if match:
+            return match.group(1)
+    return None
+
+
+def is_relevant_person(context, role):
+    lower_context = context.lower()
+    keywords = VICTIM_KEYWORDS if role == 'victim' else PERP_KEYWORDS
+    return any(keyword in lower_context for keyword in keywords)
+
+
+def extract_people(content, role):
+    """People whose surrounding text marks them as a perpetrator or victim (role)."""
+    people = []
+    for pattern in PERSON_PATTERNS:
+        for match in pattern.finditer(content):
+            name = match.group(1)
+            context = get_context(content, name, 150)
+            if is_relevant_person(context, role):
+                people.append({
+                    "name": name,
+                    "age": int(match.group(2)) if match.group(2) else extract_age(context),
+                    "location": match.group(3) or extract_location_from_context(context),
+                    "role": role,
+                    "context": SPACE_RUN.sub(' ', context)
+                })
+    found = {person["name"] for person in people}
+    for name in unique(NAME_PATTERN.findall(content)):
+        if name in found:
+            continue
+        context = get_context(content, name, 150)
+        if is_relevant_person(context, role):
+            people.append({
+                "name": name,
+                "age": extract_age(context),
+                "location": extract_location_from_context(context),
+                "role": role,
+                "context": SPACE_RUN.sub(' ', context)
+            })
+    return people
+
+
+def extract_victims(content):
+    """Names of the people the article describes as victims."""
+    return [person["name"] for person in extract_people(content, 'victim')]
+
+
+def extract_organizations(content):
+    organizations = [org for org in LAW_ENFORCEMENT_ORGS if org in content]
+    for pattern in ORGANIZATION_PATTERNS:
+        for match in pattern.finditer(content):
+            org = match.group(1) or match.group(0) or ''
+            if org and len(org) > 2:
+                organizations.append(org)
+    return unique(organizations)
+
+
+def parse_js_date(text):
+    """The datetime new Date(text) gives (local time), or None for an Invalid Date."""
+    text = text.strip()
+    try:
+        if re.fullmatch(r'\d{4}-\d{2}-\d{2}', text):
+            # Date-only ISO strings are UTC in JavaScript
+            parsed = datetime.datetime.fromisoformat(text).replace(tzinfo=datetime.timezone.utc)
+        else:
+            parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(text)
+        except (TypeError, ValueError, IndexError):
+            parsed = None
+        for date_format in ("%B %d, %Y", "%d %B %Y", "%b %d, %Y", "%d %b %Y", "%Y/%m/%d"):
+            if parsed is not None:
+                break
+            try:
+                parsed = datetime.datetime.strptime(text, date_format)
+            except ValueError:
+                pass
+    if parsed is None:
+        return None
+    return parsed.astimezone() if parsed.tzinfo else parsed
+
+
+def format_js_date(parsed):
+    """toLocaleDateString('en-GB', {day: '2-digit', month: 'long', year: 'numeric'})."""
+    if parsed is None:
+        return "Invalid Date"
+    return f"{parsed.day:02d} {MONTHS[parsed.month - 1]} {parsed.year}"
+
+
+def meta_date(soup):
+    for selector in ['meta[name="date"]', 'meta[property="article:published_time"]']:
+        element = first(soup, selector)
+        if element is not None and element.get('content'):
+            return element['content']
+    return None
+
+
+def extract_date_from_string(text):
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(0)
+    return None
+
+
+def last_paragraph(soup):
+    paragraphs = soup.select(ARTICLE_PARAGRAPHS)
+    return js_trim(element_text(paragraphs[-1])) if paragraphs else ''
+
+
+def time_text(soup):
+    return js_trim("".join(element.get_text() for element in soup.find_all('time')))
+
+
+def extract_timeline(content, soup):
+    dates = []
+    published = meta_date(soup)
+    if published:
+        dates.append(format_js_date(parse_js_date(published)))
+    for pattern in DATE_PATTERNS:
+        dates += [match.group(0) for match in pattern.finditer(content)]
+    dates += [match.group(0) for match in YEAR_MENTION_PATTERN.finditer(content)]
+    relative_date = time_text(soup)
+    if relative_date:
+        dates.append(relative_date)
+    last_paragraph_date = extract_date_from_string(last_paragraph(soup))
+    if last_paragraph_date:
+        dates.append(last_paragraph_date)
+    return unique(dates)
+
+
+def extract_date(content, soup):
+    published = meta_date(soup)
+    if published:
+        return format_js_date(parse_js_date(published))
+    date = extract_date_from_string(content) or extract_date_from_string(last_paragraph(soup))
+    if date:
+        return date
+    relative_date = time_text(soup)
+    if relative_date and re.search(r'\d', relative_date, re.ASCII):
+        return relative_date
+    return format_js_date(datetime.datetime.now())
+
+
+def extract_matches(content, patterns, min_length=0):
+    found = []
+    for pattern in patterns:
+        for match in pattern.finditer(content):
+            value = js_trim(match.group(1))
+            if value and value not in found and len(value) > min_length:
+                found.append(value)
+    return found
+
+
+def extract_sentences(content):
+    return extract_matches(content, SENTENCE_PATTERNS)
+
+
+def extract_charges(content):
+    return extract_matches(content, CHARGE_PATTERNS, min_length=5)
+
+
+def format_currency(amount):
+    """Intl.NumberFormat('en-GB', {style: 'currency', currency: 'GBP', maximumFractionDigits: 0})."""
+    if math.isnan(amount):
+        return "£NaN"
+    rounded = Decimal(repr(amount)).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    return f"£{int(rounded):,}"
+
+
+def extract_money_amounts(content):
+    amounts = []
+    for pattern in MONEY_PATTERNS:
+        for match in pattern.finditer(content):
+            amount = js_parse_float(match.group(1).replace(',', '')) * MULTIPLIERS.get((match.group(2) or '').lower(), 1)
+            amounts.append({
+                "original": js_trim(match.group(0)),
+                "amount": js_number(amount),
+                "formatted": format_currency(amount)
+            })
+    return amounts
+
+
+def convert_to_kg(quantity, unit):
+    unit_lower = unit.lower()
+    if 'kg' in unit_lower or 'kilo' in unit_lower:
+        return quantity
+    if 'gram' in unit_lower:
+        return quantity / 1000
+    if 'tonne' in unit_lower:
+        return quantity * 1000
+    if 'lb' in unit_lower or 'pound' in unit_lower:
+        return quantity * 0.453592
+    return quantity
+
+
+def extract_drug_quantities(content):
+    drugs = []
+    for pattern, substance_first in DRUG_PATTERNS:
+        for match in pattern.finditer(content):
+            if substance_first:
+                substance, quantity, unit = match.group(1).lower(), float(match.group(2)), match.group(3).lower()
+            else:
+                quantity, unit, substance = float(match.group(1)), match.group(2).lower(), match.group(3).lower()
+            if substance == 'class':
+                # "Class A drugs": take the class with the word after it
+                context_after = content[match.start():match.start() + 20]
+                if DRUG_CLASS_PATTERN.search(context_after):
+                    class_name = DRUG_CLASS_NAME_PATTERN.search(context_after)
+                    # The JS parser throws (and drops the article) when the word is cut off
+                    if class_name:
+                        substance = class_name.group(0).lower()
+            drugs.append({
+                "original": f"{js_number_text(quantity)} {unit} of {substance}",
+                "quantity": js_number(quantity),
+                "unit": unit,
+                "drug": substance,
+                "kgEquivalent": js_number(convert_to_kg(quantity, unit))
+            })
+    return drugs
+
+
+def js_timestamp():
+    """new Date().toISOString()"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return now.strftime("%Y-%m-%dT%H:%M:%S.") + f"{now.microsecond // 1000:03d}Z"
+
+
+def page_fields(soup):
+    """url, intro, date and imageUrl of an article page, as processFolder derives them."""
+    content = extract_content(soup)
+    return {
+        "url": create_url_from_title(extract_title(soup)),
+        "intro": extract_intro(soup, content),
+        "date": extract_date(content, soup),
+        "imageUrl": extract_main_image(soup)
+    }
+
+
+def build_report(soup, source):
+    """The report.json entry processFolder builds for a parsed article page."""
+    title = extract_title(soup)
+    content = extract_content(soup)
+    return {
+        "title": title,
+        "content": content,
+        "source": source,
+        "processedAt": js_timestamp(),
+        "locations": extract_locations(content),
+        "organizations": extract_organizations(content),
+        "timeline": extract_timeline(content, soup),
+        "perpetrators": [person["name"] for person in extract_people(content, 'perpetrator')],
+        "victims": extract_victims(content),
+        "sentences": extract_sentences(content),
+        "charges": extract_charges(content),
+        "moneyAmounts": extract_money_amounts(content),
+        "drugQuantities": extract_drug_quantities(content),
+        "categories": determine_categories(content, title),
+        "url": create_url_from_title(title),
+        "intro": extract_intro(soup, content),
+        "date": extract_date(content, soup),
+        "imageUrl": extract_main_image(soup)
+    }
+
+
+def parse_article(html, source, parser=None):
+    return build_report(BeautifulSoup(html, parser or HTML_PARSER), source)
+
+
+def html_files(folder):
+    """The folder's .html files in the order fs.readdirSync lists them."""
+    paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
+    return [path for path in paths if os.path.isfile(path) and os.path.splitext(path)[1].lower() == '.html']
+
+
+def process_folder(input_folder, output_folder, parser=None):
+    """Write report.json for every article in input_folder and return the reports.
+
+    parser is the BeautifulSoup tree builder (default HTML_PARSER).
+    """
+    reports = []
+    for file_path in html_files(input_folder):
+        try:
+            with open(file_path, 'rb') as f:
+                html = f.read().decode('utf-8', errors='replace')
+            reports.append(parse_article(html, os.path.basename(file_path), parser))
+        except Exception as e:
+            print(f"Error processing {file_path}: {str(e)}", file=sys.stderr)
+    output_path = os.path.join(output_folder, 'report.json')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(reports, f, indent=2, ensure_ascii=False)
+    return reports, output_path
+
+
+def compare_reports(python_reports, js_reports):
+    """Field-by-field differences between the two parsers' reports, matched on source.
+
+    processedAt always differs and victims only exists on the Python side, so
+    neither is compared.
+    """
+    js_by_source = {report.get("source"): report for report in js_reports}
+    fields = [field for field in REPORT_FIELDS if field not in ("processedAt", "victims")]
+    differences = []
+    matched = set()
+    for report in python_reports:
+        js_report = js_by_source.get(report["source"])
+        if js_report is None:
+            differences.append({"source": report["source"], "field": None, "python": "present", "js": "missing"})
+            continue
+        matched.add(report["source"])
+        for field in fields:
+            if report.get(field) != js_report.get(field):
+                differences.append({"source": report["source"], "field": field,
+                                    "python": report.get(field), "js": js_report.get(field)})
+    for source in js_by_source:
+        if source not in matched:
+            differences.append({"source": source, "field": None, "python": "missing", "js": "present"})
+    return differences
+
+
+def run_js(script, input_folder):
+    """Run localFullArticleParser.js on input_folder and return its reports."""
+    output_folder = tempfile.mkdtemp(prefix="nca-js-report-")
+    try:
+        subprocess.run(["node", script, input_folder, output_folder], check=True, capture_output=True, text=True)
+        with open(os.path.join(output_folder, 'report.json'), encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+
+def print_parity(python_reports, js_reports):
+    differences = compare_reports(python_reports, js_reports)
+    by_field = {}
+    for difference in differences:
+        by_field.setdefault(difference["field"] or "article", []).append(difference)
+    sources = {difference["source"] for difference in differences}
+    print(f"Parity: {len(python_reports)} Python reports, {len(js_reports)} JS reports, "
+          f"{len(sources)} articles differ", file=sys.stderr)
+    for field, entries in sorted(by_field.items()):
+        example = entries[0]
+        print(f"  {field}: {len(entries)} articles, e.g. {example['source']}: "
+              f"python={json.dumps(example['python'], ensure_ascii=False)[:200]} "
+              f"js={json.dumps(example['js'], ensure_ascii=False)[:200]}", file=sys.stderr)
+    return differences
+
+
+# Main execution
+if __name__ == "__main__":
+    # Drop-in for `node localFullArticleParser.js <input-folder> <output-folder>`
+    parser = argparse.ArgumentParser(description="Build report.json from saved article pages without Node")
+    parser.add_argument("input_folder")
+    parser.add_argument("output_folder")
+    parser.add_argument("--compare", metavar="REPORT", help="Compare with a report.json written by the JS parser")
+    parser.add_argument("--run-js", metavar="SCRIPT",
+                        help="Run localFullArticleParser.js on the same folder and compare with its output")
+    parser.add_argument("--differences", metavar="PATH", help="Write the parity differences as JSON")
+    parser.add_argument("--html-parser", choices=["html5lib", "html.parser"], default=HTML_PARSER,
+                        help=f"HTML parser (default {HTML_PARSER}; html5lib parses broken markup as cheerio does)")
+    options = parser.parse_args()
+
+    try:
+        reports, output_path = process_folder(options.input_folder, options.output_folder, options.html_parser)
+    except OSError as e:
+        print(f"Processing failed: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    if options.compare or options.run_js:
+        if options.compare:
+            with open(options.compare, encoding='utf-8') as f:
+                js_reports = json.load(f)
+        else:
+            js_reports = run_js(options.run_js, options.input_folder)
+        differences = print_parity(reports, js_reports)
+        if options.differences:
+            with open(options.differences, 'w', encoding='utf-8') as f:
+                json.dump(differences, f, indent=2, ensure_ascii=False)
+        sys.exit(1 if differences else 0)
+
+    # Same stdout as the JS parser, which the workflow's Code3 node reads
+    print(f"Processed {len(reports)} files. Output saved to {output_path}")
+    print(json.dumps(reports, indent=2, ensure_ascii=False))
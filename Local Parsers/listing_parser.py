@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+import datetime
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode
+
+from bs4 import BeautifulSoup
+
+from result_cache import content_hash
+
+# Incremental parsing of the NCA all-news listing.
+#
+# parse_listing() is the Python port of localParser.js (same selectors, same
+# fields).  A SeenStore remembers every article URL with a fingerprint of
+# its listing metadata, so diff() keeps only articles that are new or whose
+# title, intro, date, category or image changed.  The listing is newest
+# first, so a crawl follows the pagination only until a page with nothing
+# new on it; a steady-state run touches a page and a handful of articles.
+
+BASE_URL = "https://www.nationalcrimeagency.gov.uk"
+
+CATEGORY_SELECTORS = [
+    '.article-info .category-name',
+    '.tags-links',
+    '.category',
+    '.article-info-term',
+    '.tag-category',
+    '.tags',
+    '.article-meta .category'
+]
+IGNORED_CATEGORIES = ('article info', 'details', 'category')
+
+# Joomla lists 10 items per page and pages with ?start=N
+PAGE_SIZE = 10
+
+# Listing fields that make an already seen article worth fetching again
+FINGERPRINT_FIELDS = ("title", "intro", "date", "category", "imageUrl")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    url TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    title TEXT,
+    date TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    changed_at TEXT
+);
+"""
+
+
+def now_iso():
+    return datetime.datetime.now().isoformat()
+
+
+def clean_text(text):
+    """Collapse whitespace, as cleanText() in localParser.js."""
+    return re.sub(r'\s+', ' ', text).strip() if text else ""
+
+
+def absolute(url, base_url):
+    return url if not url or url.startswith("http") else urljoin(base_url, url)
+
+
+def item_category(item):
+    for selector in CATEGORY_SELECTORS:
+        element = item.select_one(selector)
+        if element is not None:
+            category = clean_text(element.get_text())
+            if category and category.lower() not in IGNORED_CATEGORIES:
+                return category
+    # Anything whose class mentions a category or tag
+    for element in item.find_all(True):
+        classes = " ".join(element.get("class") or [])
+        text = element.get_text().strip()
+        if ("cat" in classes or "tag" in classes) and text and len(text) < 30 \
+                and text.lower() not in ('article info', 'details'):
+            return clean_text(text)
+    return ""
+
+
+def parse_listing(html, base_url=BASE_URL):
+    """Articles on an all-news listing page: title, url, intro, date, imageUrl and category."""
+    soup = BeautifulSoup(html, 'html.parser')
+    articles = []
+    for item in soup.select('.items-row .item.column-1'):
+        title_element = item.select_one('.page-header h3 a')
+        title = clean_text(title_element.get_text()) if title_element is not None else ""
+        link = title_element.get('href', '') if title_element is not None else ""
+        if not link:
+            # Fallback: the first link in the item
+            anchor = item.find('a')
+            link = anchor.get('href', '') if anchor is not None else ""
+        intro = clean_text(" ".join(p.get_text() for p in item.select('.intro-text p')))
+        date_element = item.select_one('.intro-date')
+        image = item.select_one('.pull-left.item-image a img')
+        if title and link:
+            articles.append({
+                "title": title,
+                "url": absolute(link, base_url),
+                "intro": intro,
+                "date": clean_text(date_element.get_text()) if date_element is not None else "",
+                "imageUrl": absolute(image.get('src', ''), base_url) if image is not None else "",
+                "category": item_category(item)
+            })
+    return articles
+
+
+def next_page_url(html, page_url):
+    """URL of the next listing page: the pagination's next link, else ?start= advanced by a page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    anchor = soup.select_one('.pagination-next a, a[rel="next"], a[title="Next"], a.next')
+    if anchor is not None and anchor.get('href'):
+        return urljoin(page_url, anchor['href'])
+    if not soup.select('.items-row .item.column-1'):
+        return None
+    url = urlparse(page_url)
+    query = parse_qs(url.query)
+    start = int(query.get("start", ["0"])[0]) + PAGE_SIZE
+    query["start"] = [str(start)]
+    return url._replace(query=urlencode(query, doseq=True)).geturl()
+
+
+def fingerprint(article):
+    return content_hash(*(article.get(field, "") for field in FINGERPRINT_FIELDS))
+
+
+class SeenStore:
+    """SQLite record of listing articles already handled, keyed by URL."""
+
+    def __init__(self, db_path):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def diff(self, articles):
+        """Articles that are new or whose listing metadata changed, with listingStatus set."""
+        fresh = []
+        for article in articles:
+            row = self.conn.execute("SELECT fingerprint FROM seen WHERE url = ?", (article["url"],)).fetchone()
+            if row is None:
+                fresh.append(dict(article, listingStatus="new"))
+            elif row["fingerprint"] != fingerprint(article):
+                fresh.append(dict(article, listingStatus="changed"))
+        return fresh
+
+    def mark_seen(self, articles):
+        """Remember articles as handled; call once they were downloaded or passed on."""
+        now = now_iso()
+        for article in articles:
+            self.conn.execute(
+                "INSERT INTO seen (url, fingerprint, title, date, first_seen, last_seen, changed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET "
+                "changed_at = CASE WHEN fingerprint != excluded.fingerprint THEN excluded.last_seen "
+                "ELSE changed_at END, "
+                "fingerprint = excluded.fingerprint, title = excluded.title, date = excluded.date, "
+                "last_seen = excluded.last_seen",
+                (article["url"], fingerprint(article), article.get("title"), article.get("date"), now, now, None)
+            )
+        self.conn.commit()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def read_html(path):
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+# Main execution
+if __name__ == "__main__":
+    # Drop-in for localParser.js: prints {"articles": [...]} and nothing else on stdout
+    parser = argparse.ArgumentParser(description="Parse an all-news listing page, optionally only new articles")
+    parser.add_argument("listing_file", help="Saved listing HTML (e.g. /home/n8n/htmlOutput.html)")
+    parser.add_argument("--seen-db", help="Seen-article store; only new or changed articles are printed")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--dry-run", action="store_true", help="Do not mark the printed articles as seen")
+    options = parser.parse_args()
+
+    try:
+        articles = parse_listing(read_html(options.listing_file), options.base_url)
+    except OSError as e:
+        print(f"Error reading or parsing file: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    if options.seen_db:
+        store = SeenStore(options.seen_db)
+        total = len(articles)
+        articles = store.diff(articles)
+        if not options.dry_run:
+            store.mark_seen(articles)
+        print(f"{len(articles)} of {total} listed articles are new or changed "
+              f"({store.count()} seen in total)", file=sys.stderr)
+        store.close()
+    print(json.dumps({"articles": articles}, indent=2, ensure_ascii=False))
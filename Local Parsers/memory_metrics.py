@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import gc
+import sys
+import resource
+import tracemalloc
+
+# Memory accounting for stage and batch timers.
+#
+# RSS and its high-water mark come from /proc/self/status; on Linux the
+# high-water mark is reset at the start of every measured span (by writing 5
+# to /proc/self/clear_refs) so each stage and batch gets its own peak.  Where
+# that is not possible the peak falls back to the process lifetime maximum.
+# Python allocations (tracemalloc) and the torch CUDA allocator are reported
+# when enabled/available.
+
+MB = 1024 * 1024
+
+
+def read_status_kb(*fields):
+    """Return the given /proc/self/status fields in kB, or None where unavailable."""
+    values = dict.fromkeys(fields)
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in values:
+                    values[name] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def lifetime_peak_mb():
+    """Peak RSS over the life of the process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (MB if sys.platform == "darwin" else 1024)
+
+
+def current_rss_mb():
+    """Current RSS in MB, or None when it cannot be read."""
+    rss = read_status_kb("VmRSS")["VmRSS"]
+    return rss / 1024 if rss is not None else None
+
+
+def reset_peak_rss():
+    """Reset the kernel's RSS high-water mark; returns False where unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def cuda_torch():
+    """Return the torch module when it is already imported and CUDA is usable."""
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        return torch
+    return None
+
+
+class MemoryTracker:
+    """Measures RSS delta and peak (plus traced and CUDA peaks) over nested spans."""
+
+    def __init__(self, use_tracemalloc=False, ceiling_mb=None):
+        self.ceiling_mb = ceiling_mb
+        self.use_tracemalloc = use_tracemalloc
+        if use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.resettable = reset_peak_rss()
+        self.spans = []
+
+    def begin(self):
+        """Start a span; spans nest and an outer peak includes its inner ones."""
+        span = {"rss": current_rss_mb(), "peak": 0.0, "traced": 0.0, "cuda": 0.0}
+        if self.spans:
+            # The reset below would lose what the open spans reached so far
+            self._fold(self.spans)
+        self._reset()
+        self.spans.append(span)
+        return span
+
+    def _reset(self):
+        if self.resettable:
+            reset_peak_rss()
+        if self.use_tracemalloc:
+            tracemalloc.reset_peak()
+        torch = cuda_torch()
+        if torch is not None:
+            torch.cuda.reset_peak_memory_stats()
+
+    def _peaks(self):
+        status = read_status_kb("VmRSS", "VmHWM")
+        if self.resettable and status["VmHWM"] is not None:
+            peak = status["VmHWM"] / 1024
+        else:
+            peak = lifetime_peak_mb()
+        traced = tracemalloc.get_traced_memory()[1] / MB if self.use_tracemalloc else None
+        torch = cuda_torch()
+        cuda = torch.cuda.max_memory_allocated() / MB if torch is not None else None
+        rss = status["VmRSS"] / 1024 if status["VmRSS"] is not None else None
+        return rss, peak, traced, cuda
+
+    def _fold(self, spans):
+        """Raise the given spans' peaks to the current ones; returns the current readings."""
+        rss, peak, traced, cuda = self._peaks()
+        for span in spans:
+            span["peak"] = max(span["peak"], peak)
+            span["traced"] = max(span["traced"], traced or 0.0)
+            span["cuda"] = max(span["cuda"], cuda or 0.0)
+        return rss, peak, traced, cuda
+
+    def end(self, span):
+        """Finish a span and return its memory figures in MB."""
+        rss, peak, traced, cuda = self._fold([span])
+        self.spans.remove(span)
+        if self.spans:
+            parent = self.spans[-1]
+            parent["peak"] = max(parent["peak"], span["peak"])
+            parent["traced"] = max(parent["traced"], span["traced"])
+            parent["cuda"] = max(parent["cuda"], span["cuda"])
+
+        memory = {
+            "rssMb": round(rss, 1) if rss is not None else None,
+            "rssDeltaMb": round(rss - span["rss"], 1) if rss is not None and span["rss"] is not None else None,
+            "peakRssMb": round(span["peak"], 1)
+        }
+        if traced is not None:
+            memory["tracedPeakMb"] = round(span["traced"], 1)
+        if cuda is not None:
+            memory["cudaPeakMb"] = round(span["cuda"], 1)
+            memory["cudaReservedMb"] = round(cuda_torch().cuda.memory_reserved() / MB, 1)
+        return memory
+
+    def over_ceiling(self, peak_mb=None):
+        """True when peak_mb (or current RSS) is above the configured ceiling."""
+        if not self.ceiling_mb:
+            return False
+        value = peak_mb if peak_mb is not None else current_rss_mb()
+        return value is not None and value > self.ceiling_mb
+
+    def release(self):
+        """Return freed memory to the allocator (and CUDA cache) after a batch over the ceiling."""
+        gc.collect()
+        torch = cuda_torch()
+        if torch is not None:
+            torch.cuda.empty_cache()
+
+
+class BatchSizer:
+    """Shrinks the batch size when a batch peaks above the memory ceiling and grows it back slowly.
+
+    A batch that peaks above the ceiling halves the size; after grow_after
+    consecutive batches below low_water of the ceiling the size grows by one,
+    up to the configured maximum.
+    """
+
+    def __init__(self, batch_size, tracker=None, low_water=0.7, grow_after=3):
+        self.max_size = max(1, batch_size)
+        self.size = self.max_size
+        self.tracker = tracker
+        self.low_water = low_water
+        self.grow_after = grow_after
+        self.calm = 0
+        self.shrinks = 0
+
+    def update(self, peak_mb):
+        """Adjust the size after a batch that peaked at peak_mb; returns the new size."""
+        tracker = self.tracker
+        if tracker is None or not tracker.ceiling_mb or peak_mb is None:
+            return self.size
+        if tracker.over_ceiling(peak_mb):
+            new_size = max(1, self.size // 2)
+            if new_size != self.size:
+                print(f"  Memory: batch peaked at {peak_mb:.0f} MB (ceiling {tracker.ceiling_mb:.0f} MB), "
+                      f"batch size {self.size} -> {new_size}")
+                self.shrinks += 1
+            self.size = new_size
+            self.calm = 0
+            tracker.release()
+        elif peak_mb < tracker.ceiling_mb * self.low_water:
+            self.calm += 1
+            if self.calm >= self.grow_after and self.size < self.max_size:
+                self.size += 1
+                self.calm = 0
+        else:
+            self.calm = 0
+        return self.size
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import shutil
+import struct
+import contextlib
+
+# Local model cache with memory-mapped safetensors weights.
+#
+# The first load of a model saves it (config, tokenizer and one
+# model.safetensors file) under the cache directory.  Later loads build the
+# model without initialising its weights and point every parameter at the
+# mapped file instead of copying it, so start-up does little more than map
+# the file, and extractor processes on the same host share the weights'
+# physical pages through the page cache (they show up as RssFile rather than
+# RssAnon).  Inference never writes the weights; the mapping is
+# copy-on-write so a stray write stays private to its process.
+#
+#   NCA_MODEL_CACHE=DIR      cache location (default ~/.cache/nca_models)
+#   NCA_MMAP_MODELS=0        load with from_pretrained as before
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nca_models")
+WEIGHTS_FILE = "model.safetensors"
+
+
+def mmap_enabled():
+    return os.environ.get("NCA_MMAP_MODELS", "1").lower() not in ("0", "false", "no")
+
+
+def model_dir(model_id, cache_dir=None):
+    cache_dir = cache_dir or os.environ.get("NCA_MODEL_CACHE", DEFAULT_CACHE_DIR)
+    return os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9._-]+', '_', model_id))
+
+
+def model_class(kind):
+    from transformers import AutoModelForTokenClassification, AutoModelForSequenceClassification
+    return {"ner": AutoModelForTokenClassification, "zero-shot": AutoModelForSequenceClassification}[kind]
+
+
+def ensure_cached(kind, model_id, cache_dir=None):
+    """Save the model as a single safetensors file (plus config and tokenizer) unless already cached."""
+    from transformers import AutoTokenizer
+    path = model_dir(model_id, cache_dir)
+    if os.path.exists(os.path.join(path, WEIGHTS_FILE)):
+        return path
+    started = time.perf_counter()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    model = model_class(kind).from_pretrained(model_id)
+    # One shard, so a single mapping covers every weight
+    model.save_pretrained(tmp_path, safe_serialization=True, max_shard_size="100GB")
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(tmp_path)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"Cached {model_id} as safetensors in {path} ({time.perf_counter() - started:.1f}s)")
+    return path
+
+
+def torch_dtypes():
+    import torch
+    return {
+        "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+        "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+        "U8": torch.uint8, "BOOL": torch.bool
+    }
+
+
+def map_safetensors(path):
+    """Map a safetensors file and return ({name: tensor backed by the mapping}, mapping).
+
+    The format is an 8-byte little-endian header length, a JSON header of
+    dtype/shape/data_offsets per tensor, then the raw (8-byte aligned) data.
+    """
+    import torch
+    dtypes = torch_dtypes()
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header_size = struct.unpack("<Q", mapped[:8])[0]
+    header = json.loads(mapped[8:8 + header_size])
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = dtypes[info["dtype"]]
+        start, end = info["data_offsets"]
+        count = (end - start) // dtype.itemsize
+        if count == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+        else:
+            tensors[name] = torch.frombuffer(mapped, dtype=dtype, count=count,
+                                             offset=data_start + start).reshape(info["shape"])
+    return tensors, mapped
+
+
+def skip_weight_init():
+    """Context manager that stops transformers initialising weights we are about to replace."""
+    try:
+        from transformers.modeling_utils import no_init_weights
+        return no_init_weights()
+    except ImportError:
+        return contextlib.nullcontext()
+
+
+def load_mapped(kind, model_id, cache_dir=None):
+    """Load a model whose weights point into the mapped safetensors file; returns (model, tokenizer)."""
+    from transformers import AutoConfig, AutoTokenizer
+    path = ensure_cached(kind, model_id, cache_dir)
+    config = AutoConfig.from_pretrained(path)
+    with skip_weight_init():
+        model = model_class(kind).from_config(config)
+    tensors, mapped = map_safetensors(os.path.join(path, WEIGHTS_FILE))
+    # assign=True swaps the parameters for the mapped tensors instead of copying into them
+    result = model.load_state_dict(tensors, strict=False, assign=True)
+    model.tie_weights()
+    # Keys left out of the file are fine only when tying pointed them at a mapped tensor
+    mapped_ptrs = {tensor.data_ptr() for tensor in tensors.values()}
+    params = dict(model.named_parameters(remove_duplicate=False))
+    missing = [name for name in result.missing_keys
+               if name in params and params[name].data_ptr() not in mapped_ptrs]
+    unexpected = list(result.unexpected_keys)
+    if unexpected or missing:
+        raise ValueError(f"Cached weights do not match {model_id}: "
+                         f"missing {missing[:5]}, unexpected {unexpected[:5]}")
+    # The tensors reference the mapping; keep it alive with the model
+    model._nca_weights_mapping = mapped
+    model.eval()
+    return model, AutoTokenizer.from_pretrained(path)
+
+
+def load_model(kind, model_id, cache_dir=None):
+    """(model, tokenizer) from the mapped cache, falling back to from_pretrained if that fails."""
+    from transformers import AutoTokenizer
+    if mmap_enabled():
+        try:
+            return load_mapped(kind, model_id, cache_dir)
+        except Exception as e:
+            print(f"Could not map cached weights for {model_id}, loading normally: {str(e)}")
+    return model_class(kind).from_pretrained(model_id), AutoTokenizer.from_pretrained(model_id)
+
+
+def hub_cache_dir(model_id):
+    """Where huggingface_hub keeps a model's downloaded files."""
+    hub = os.environ.get("HF_HUB_CACHE") or os.path.join(
+        os.environ.get("HF_HOME", os.path.join(os.path.expanduser("~"), ".cache", "huggingface")), "hub")
+    return os.path.join(hub, "models--" + model_id.replace("/", "--"))
+
+
+def evict_from_page_cache(paths):
+    """Drop the given files/directories from the page cache so the next read is cold; returns bytes evicted."""
+    evicted = 0
+    for root in paths:
+        if not os.path.exists(root):
+            continue
+        files = [root] if os.path.isfile(root) else [
+            os.path.join(folder, name) for folder, _, names in os.walk(root, followlinks=True) for name in names]
+        for file_path in files:
+            try:
+                fd = os.open(os.path.realpath(file_path), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                evicted += os.fstat(fd).st_size
+            except (OSError, AttributeError):
+                pass
+            finally:
+                os.close(fd)
+    return evicted
+
+
+# Main execution
+if __name__ == "__main__":
+    # Pre-build the cache, e.g.
+    #   python model_cache.py ner:dslim/bert-base-NER zero-shot:facebook/bart-large-mnli
+    if len(sys.argv) < 2:
+        print("Usage: python model_cache.py <ner|zero-shot>:<model_id> [...]")
+        sys.exit(1)
+    for spec in sys.argv[1:]:
+        kind, _, model_id = spec.partition(":")
+        print(ensure_cached(kind, model_id))
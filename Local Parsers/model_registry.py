@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+
+from memory_metrics import MB, current_rss_mb
+
+# Process-wide registry of loaded models.
+#
+# Every extractor asks the registry for its spaCy pipeline, NER pipeline and
+# zero-shot classifier instead of loading them itself, so a worker running
+# both nlp_extractor.py and bert_article_analyzer.py holds one copy of
+# dslim/bert-base-NER.  Models are keyed by kind, model id, device, precision
+# and backend, loaded on first request and kept for the life of the process.
+# The loaders import their libraries lazily, so a script that never asks for
+# an ONNX or int8 model does not need those modules; fp32 transformer models
+# come from the memory-mapped cache in model_cache.py.
+
+
+def device_name(device):
+    """Pipeline-style device index (-1 = CPU) as a readable name."""
+    return "cpu" if device is None or device < 0 else f"cuda:{device}"
+
+
+def load_spacy(model_id, device, precision, backend):
+    import spacy
+    return spacy.load(model_id)
+
+
+def load_ner(model_id, device, precision, backend):
+    if backend == "onnx":
+        from onnx_backend import OnnxTokenClassifier
+        return OnnxTokenClassifier(model_id, precision)
+    if precision != "fp32":
+        from quantization import ner_pipeline_for
+        return ner_pipeline_for(model_id, precision)
+    from transformers import pipeline
+    from model_cache import load_model
+    model, tokenizer = load_model("ner", model_id)
+    return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple", device=device)
+
+
+def load_zero_shot(model_id, device, precision, backend):
+    if backend == "onnx":
+        from onnx_backend import OnnxZeroShotClassifier
+        return OnnxZeroShotClassifier(model_id, precision)
+    if precision != "fp32":
+        from quantization import zero_shot_pipeline_for
+        return zero_shot_pipeline_for(model_id, precision)
+    from transformers import pipeline
+    from model_cache import load_model
+    model, tokenizer = load_model("zero-shot", model_id)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer, device=device)
+
+
+LOADERS = {
+    "spacy": load_spacy,
+    "ner": load_ner,
+    "zero-shot": load_zero_shot
+}
+
+
+def weights_mb(instance):
+    """Size of a loaded model's weights in MB, or None when it cannot be determined."""
+    path = getattr(instance, "path", None)
+    if path and path.endswith(".onnx") and os.path.exists(path):
+        return round(os.path.getsize(path) / MB, 1)
+    model = getattr(instance, "model", None)
+    if model is None or not hasattr(model, "state_dict"):
+        return None
+    total = 0
+    pending = list(model.state_dict().values())
+    while pending:
+        value = pending.pop()
+        # Dynamically quantised layers keep their int8 weights in packed tuples
+        if isinstance(value, (tuple, list)):
+            pending.extend(value)
+        elif hasattr(value, "element_size"):
+            total += value.numel() * value.element_size()
+    return round(total / MB, 1)
+
+
+class ModelRegistry:
+    """Loads each (kind, model, device, precision, backend) once and hands out the shared instance."""
+
+    def __init__(self):
+        self.models = {}
+        self.info = {}
+        self.lock = threading.RLock()
+
+    def get(self, kind, model_id, device=-1, precision="fp32", backend="pytorch"):
+        """Return the shared instance, loading it on first request."""
+        if kind not in LOADERS:
+            raise ValueError(f"Unknown model kind: {kind}")
+        if precision != "fp32" and device is not None and device >= 0:
+            raise ValueError(f"{precision} models run on CPU only, not {device_name(device)}")
+        key = (kind, model_id, device_name(device), precision, backend)
+        with self.lock:
+            if key not in self.models:
+                self.models[key] = self._load(key, kind, model_id, device, precision, backend)
+            self.info[key]["requests"] += 1
+            return self.models[key]
+
+    def _load(self, key, kind, model_id, device, precision, backend):
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        instance = LOADERS[kind](model_id, device, precision, backend)
+        rss_after = current_rss_mb()
+        self.info[key] = {
+            "kind": kind,
+            "model": model_id,
+            "device": key[2],
+            "precision": precision,
+            "backend": backend,
+            "loadSeconds": round(time.perf_counter() - started, 2),
+            "rssDeltaMb": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+            "weightsMb": weights_mb(instance),
+            "requests": 0
+        }
+        print(f"Loaded {kind} model {model_id} ({key[2]}, {precision}, {backend}) "
+              f"in {self.info[key]['loadSeconds']:.1f}s")
+        return instance
+
+    def is_loaded(self, kind, model_id, device=-1, precision="fp32", backend="pytorch"):
+        return (kind, model_id, device_name(device), precision, backend) in self.models
+
+    def resident(self):
+        """What is loaded, how often it was handed out and what it cost."""
+        with self.lock:
+            return [dict(info) for info in self.info.values()]
+
+    def print_summary(self):
+        resident = self.resident()
+        if not resident:
+            return
+        print(f"Resident models ({len(resident)}):")
+        for info in resident:
+            weights = f"{info['weightsMb']:.0f} MB weights" if info["weightsMb"] is not None else "weights n/a"
+            rss = f"+{info['rssDeltaMb']:.0f} MB RSS" if info["rssDeltaMb"] is not None else "RSS n/a"
+            print(f"  {info['kind']:<10}{info['model']:<32}{info['device']:<8}{info['precision']:<6}"
+                  f"{info['backend']:<9}{weights}, {rss}, {info['requests']} requests, {info['loadSeconds']:.1f}s")
+        total = sum(info["rssDeltaMb"] or 0 for info in resident)
+        print(f"  total load-time RSS growth: {total:.0f} MB")
+
+
+# The registry shared by everything in this process
+registry = ModelRegistry()
+
+
+# Main execution
+if __name__ == "__main__":
+    # Load the given models (kind:model_id[:precision]) and report their cost, e.g.
+    #   python model_registry.py spacy:en_core_web_lg ner:dslim/bert-base-NER:int8
+    if len(sys.argv) < 2:
+        print("Usage: python model_registry.py <kind:model_id[:precision]> [...]")
+        sys.exit(1)
+    for spec in sys.argv[1:]:
+        kind, _, rest = spec.partition(":")
+        model_id, _, precision = rest.partition(":")
+        registry.get(kind, model_id, precision=precision or "fp32")
+    registry.print_summary()
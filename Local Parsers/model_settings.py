@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import os
+import importlib.util
+
+# Model settings read from the environment.
+#
+# Kept apart from quantization.py and onnx_backend.py so the extractors can
+# pick their model precision and inference backend without importing torch,
+# transformers or onnxruntime; those are only needed once a model is
+# actually loaded (see model_registry.py).  The precision of each model is
+# chosen with NCA_NER_PRECISION and NCA_CLASSIFIER_PRECISION, falling back
+# to NCA_PRECISION (default fp32); the backend with NCA_BACKEND.
+
+PRECISIONS = ("fp32", "int8")
+BACKENDS = ("pytorch", "onnx")
+
+
+def model_precision(kind):
+    """Precision for a model kind ("ner" or "classifier") from the environment."""
+    precision = (os.environ.get(f"NCA_{kind.upper()}_PRECISION")
+                 or os.environ.get("NCA_PRECISION") or "fp32").lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Precision for {kind} must be one of {', '.join(PRECISIONS)}, got {precision}")
+    return precision
+
+
+def inference_backend():
+    """Backend from NCA_BACKEND; falls back to pytorch when onnxruntime is not installed."""
+    backend = os.environ.get("NCA_BACKEND", "pytorch").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"NCA_BACKEND must be one of {', '.join(BACKENDS)}, got {backend}")
+    if backend == "onnx" and importlib.util.find_spec("onnxruntime") is None:
+        print("Warning: NCA_BACKEND=onnx but onnxruntime is not installed, using pytorch")
+        return "pytorch"
+    return backend
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import glob
+import json
+import hashlib
+import sqlite3
+import argparse
+import datetime
+import threading
+
+import numpy as np
+
+# Near-duplicate detection over extracted article content.
+#
+# Each article's content is cut into overlapping word shingles and reduced
+# to a MinHash signature; the fraction of equal signature slots estimates
+# the Jaccard similarity of two articles' shingle sets.  Signatures are
+# split into LSH bands so only articles sharing a band are compared.
+# Signatures, bands and the (content-less) result of every fully processed
+# article persist in SQLite, so a republished or lightly edited press
+# release - or the same page saved twice by Code4 - can reuse the earlier
+# article's model outputs instead of running spaCy, BERT and BART again.
+# The banding follows the threshold and is rebuilt from the stored
+# signatures when the threshold changes.
+
+DEFAULT_THRESHOLD = 0.85
+NUM_PERM = 128
+SHINGLE_WORDS = 5
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    version TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    result TEXT NOT NULL,
+    added_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    signature_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+"""
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Overlapping runs of `size` lower-cased words (the whole text when shorter)."""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+_permutations = {}
+
+
+def permutations(num_perm, seed=1):
+    """The (a, b) coefficients of num_perm universal hash functions, fixed by seed."""
+    if (num_perm, seed) not in _permutations:
+        generator = np.random.RandomState(seed)
+        a = generator.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        b = generator.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        _permutations[(num_perm, seed)] = (a, b)
+    return _permutations[(num_perm, seed)]
+
+
+def minhash(shingle_set, num_perm=NUM_PERM):
+    """MinHash signature (uint32 array of num_perm values) of a set of strings."""
+    if not shingle_set:
+        return np.full(num_perm, MAX_HASH, dtype=np.uint32)
+    a, b = permutations(num_perm)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set))
+    # uint64 arithmetic wraps on overflow, as in the usual MinHash implementations
+    permuted = ((hashes[:, np.newaxis] * a + b) % MERSENNE_PRIME) & MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """(bands, rows) whose candidate threshold (1/bands)^(1/rows) is the highest not above threshold.
+
+    Candidates are verified against the threshold, so erring low only costs
+    a few extra comparisons while erring high would miss duplicates.
+    """
+    options = []
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands == 0:
+            rows = num_perm // bands
+            options.append(((1.0 / bands) ** (1.0 / rows), bands, rows))
+    below = [option for option in options if option[0] <= threshold]
+    _, bands, rows = max(below) if below else min(options)
+    return bands, rows
+
+
+def band_keys(signature, bands, rows):
+    return [hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest()
+            for band in range(bands)]
+
+
+def now_iso():
+    return datetime.datetime.now().isoformat()
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index of processed articles and their results."""
+
+    def __init__(self, db_path, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, shingle_words=SHINGLE_WORDS):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.db_path = db_path
+        # Shared by the extraction service's worker threads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.checked = 0
+        self.matched = 0
+        self._check_meta()
+
+    def _check_meta(self):
+        meta = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+        signature_params = f"{self.num_perm}:{self.shingle_words}"
+        if meta.get("signature") not in (None, signature_params):
+            raise ValueError(f"Index was built with num_perm:shingle_words {meta['signature']}, "
+                             f"not {signature_params}; use another database")
+        banding = f"{self.bands}x{self.rows}"
+        if meta.get("banding") != banding:
+            # New threshold: re-band the stored signatures
+            self.conn.execute("DELETE FROM buckets")
+            for signature_id, blob in self.conn.execute("SELECT id, signature FROM signatures").fetchall():
+                self._insert_buckets(signature_id, np.frombuffer(blob, dtype=np.uint32))
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                              [("signature", signature_params), ("banding", banding)])
+        self.conn.commit()
+
+    def _insert_buckets(self, signature_id, signature):
+        self.conn.executemany(
+            "INSERT INTO buckets (band, bucket, signature_id) VALUES (?, ?, ?)",
+            [(band, key, signature_id) for band, key in enumerate(band_keys(signature, self.bands, self.rows))])
+
+    def reopen(self):
+        """Open a fresh connection, e.g. in a forked worker process."""
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def signature(self, content):
+        return minhash(shingles(content, self.shingle_words), self.num_perm)
+
+    def find(self, content, version):
+        """Return (best match or None, signature of content).
+
+        A match is a dict with the earlier article's source, its estimated
+        similarity and its result; only results produced by the same
+        extractor version are considered.
+        """
+        signature = self.signature(content)
+        best = None
+        with self.lock:
+            self.checked += 1
+            candidates = set()
+            for band, key in enumerate(band_keys(signature, self.bands, self.rows)):
+                rows = self.conn.execute("SELECT signature_id FROM buckets WHERE band = ? AND bucket = ?",
+                                         (band, key)).fetchall()
+                candidates.update(row[0] for row in rows)
+            for signature_id in candidates:
+                row = self.conn.execute("SELECT source, signature, result FROM signatures "
+                                        "WHERE id = ? AND version = ?", (signature_id, version)).fetchone()
+                if row is None:
+                    continue
+                score = similarity(signature, np.frombuffer(row[1], dtype=np.uint32))
+                if score >= self.threshold and (best is None or score > best["similarity"]):
+                    best = {"source": row[0], "similarity": score, "result": row[2]}
+            if best is not None:
+                self.matched += 1
+                best["result"] = json.loads(best["result"])
+        return best, signature
+
+    def add(self, signature, source, version, result):
+        """Index a fully processed article; its content is not stored."""
+        stored = {key: value for key, value in result.items() if key != "content"}
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO signatures (source, version, signature, result, added_at) VALUES (?, ?, ?, ?, ?)",
+                (source, version, signature.astype(np.uint32).tobytes(),
+                 json.dumps(stored, ensure_ascii=False), now_iso()))
+            self._insert_buckets(cursor.lastrowid, signature)
+            self.conn.commit()
+
+    def size(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def print_summary(self):
+        if not self.checked:
+            return
+        print(f"Near-duplicates: {self.matched}/{self.checked} articles reused an earlier result "
+              f"(threshold {self.threshold:.2f}, {self.bands} bands of {self.rows}, {self.size()} indexed)")
+
+    def close(self):
+        self.conn.close()
+
+
+# Main execution
+if __name__ == "__main__":
+    # Inspect a folder: which articles are near-duplicates of each other at a threshold
+    parser = argparse.ArgumentParser(description="List near-duplicate articles in a folder")
+    parser.add_argument("folder", help="Folder of article HTML files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM)
+    parser.add_argument("--shingle-words", type=int, default=SHINGLE_WORDS)
+    options = parser.parse_args()
+
+    os.environ["NCA_SKIP_MODEL_LOAD"] = "1"
+    from nlp_extractor import extract_content_from_html
+
+    signatures = []
+    for html_path in sorted(glob.glob(os.path.join(options.folder, "*.html"))):
+        content = extract_content_from_html(html_path).get("content", "")
+        if content:
+            signatures.append((os.path.basename(html_path),
+                               minhash(shingles(content, options.shingle_words), options.num_perm)))
+    if not signatures:
+        print(f"No articles with content in {options.folder}")
+        sys.exit(1)
+
+    pairs = 0
+    for i, (name_a, signature_a) in enumerate(signatures):
+        for name_b, signature_b in signatures[i + 1:]:
+            score = similarity(signature_a, signature_b)
+            if score >= options.threshold:
+                pairs += 1
+                print(f"{score:.3f}  {name_a}  {name_b}")
+    print(f"{pairs} near-duplicate pairs among {len(signatures)} articles at threshold {options.threshold}")
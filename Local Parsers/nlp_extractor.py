@@ -3,33 +3,129 @@ import os
 import sys
 import json
 import re
+import time
+import signal
 import datetime
-import spacy
 from bs4 import BeautifulSoup
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
 import glob
+from result_cache import content_hash
+from stage_runner import StageRunner, file_digest
+from processing_state import ProcessingState, RUNNABLE, TIMED_OUT
+from result_writers import JsonlWriter, is_streaming_output
+from stage_metrics import StageMetrics, percentile
+from stage_profiler import StageProfiler
+from model_settings import model_precision, inference_backend
+from model_registry import registry
+from cascade_ner import cascade_entities, CascadeStats
+from folder_watcher import FolderWatcher
+from tiered_output import EnrichmentWorker, QUICK_REVISION, FULL_REVISION
+from relevance_gate import CRIME_INDICATORS
+from article_workers import SupervisedWorkers, ArticleStopped, ARTICLE_TIMEOUT, STAGE_TIMEOUT, RETRY_TIMEOUT_FACTOR
+from full_article_parser import page_fields, extract_victims, PAGE_FIELDS
+import extractor_common
+from extractor_common import (patch_near_duplicate, light_result, pop_option, pop_flag, pop_common_options,
+                              build_pipeline, build_sinks, COMMON_USAGE)
+
+# This module as the shared helpers in extractor_common.py see it
+EXTRACTOR = sys.modules[__name__]
+
+# Bump when result assembly changes so cached results are not reused
+EXTRACTOR_VERSION = "1.3.0"
+
+# Model identifiers (also part of the cache keys)
+SPACY_MODEL = "en_core_web_lg"
+NER_MODEL = "dslim/bert-base-NER"
+CLASSIFIER_MODEL = "facebook/bart-large-mnli"
+
+# fp32 or int8 per model (NCA_NER_PRECISION / NCA_CLASSIFIER_PRECISION / NCA_PRECISION)
+NER_PRECISION = model_precision("ner")
+CLASSIFIER_PRECISION = model_precision("classifier")
+
+# pytorch (transformers pipelines) or onnx (ONNX Runtime, NCA_BACKEND=onnx)
+INFERENCE_BACKEND = inference_backend()
+
+# spacy: spaCy entities only; cascade: spaCy first, uncertain sentences re-run through the NER model
+ENTITY_MODES = ("spacy", "cascade")
+ENTITY_MODE = "spacy"
+
+CRIME_CATEGORIES = [
+    "Drug Trafficking",
+    "Money Laundering",
+    "Firearms Offenses",
+    "Fraud",
+    "People Smuggling",
+    "Child Sexual Abuse",
+    "Cybercrime",
+    "Organized Crime",
+    "Violent Crime",
+    "Terrorism"
+]
+
+# Per-stage versions for incremental recomputation: bump a stage's entry when
+# its code changes and only that stage (and stages consuming it) is recomputed
+STAGE_VERSIONS = {
+    "content": "2",
+    "spacy_entities": "1",
+    "cascade_entities": "1",
+    "perpetrators": "1",
+    "victims": "1",
+    "sentences": "1",
+    "charges": "1",
+    "money_amounts": "1",
+    "drug_quantities": "1",
+    "timeline": "1",
+    "categories": "1"
+}
+
+# Model behind each model-backed stage
+STAGE_MODELS = {
+    "spacy_entities": SPACY_MODEL,
+    "cascade_entities": NER_MODEL,
+    "categories": CLASSIFIER_MODEL
+}
+
+# Precision of each transformer-backed stage (quantised outputs differ slightly)
+STAGE_PRECISIONS = {
+    "cascade_entities": NER_PRECISION,
+    "categories": CLASSIFIER_PRECISION
+}
+
+# The stage producing entities in each entity mode; only the active one is part of the cache key
+ENTITY_STAGES = {
+    "spacy": "spacy_entities",
+    "cascade": "cascade_entities"
+}
 
 # Load NLP models
-try:
-    print("Loading NLP models... (this may take a minute)")
-    # Load spaCy for general NER
-    nlp = spacy.load("en_core_web_lg")
-    
-    # Load Hugging Face transformers for specialized NER
-    tokenizer = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
-    model = AutoModelForTokenClassification.from_pretrained("dslim/bert-base-NER")
-    ner_pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
-    
-    # Zero-shot classification for crime categorization
-    classifier = pipeline("zero-shot-classification", 
-                         model="facebook/bart-large-mnli",
-                         device=-1)  # Use CPU
-    
-    models_loaded = True
-    print("Models loaded successfully!")
-except Exception as e:
-    print(f"Could not load all models: {str(e)}")
-    models_loaded = False
+def load_models():
+    """Load spaCy and the zero-shot classifier (used by every run) into module globals."""
+    global nlp, classifier, models_loaded
+    try:
+        print("Loading NLP models... (this may take a minute)")
+        # Load spaCy for general NER
+        nlp = registry.get("spacy", SPACY_MODEL)
+        
+        # Zero-shot classification for crime categorization (on CPU, optionally int8)
+        classifier = registry.get("zero-shot", CLASSIFIER_MODEL, -1, CLASSIFIER_PRECISION, INFERENCE_BACKEND)
+        
+        models_loaded = True
+        print(f"Models loaded successfully! ({INFERENCE_BACKEND}, classifier {CLASSIFIER_PRECISION})")
+    except Exception as e:
+        print(f"Could not load all models: {str(e)}")
+        models_loaded = False
+
+def get_ner_pipeline():
+    """The transformer NER pipeline, loaded on first use since only some entity modes need it."""
+    global ner_pipeline
+    if ner_pipeline is None:
+        ner_pipeline = registry.get("ner", NER_MODEL, -1, NER_PRECISION, INFERENCE_BACKEND)
+    return ner_pipeline
+
+# NCA_SKIP_MODEL_LOAD=1 leaves the models unloaded so callers (e.g. benchmark.py) can install their own
+models_loaded = False
+ner_pipeline = None
+if not os.environ.get("NCA_SKIP_MODEL_LOAD"):
+    load_models()
 
 # [All helper functions and extraction functions remain the same as in the previous script]
 # Helper functions
@@ -59,7 +155,7 @@ def text_to_chunks(text, max_length=512, overlap=50):
 
 # Content extraction functions
 def extract_content_from_html(html_path):
-    """Extract content from HTML using multiple fallback strategies."""
+    """Extract content from an HTML file using multiple fallback strategies."""
     try:
         with open(html_path, 'r', encoding='utf-8') as file:
             content = file.read()
@@ -67,7 +163,10 @@ def extract_content_from_html(html_path):
         # Try another encoding if UTF-8 fails
         with open(html_path, 'r', encoding='latin-1') as file:
             content = file.read()
-    
+    return extract_content_from_markup(content, html_path)
+
+def extract_content_from_markup(content, html_path=None):
+    """Extract title and content from HTML (or article JSON) text; html_path is recorded as given."""
     # Strategy 1: Look for JSON content in the HTML
     try:
         json_match = re.search(r'(\{[\s\S]*"title"[\s\S]*"content"[\s\S]*\})', content)
@@ -78,7 +177,8 @@ def extract_content_from_html(html_path):
                     "title": data.get("title", ""),
                     "content": data.get("content", ""),
                     "html_path": html_path,
-                    "extraction_method": "json_in_html"
+                    "extraction_method": "json_in_html",
+                    "page": {field: data.get(field, "") for field in PAGE_FIELDS}
                 }
     except:
         pass
@@ -92,7 +192,8 @@ def extract_content_from_html(html_path):
                     "title": data.get("title", ""),
                     "content": data.get("content", ""),
                     "html_path": html_path,
-                    "extraction_method": "pure_json"
+                    "extraction_method": "pure_json",
+                    "page": {field: data.get(field, "") for field in PAGE_FIELDS}
                 }
         except:
             pass
@@ -147,7 +248,9 @@ def extract_content_from_html(html_path):
         "title": title,
         "content": article_content,
         "html_path": html_path,
-        "extraction_method": "html_parsing"
+        "extraction_method": "html_parsing",
+        # report.json's page fields from the same parse (see full_article_parser.py)
+        "page": page_fields(soup)
     }
 
 # Entity extraction functions
@@ -197,36 +300,34 @@ def extract_entities_transformers(text, chunk_size=512):
     all_entities = []
     for chunk in chunks:
         try:
-            entities = ner_pipeline(chunk)
+            entities = get_ner_pipeline()(chunk)
             all_entities.extend(entities)
         except Exception as e:
             print(f"Error in transformers NER: {str(e)}")
     
     return all_entities
 
+cascade_stats = CascadeStats()
+
+def extract_entities_cascade(text):
+    """Extract entities with spaCy, re-running uncertain or crime-relevant sentences through the NER model."""
+    if not text or not models_loaded:
+        return extract_entities_spacy(text)
+    entities, _ = cascade_entities(text, nlp, get_ner_pipeline(), cascade_stats)
+    # Same shape as extract_entities_spacy
+    entities.pop("miscellaneous")
+    return entities
+
 def categorize_crime(text):
     """Categorize crime types using zero-shot classification."""
     if not text or not models_loaded:
         return []
     
-    crime_categories = [
-        "Drug Trafficking", 
-        "Money Laundering", 
-        "Firearms Offenses", 
-        "Fraud",
-        "People Smuggling",
-        "Child Sexual Abuse",
-        "Cybercrime",
-        "Organized Crime",
-        "Violent Crime",
-        "Terrorism"
-    ]
-    
     try:
         # Use shorter text for classification to stay within token limits
         classification = classifier(
             text[:2000], 
-            candidate_labels=crime_categories,
+            candidate_labels=CRIME_CATEGORIES,
             multi_label=True
         )
         
@@ -250,10 +351,7 @@ def extract_perpetrators(text, people):
     perpetrators = []
     
     # Common crime-related words to look for near names
-    crime_indicators = [
-        'convicted', 'sentenced', 'pleaded guilty', 'admitted', 'arrested', 
-        'charged', 'jailed', 'imprisoned', 'smuggler', 'dealer', 'trafficker'
-    ]
+    crime_indicators = CRIME_INDICATORS
     
     # Process each person
     for person in people:
@@ -439,97 +537,654 @@ def extract_timeline(text, dates):
     
     return timeline
 
+# Result caching and stage versions
+def stage_version(name):
+    """Return the full version of a stage, including the model it runs when model-backed."""
+    return extractor_common.stage_version(EXTRACTOR, name)
+
+def active_stage_versions():
+    """Versions of the stages the current entity mode runs."""
+    inactive = {stage for mode, stage in ENTITY_STAGES.items() if mode != ENTITY_MODE}
+    return {name: stage_version(name) for name in STAGE_VERSIONS if name not in inactive}
+
+def article_cache_key(title, content):
+    """Build the result cache key from normalised content plus extractor and stage versions."""
+    return content_hash(clean_text(title), clean_text(content), EXTRACTOR_VERSION, active_stage_versions())
+
+def results_version():
+    """Version of the results as a whole; near-duplicates only reuse results of the same version."""
+    return content_hash(EXTRACTOR_VERSION, active_stage_versions())
+
+def partial_result(stopped, source):
+    """Result for an article whose worker was stopped (see article_workers.py): the stages that finished."""
+    outputs = stopped.outputs
+    article_data = outputs.get("content") or {}
+    entities = outputs.get(ENTITY_STAGES[ENTITY_MODE]) or {}
+    return {
+        "title": article_data.get("title", ""),
+        "content": article_data.get("content", ""),
+        "source": source,
+        "processedAt": datetime.datetime.now().isoformat(),
+        "locations": entities.get("locations", []),
+        "organizations": entities.get("organizations", []),
+        "timeline": outputs.get("timeline", []),
+        "perpetrators": outputs.get("perpetrators", []),
+        "victims": outputs.get("victims", []),
+        "sentences": outputs.get("sentences", []),
+        "charges": outputs.get("charges", []),
+        "moneyAmounts": outputs.get("money_amounts", []),
+        "drugQuantities": outputs.get("drug_quantities", []),
+        "categories": [c["category"] for c in outputs.get("categories", []) if c["confidence"] > 0.4],
+        **(article_data.get("page") or {}),
+        "extraction_error": str(stopped),
+        "timedOut": stopped.stage or "article",
+        "complete": False
+    }
+
 # Main extraction function
-def process_article(file_path):
+def process_article(file_path, cache=None, runner=None, dedup=None, gate=None):
     """Process an article file and extract structured data."""
+    if runner is None:
+        runner = StageRunner()
+    runner.begin_article(os.path.basename(file_path))
+    
     # Extract the content
-    article_data = extract_content_from_html(file_path)
+    article_data = load_article(file_path, runner)
+    return process_content(article_data, os.path.basename(file_path), cache, runner, dedup, gate)
+
+def load_article(file_path, runner):
+    """Run the content stage for an article file."""
+    return runner.run("content", stage_version("content"), extract_content_from_html, file_path,
+                      key=(file_digest(file_path),))
+
+def process_html(html, source, cache=None, runner=None, dedup=None, gate=None):
+    """Process article HTML held in memory (e.g. posted to extraction_service.py)."""
+    if runner is None:
+        runner = StageRunner()
+    runner.begin_article(source)
+    article_data = runner.run("content", stage_version("content"), extract_content_from_markup, html, source,
+                              key=(content_hash(html),))
+    return process_content(article_data, source, cache, runner, dedup, gate)
+
+def quick_result(article_data, source, runner=None):
+    """First-tier result for --tiered output: the pattern-based fields, before any model runs.
+    
+    Returns None when there is too little content; process_content reports that.
+    """
+    if runner is None:
+        runner = StageRunner()
+    
+    def stage(name, func, *args, key=None):
+        return runner.run(name, stage_version(name), func, *args, key=key)
+    
+    content = article_data["content"]
+    if not content or len(content) < 100:
+        return None
+    return {
+        "title": article_data["title"],
+        "content": content,
+        "source": source,
+        "processedAt": datetime.datetime.now().isoformat(),
+        "victims": stage("victims", extract_victims, content),
+        "sentences": stage("sentences", extract_sentences, content),
+        "charges": stage("charges", extract_charges, content),
+        "moneyAmounts": stage("money_amounts", extract_money_amounts, content),
+        "drugQuantities": stage("drug_quantities", extract_drug_quantities, content),
+        **(article_data.get("page") or {}),
+        "revision": QUICK_REVISION,
+        "complete": False
+    }
+
+def process_content(article_data, source, cache=None, runner=None, dedup=None, gate=None):
+    """Run the extraction stages on an article's extracted title and content.
+    
+    With a NearDuplicateIndex, an article close enough to one processed
+    before is patched from the earlier result instead of running the models.
+    With a RelevanceGate, an article scoring below its min_score gets a light
+    result (see light_result); light results are not cached or indexed.
+    """
+    if runner is None:
+        runner = StageRunner()
+    
+    def stage(name, func, *args, key=None):
+        return runner.run(name, stage_version(name), func, *args, key=key)
+    
     title = article_data["title"]
     content = article_data["content"]
     
     # Skip if no meaningful content
     if not content or len(content) < 100:
-        print(f"Error: Could not extract content from {file_path}")
+        print(f"Error: Could not extract content from {article_data.get('html_path') or source}")
         return {
             "title": title,
             "content": content,
-            "source": os.path.basename(file_path),
+            "source": source,
             "processedAt": datetime.datetime.now().isoformat(),
             "extraction_error": "Insufficient content extracted"
         }
     
-    # Entity extraction using spaCy
-    spacy_entities = extract_entities_spacy(content)
+    # Reuse a previous result for identical content without touching the models
+    cache_key = None
+    if cache is not None:
+        cache_key = article_cache_key(title, content)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached["source"] = source
+            cached["processedAt"] = datetime.datetime.now().isoformat()
+            return cached
     
-    # Extract perpetrators
-    perpetrators = extract_perpetrators(content, spacy_entities["people"])
+    # Republished or lightly edited articles reuse the earlier article's model outputs
+    signature = None
+    if dedup is not None:
+        match, signature = dedup.find(content, results_version())
+        if match is not None:
+            result = patch_near_duplicate(EXTRACTOR, match, article_data, source, stage)
+            if cache_key:
+                cache.put(cache_key, result)
+            return result
+    
+    # Corporate news, recruitment and reports skip the models.  Checked after the
+    # near-duplicate lookup, so the gate's counts and timings only cover articles
+    # that would otherwise run the models
+    started = time.perf_counter()
+    if gate is not None:
+        relevant, score = gate.check(title, content)
+        if not relevant:
+            result = light_result(EXTRACTOR, article_data, source, stage, score)
+            gate.record_light(time.perf_counter() - started)
+            return result
+    
+    # Extract sentences, charges, money, drugs and victims first: cheap, and
+    # kept in the partial result if a supervised worker is stopped later on
+    sentences = stage("sentences", extract_sentences, content)
+    charges = stage("charges", extract_charges, content)
+    money_amounts = stage("money_amounts", extract_money_amounts, content)
+    drug_quantities = stage("drug_quantities", extract_drug_quantities, content)
+    victims = stage("victims", extract_victims, content)
     
-    # Extract sentences, charges, money, drugs
-    sentences = extract_sentences(content)
-    charges = extract_charges(content)
-    money_amounts = extract_money_amounts(content)
-    drug_quantities = extract_drug_quantities(content)
+    # Entity extraction using spaCy (optionally cascading to the transformer NER)
+    if ENTITY_MODE == "cascade":
+        spacy_entities = stage("cascade_entities", extract_entities_cascade, content)
+    else:
+        spacy_entities = stage("spacy_entities", extract_entities_spacy, content)
+    
+    # Extract perpetrators
+    perpetrators = stage("perpetrators", extract_perpetrators, content, spacy_entities["people"])
     
     # Extract timeline
-    timeline = extract_timeline(content, spacy_entities["dates"])
+    timeline = stage("timeline", extract_timeline, content, spacy_entities["dates"])
     
     # Crime categorization
-    crime_categories = categorize_crime(content) if models_loaded else []
+    crime_categories = stage("categories", categorize_crime, content)
     
     # Compile and return the results
     result = {
         "title": title,
         "content": content,
-        "source": os.path.basename(file_path),
+        "source": source,
         "processedAt": datetime.datetime.now().isoformat(),
         "locations": spacy_entities["locations"],
         "organizations": spacy_entities["organizations"],
         "timeline": timeline,
         "perpetrators": perpetrators,
+        "victims": victims,
         "sentences": sentences,
         "charges": charges,
         "moneyAmounts": money_amounts,
         "drugQuantities": drug_quantities,
-        "categories": [c["category"] for c in crime_categories if c["confidence"] > 0.4]
+        "categories": [c["category"] for c in crime_categories if c["confidence"] > 0.4],
+        **(article_data.get("page") or {})
     }
     
+    if cache_key:
+        cache.put(cache_key, result)
+    if signature is not None:
+        dedup.add(signature, source, results_version(), result)
+    if gate is not None:
+        gate.record_full(time.perf_counter() - started)
+    
     return result
 
 # Process a folder of HTML files
-def process_folder(folder_path, output_file=None):
-    """Process all HTML files in a folder and save results to a JSON file."""
+def process_folder(folder_path, output_file=None, cache=None, runner=None, state=None, fsync_every=10,
+                   sinks=None, profiler=None, watcher=None, dedup=None, tiered=False, gate=None,
+                   workers=0, article_timeout=ARTICLE_TIMEOUT, stage_timeout=STAGE_TIMEOUT):
+    """Process all HTML files in a folder and save results to a JSON file.
+    
+    An output_file ending in .jsonl selects streaming mode: one compact record
+    is appended per article as it finishes, sources already in the file are
+    skipped on restart, and results are not accumulated in memory (the
+    returned list is empty). Each result is also passed to every sink in
+    sinks (objects with write/close, e.g. ParquetWriter), which are closed at
+    the end.
+    
+    With a FolderWatcher, files are taken from watcher.batches() as they
+    land instead of from a one-off listing, the output and sinks are flushed
+    after every batch, and the run ends when the watcher stops or on Ctrl-C.
+    Watch mode needs a .jsonl output_file.
+    
+    With a ProcessingState, only pending or failed articles are processed and
+    each article's status, timings and output location are recorded.
+    
+    Per-stage and per-article timings are collected in runner.metrics and
+    summarised at the end, with memory figures when it has a MemoryTracker.
+    An article that peaks above the tracker's ceiling triggers a collection.
+    With a StageProfiler, sampled articles are profiled.  With a
+    NearDuplicateIndex, near-duplicates of earlier articles are patched from
+    their results (see process_content), and with a RelevanceGate articles
+    with no sign of a crime story skip the models.
+    
+    With tiered, each article is first written as a quick record from the
+    pattern-based stages (see quick_result), then again with the full result
+    once the models have run on a background worker; see tiered_output.py.
+    Sinks only receive full results.  Tiered mode needs a .jsonl output_file.
+    
+    With workers, articles run in that many supervised worker processes (see
+    article_workers.py), finishing in any order.  An article past
+    article_timeout, or stuck in one stage past stage_timeout, is stopped
+    and retried after the rest with longer deadlines (when idle, in watch
+    mode); if it times out again its partial result is written, marked
+    "complete": false, and its state is timed_out, so later runs retry it
+    after their other articles.  Articles in workers are not profiled.
+    """
     if not os.path.isdir(folder_path):
         print(f"Error: {folder_path} is not a valid directory")
         return
     
-    # Get all HTML files in the folder
-    html_files = glob.glob(os.path.join(folder_path, "*.html"))
+    if watcher is None:
+        # Get all HTML files in the folder
+        html_files = glob.glob(os.path.join(folder_path, "*.html"))
+        
+        if not html_files:
+            print(f"No HTML files found in {folder_path}")
+            return
+        batches = [html_files]
+        total_files = len(html_files)
+        print(f"Found {total_files} HTML files to process")
+    else:
+        if not is_streaming_output(output_file):
+            print("Error: watch mode writes results as they finish and needs a .jsonl output file")
+            return
+        batches = watcher.batches()
+        total_files = None
+        print(f"Watching {folder_path} for new HTML files ({watcher.mode}), Ctrl-C to stop")
     
-    if not html_files:
-        print(f"No HTML files found in {folder_path}")
+    if tiered and not is_streaming_output(output_file):
+        print("Error: tiered mode writes two revisions per article and needs a .jsonl output file")
+        return
+    if tiered and workers:
+        print("Error: tiered mode and supervised workers cannot be combined")
         return
     
+    if runner is None:
+        runner = StageRunner()
+    if runner.metrics is None:
+        runner.metrics = StageMetrics()
+    metrics = runner.metrics
+    if profiler is None:
+        profiler = StageProfiler(None)
+    
     # Process each file
     results = []
-    total_files = len(html_files)
-    print(f"Found {total_files} HTML files to process")
     
-    for i, file_path in enumerate(html_files):
-        print(f"Processing file {i+1}/{total_files}: {os.path.basename(file_path)}")
-        try:
-            result = process_article(file_path)
+    # Streaming mode appends to the output as we go and resumes after a crash
+    writer = None
+    completed = set()
+    if is_streaming_output(output_file):
+        writer = JsonlWriter(output_file, fsync_every)
+        completed = writer.completed_sources()
+        if completed:
+            print(f"Resuming: {len(completed)} articles already in {output_file}")
+    
+    def emit(result):
+        for sink in sinks or []:
+            sink.write(result)
+        if writer is not None:
+            writer.write(result)
+        else:
             results.append(result)
-            print(f"  Successfully processed: {os.path.basename(file_path)}")
+    
+    if state is not None:
+        state.reset_stale()
+    
+    skipped = 0
+    processed = 0
+    # Seconds from an article's last write to its full (and quick) result, in watch mode
+    latencies = []
+    quick_latencies = []
+    watch_started = time.time()
+    # Tiered mode: seconds to each quick record, and from it to the full result
+    quick_times = []
+    enrichment_lags = []
+    
+    def record_latency(file_path, collected):
+        if watcher is None:
+            return
+        try:
+            landed = os.path.getmtime(file_path)
+        except OSError:
+            return
+        # Files already waiting when the watch started would only measure the downtime
+        if landed >= watch_started:
+            collected.append(time.time() - landed)
+    
+    def record_result(file_path, state_hash, result, timer=None):
+        emit(result)
+        if timer is not None and timer.memory and metrics.memory.over_ceiling(timer.memory["peakRssMb"]):
+            print(f"  Memory: peaked at {timer.memory['peakRssMb']:.0f} MB "
+                  f"(ceiling {metrics.memory.ceiling_mb:.0f} MB), collecting")
+            metrics.memory.release()
+        if state_hash:
+            if result.get("extraction_error"):
+                state.mark_failed(state_hash, result["extraction_error"])
+            else:
+                state.mark_done(state_hash, output_path=output_file)
+        print(f"  Successfully processed: {os.path.basename(file_path)}")
+    
+    def record_error(file_path, state_hash, e):
+        print(f"  Error processing {os.path.basename(file_path)}: {str(e)}")
+        if state_hash:
+            state.mark_failed(state_hash, e)
+        error = {
+            "error": str(e),
+            "source": os.path.basename(file_path),
+            "processedAt": datetime.datetime.now().isoformat()
+        }
+        if worker is not None:
+            error.update(revision=FULL_REVISION, complete=True)
+        emit(error)
+    
+    def enrich(item):
+        """Run the model stages for a tiered article (on the worker thread)."""
+        file_path, _, article_data, _ = item
+        name = os.path.basename(file_path)
+        runner.begin_article(name)
+        # No process_article frame on this thread: sample from process_content
+        with metrics.timer(name, "article") as timer, profiler.article(name, root="process_content"):
+            result = process_content(article_data, name, cache, runner, dedup, gate)
+            timer.output = [result]
+        return dict(result, revision=FULL_REVISION, complete=True), timer
+    
+    # The worker only computes; results, sinks and state are written from this thread
+    worker = EnrichmentWorker(enrich) if tiered else None
+    quick_runner = StageRunner(store=runner.store)
+    
+    def collect(outcomes):
+        """Write the full results the worker has finished."""
+        for (file_path, state_hash, _, quick_at), outcome in outcomes:
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                result, timer = outcome
+                record_result(file_path, state_hash, result, timer)
+            except Exception as e:
+                record_error(file_path, state_hash, e)
+            if quick_at is not None:
+                enrichment_lags.append(time.perf_counter() - quick_at)
+            record_latency(file_path, latencies)
+    
+    # Supervised mode: articles run in worker processes with deadlines
+    pool = None
+    # (file_path, state_hash) of timed-out articles, run again after the rest
+    retries = []
+    retried = recovered = 0
+    if workers:
+        # Counters the workers keep on their own copies, summed back in at the end
+        counted = {}
+        for prefix, counted_object, names in (
+                ("cache", cache, ("hits", "misses", "writes")),
+                ("stages", runner.store, ("hits", "misses", "writes")),
+                ("dedup", dedup, ("checked", "matched")),
+                ("gate", gate, ("checked", "gated", "light_seconds", "full_articles", "full_seconds")),
+                ("cascade", cascade_stats, ("articles", "sentences", "escalated", "chars", "escalated_chars",
+                                            "ner_calls"))):
+            if counted_object is not None:
+                for name in names:
+                    counted[f"{prefix}.{name}"] = (counted_object, name)
+        
+        def worker_counters():
+            totals = {key: getattr(counted_object, name) for key, (counted_object, name) in counted.items()}
+            # Escalation reasons are a Counter of their own
+            totals.update({f"cascade.reasons.{reason}": n for reason, n in cascade_stats.reasons.items()})
+            return totals
+        
+        def worker_init():
+            if dedup is not None:
+                dedup.reopen()
+        
+        pool = SupervisedWorkers(lambda file_path, worker_runner: process_article(file_path, cache, worker_runner,
+                                                                                  dedup, gate),
+                                 workers, article_timeout, stage_timeout, runner, worker_init, worker_counters)
+        print(f"Running articles in {workers} worker processes "
+              f"(deadlines: {article_timeout:.0f}s per article, {stage_timeout:.0f}s per stage)")
+    
+    def admit(file_path):
+        """Resume and state checks; returns (whether to run the article now, its content hash)."""
+        nonlocal skipped, processed
+        if os.path.basename(file_path) in completed:
+            # Only the first sighting is skipped, so a file rewritten during a watch is processed again
+            completed.discard(os.path.basename(file_path))
+            return False, None
+        
+        state_hash = None
+        if state is not None:
+            state_hash, status = state.register(file_path)
+            if status not in RUNNABLE:
+                skipped += 1
+                return False, None
+            if pool is not None and status == TIMED_OUT:
+                # Timed out in an earlier run: goes after this run's other articles
+                retries.append((file_path, state_hash))
+                return False, None
+            state.mark_processing(state_hash)
+        
+        processed += 1
+        position = f"{processed}/{total_files}" if total_files else f"{processed}"
+        print(f"Processing file {position}: {os.path.basename(file_path)}")
+        return True, state_hash
+    
+    def run_supervised(hashes, final=False):
+        """Run articles (file_path -> state_hash) in the pool and record their outcomes."""
+        nonlocal recovered
+        factor = RETRY_TIMEOUT_FACTOR if final else 1.0
+        for file_path, outcome in pool.run(list(hashes), factor):
+            state_hash = hashes[file_path]
+            if isinstance(outcome, ArticleStopped):
+                print(f"  Stopped {os.path.basename(file_path)}: {outcome}")
+                if state_hash:
+                    state.mark_timed_out(state_hash, outcome, duration=outcome.elapsed)
+                if not final:
+                    retries.append((file_path, state_hash))
+                    continue
+                # Sinks only take complete results; the partial one is superseded when a later run finishes it
+                partial = partial_result(outcome, os.path.basename(file_path))
+                if writer is not None:
+                    writer.write(partial)
+                else:
+                    results.append(partial)
+                continue
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                record_result(file_path, state_hash, outcome)
+                if final:
+                    recovered += 1
+            except Exception as e:
+                record_error(file_path, state_hash, e)
+            record_latency(file_path, latencies)
+    
+    def run_retries():
+        """Give the timed-out articles one more run with longer deadlines."""
+        nonlocal retried
+        while retries:
+            hashes = dict(retries)
+            retries.clear()
+            retried += len(hashes)
+            print(f"Retrying {len(hashes)} stopped articles with {RETRY_TIMEOUT_FACTOR:g}x deadlines")
+            for state_hash in hashes.values():
+                if state_hash:
+                    state.mark_processing(state_hash)
+            run_supervised(hashes, final=True)
+    
+    def process_batch(batch):
+        if pool is None:
+            for file_path in batch:
+                process_file(file_path)
+            return
+        hashes = {}
+        for file_path in batch:
+            run, state_hash = admit(file_path)
+            if run:
+                hashes[file_path] = state_hash
+        run_supervised(hashes)
+    
+    def process_file(file_path):
+        run, state_hash = admit(file_path)
+        if not run:
+            return
+        if worker is None:
+            try:
+                with metrics.timer(os.path.basename(file_path), "article") as timer, \
+                        profiler.article(os.path.basename(file_path)):
+                    result = process_article(file_path, cache, runner, dedup, gate)
+                    timer.output = [result]
+                record_result(file_path, state_hash, result, timer)
+            except Exception as e:
+                record_error(file_path, state_hash, e)
+            record_latency(file_path, latencies)
+            return
+        
+        # Tiered: the quick record goes out now, the models run on the worker
+        started = time.perf_counter()
+        try:
+            quick_runner.begin_article(os.path.basename(file_path))
+            article_data = load_article(file_path, quick_runner)
+            quick = quick_result(article_data, os.path.basename(file_path), quick_runner)
         except Exception as e:
-            print(f"  Error processing {os.path.basename(file_path)}: {str(e)}")
-            results.append({
-                "error": str(e),
-                "source": os.path.basename(file_path),
-                "processedAt": datetime.datetime.now().isoformat()
-            })
+            record_error(file_path, state_hash, e)
+            record_latency(file_path, latencies)
+            return
+        quick_at = None
+        if quick is not None:
+            writer.write(quick)
+            quick_at = time.perf_counter()
+            quick_times.append(quick_at - started)
+            record_latency(file_path, quick_latencies)
+        worker.submit((file_path, state_hash, article_data, quick_at))
+        collect(worker.finished())
+    
+    def flush():
+        for sink in sinks or []:
+            if hasattr(sink, "flush"):
+                sink.flush()
+        writer.flush()
+    
+    if watcher is not None and worker is not None:
+        def collect_while_waiting():
+            outcomes = worker.finished()
+            if outcomes:
+                collect(outcomes)
+                flush()
+        # Full results keep coming out while the watcher waits for new files
+        watcher.on_wait = collect_while_waiting
+    
+    if watcher is not None and pool is not None:
+        def retry_while_idle():
+            if retries and not watcher.pending:
+                run_retries()
+                flush()
+        # Timed-out articles only take the workers when nothing new is waiting
+        watcher.on_wait = retry_while_idle
+    
+    try:
+        for batch in batches:
+            process_batch(batch)
+            if watcher is not None:
+                # Make the batch visible to readers before waiting for more
+                flush()
+    except KeyboardInterrupt:
+        if watcher is None:
+            raise
+        print("Stopping watch")
+    
+    if worker is not None:
+        if worker.submitted:
+            print("Quick records written; waiting for the models to finish")
+        collect(worker.drain())
+    
+    if pool is not None:
+        try:
+            if watcher is None:
+                run_retries()
+            elif retries:
+                print(f"Leaving {len(retries)} timed-out articles for the next run")
+        finally:
+            pool.close()
+        for key, value in pool.counters.items():
+            if key.startswith("cascade.reasons."):
+                cascade_stats.reasons[key[len("cascade.reasons."):]] += value
+                continue
+            counted_object, name = counted[key]
+            setattr(counted_object, name, getattr(counted_object, name) + value)
+        pool.print_summary()
+        if retried:
+            print(f"Stopped: {retried} articles retried, {recovered} finished on retry, "
+                  f"{retried - recovered} kept partial results")
+    
+    if latencies:
+        latencies.sort()
+        print(f"Watch: {len(latencies)} articles, write-to-result latency "
+              f"p50 {percentile(latencies, 0.5):.1f}s, p95 {percentile(latencies, 0.95):.1f}s, "
+              f"max {latencies[-1]:.1f}s")
+    if quick_latencies:
+        quick_latencies.sort()
+        print(f"Watch: write-to-quick-record latency p50 {percentile(quick_latencies, 0.5):.2f}s, "
+              f"p95 {percentile(quick_latencies, 0.95):.2f}s")
+    if quick_times:
+        quick_times.sort()
+        enrichment_lags.sort()
+        print(f"Tiered: {len(quick_times)} quick records, p50 {percentile(quick_times, 0.5) * 1000:.1f} ms, "
+              f"p95 {percentile(quick_times, 0.95) * 1000:.1f} ms per article; full results followed "
+              f"p50 {percentile(enrichment_lags, 0.5):.1f}s, p95 {percentile(enrichment_lags, 0.95):.1f}s later")
+    
+    if state is not None:
+        backlog = state.backlog()
+        print(f"State: skipped {skipped} finished articles, backlog now {backlog['backlog']}")
+    
+    if cache is not None:
+        cache.evict()
+        stats = cache.stats()
+        cache.save_stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.0%}), {stats['entries']} entries")
+    
+    if runner.store is not None:
+        runner.store.evict()
+        reused = sum(runner.reused.values())
+        computed = sum(runner.computed.values())
+        print(f"Stages: {reused} reused, {computed} recomputed")
+        for name, counts in runner.summary().items():
+            if counts["computed"]:
+                print(f"  {name}: {counts['computed']} recomputed, {counts['reused']} reused")
+    
+    if dedup is not None:
+        dedup.print_summary()
+    if gate is not None:
+        gate.print_summary()
+    
+    metrics.print_summary()
+    cascade_stats.print_summary()
+    registry.print_summary()
+    metrics.close()
+    profiler.close()
     
     # Save results to a JSON file if output_file is specified
-    if output_file:
+    for sink in sinks or []:
+        sink.close()
+    if writer is not None:
+        writer.close()
+        print(f"Streamed {writer.written} results to {output_file}")
+    elif output_file:
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
         print(f"Results saved to {output_file}")
@@ -538,23 +1193,60 @@ def process_folder(folder_path, output_file=None):
 
 # Main execution
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python nlp_extractor.py <html_file_or_folder> [output_file]")
+    args = sys.argv[1:]
+    options = pop_common_options(args)
+    state_db = pop_option(args, "--state-db")
+    ENTITY_MODE = pop_option(args, "--entity-mode", ENTITY_MODE)
+    watch = pop_flag(args, "--watch")
+    watch_batch = int(pop_option(args, "--watch-batch", 8))
+    watch_max_wait_ms = float(pop_option(args, "--watch-max-wait-ms", 1000))
+    settle_ms = float(pop_option(args, "--settle-ms", 500))
+    watch_idle_exit = pop_option(args, "--watch-idle-exit")
+    tiered = pop_flag(args, "--tiered")
+    workers = int(pop_option(args, "--workers", 0))
+    article_timeout = float(pop_option(args, "--article-timeout", ARTICLE_TIMEOUT))
+    stage_timeout = float(pop_option(args, "--stage-timeout", STAGE_TIMEOUT))
+    
+    if ENTITY_MODE not in ENTITY_MODES:
+        print(f"Unknown entity mode: {ENTITY_MODE} (expected {' or '.join(ENTITY_MODES)})")
         sys.exit(1)
     
-    path = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    if len(args) < 1:
+        print(f"Usage: python nlp_extractor.py <html_file_or_folder> [output_file|output.jsonl] {COMMON_USAGE} "
+              "[--state-db PATH] [--entity-mode spacy|cascade] [--watch] [--watch-batch N] [--watch-max-wait-ms N] "
+              "[--settle-ms N] [--watch-idle-exit SECONDS] [--tiered] [--workers N] [--article-timeout SECONDS] "
+              "[--stage-timeout SECONDS]")
+        sys.exit(1)
+    
+    path = args[0]
+    output_file = args[1] if len(args) > 1 else None
+    
+    cache, runner, profiler, dedup, gate = build_pipeline(options)
     
     if os.path.isdir(path):
         # Process all HTML files in the folder
-        results = process_folder(path, output_file)
+        state = ProcessingState(state_db) if state_db else None
+        sinks = build_sinks(options)
+        watcher = None
+        if watch:
+            watcher = FolderWatcher(path, settle_seconds=settle_ms / 1000, batch_size=watch_batch,
+                                    max_wait_seconds=watch_max_wait_ms / 1000,
+                                    idle_exit_seconds=float(watch_idle_exit) if watch_idle_exit else None)
+            # Finish the current batch and shut down cleanly when the service is stopped
+            signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+        results = process_folder(path, output_file, cache, runner, state, options["fsync_every"], sinks, profiler, watcher,
+                                 dedup=dedup, tiered=tiered, gate=gate, workers=workers,
+                                 article_timeout=article_timeout, stage_timeout=stage_timeout)
+        if state is not None:
+            state.close()
         if not output_file:
             # Print the results as JSON if no output file is specified
             print(json.dumps(results, indent=2, ensure_ascii=False))
     else:
         # Process a single file
         try:
-            result = process_article(path)
+            with profiler.article(os.path.basename(path)):
+                result = process_article(path, cache, runner, dedup, gate)
             # Print the result as JSON
             print(json.dumps(result, indent=2, ensure_ascii=False))
             
@@ -568,4 +1260,7 @@ if __name__ == "__main__":
                 "error": str(e),
                 "source": os.path.basename(path),
                 "processedAt": datetime.datetime.now().isoformat()
-            }, indent=2, ensure_ascii=False))
\ No newline at end of file
+            }, indent=2, ensure_ascii=False))
+        finally:
+            runner.metrics.close()
+            profiler.close()
\ No newline at end of file
@@ -3,39 +3,93 @@ import os
 import sys
 import json
 import re
+import time
 import datetime
-import spacy
 from bs4 import BeautifulSoup
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
 import glob
 import torch
+from result_cache import content_hash
+from stage_runner import StageRunner, file_digest
+from result_writers import JsonlWriter, is_streaming_output
+from model_registry import registry
+from stage_metrics import StageMetrics
+from memory_metrics import BatchSizer
+from stage_profiler import StageProfiler
+from full_article_parser import page_fields, extract_victims, PAGE_FIELDS
+from relevance_gate import CRIME_INDICATORS
+import extractor_common
+from extractor_common import (patch_near_duplicate, light_result, pop_common_options,
+                              build_pipeline, build_sinks, COMMON_USAGE)
+
+# This module as the shared helpers in extractor_common.py see it
+EXTRACTOR = sys.modules[__name__]
+
+# Bump when result assembly changes so cached results are not reused
+EXTRACTOR_VERSION = "1.3.0"
+
+# Model identifiers (also part of the cache keys)
+SPACY_MODEL = "en_core_web_lg"
+NER_MODEL = "dslim/bert-base-NER"
+CLASSIFIER_MODEL = "facebook/bart-large-mnli"
+
+# Per-stage versions for incremental recomputation: bump a stage's entry when
+# its code changes and only that stage (and stages consuming it) is recomputed
+STAGE_VERSIONS = {
+    "content": "2",
+    "spacy_entities": "1",
+    "perpetrators": "1",
+    "victims": "1",
+    "sentences": "1",
+    "charges": "1",
+    "money_amounts": "1",
+    "drug_quantities": "1",
+    "timeline": "1",
+    "categories": "1"
+}
+
+# Model behind each model-backed stage
+STAGE_MODELS = {
+    "spacy_entities": SPACY_MODEL,
+    "categories": CLASSIFIER_MODEL
+}
 
 # Load NLP models
-try:
-    print("Loading NLP models... (this may take a minute)")
-    # Load spaCy for general NER
-    nlp = spacy.load("en_core_web_lg")
-    
-    # Load Hugging Face transformers for specialized NER
-    tokenizer = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
-    model = AutoModelForTokenClassification.from_pretrained("dslim/bert-base-NER")
-    
-    # Move models to GPU if available
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    model = model.to(device)
-    
-    ner_pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple", device=0 if torch.cuda.is_available() else -1)
-    
-    # Zero-shot classification for crime categorization
-    classifier = pipeline("zero-shot-classification", 
-                         model="facebook/bart-large-mnli",
-                         device=0 if torch.cuda.is_available() else -1)
-    
-    models_loaded = True
-    print(f"Models loaded successfully on device: {device}")
-except Exception as e:
-    print(f"Could not load all models: {str(e)}")
-    models_loaded = False
+def load_models():
+    """Load spaCy and the zero-shot classifier (used by every run) into module globals."""
+    global nlp, device, classifier, models_loaded
+    try:
+        print("Loading NLP models... (this may take a minute)")
+        # Load spaCy for general NER
+        nlp = registry.get("spacy", SPACY_MODEL)
+        
+        # Run the transformers on the GPU if available
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        
+        # Zero-shot classification for crime categorization
+        classifier = registry.get("zero-shot", CLASSIFIER_MODEL, pipeline_device())
+        
+        models_loaded = True
+        print(f"Models loaded successfully on device: {device}")
+    except Exception as e:
+        print(f"Could not load all models: {str(e)}")
+        models_loaded = False
+
+def pipeline_device():
+    """transformers pipeline device index: the first GPU, or -1 for CPU."""
+    return 0 if torch.cuda.is_available() else -1
+
+def get_ner_pipeline():
+    """The transformer NER pipeline, loaded on first use since no default stage needs it."""
+    global ner_pipeline
+    if ner_pipeline is None:
+        ner_pipeline = registry.get("ner", NER_MODEL, pipeline_device())
+    return ner_pipeline
+
+# NCA_SKIP_MODEL_LOAD=1 leaves the models unloaded so callers (e.g. benchmark.py) can install their own
+models_loaded = False
+ner_pipeline = None
+if not os.environ.get("NCA_SKIP_MODEL_LOAD"):
+    load_models()
 
 # Helper functions
 def clean_text(text):
@@ -83,7 +137,8 @@ def extract_content_from_html(html_path):
                     "title": data.get("title", ""),
                     "content": data.get("content", ""),
                     "html_path": html_path,
-                    "extraction_method": "json_in_html"
+                    "extraction_method": "json_in_html",
+                    "page": {field: data.get(field, "") for field in PAGE_FIELDS}
                 }
     except:
         pass
@@ -97,7 +152,8 @@ def extract_content_from_html(html_path):
                     "title": data.get("title", ""),
                     "content": data.get("content", ""),
                     "html_path": html_path,
-                    "extraction_method": "pure_json"
+                    "extraction_method": "pure_json",
+                    "page": {field: data.get(field, "") for field in PAGE_FIELDS}
                 }
         except:
             pass
@@ -152,7 +208,9 @@ def extract_content_from_html(html_path):
         "title": title,
         "content": article_content,
         "html_path": html_path,
-        "extraction_method": "html_parsing"
+        "extraction_method": "html_parsing",
+        # report.json's page fields from the same parse (see full_article_parser.py)
+        "page": page_fields(soup)
     }
 
 # Entity extraction functions
@@ -202,7 +260,7 @@ def extract_entities_transformers(text, chunk_size=512):
     all_entities = []
     for chunk in chunks:
         try:
-            entities = ner_pipeline(chunk)
+            entities = get_ner_pipeline()(chunk)
             all_entities.extend(entities)
         except Exception as e:
             print(f"Error in transformers NER: {str(e)}")
@@ -255,10 +313,7 @@ def extract_perpetrators(text, people):
     perpetrators = []
     
     # Common crime-related words to look for near names
-    crime_indicators = [
-        'convicted', 'sentenced', 'pleaded guilty', 'admitted', 'arrested', 
-        'charged', 'jailed', 'imprisoned', 'smuggler', 'dealer', 'trafficker'
-    ]
+    crime_indicators = CRIME_INDICATORS
     
     # Process each person
     for person in people:
@@ -444,11 +499,38 @@ def extract_timeline(text, dates):
     
     return timeline
 
+# Result caching and stage versions
+def stage_version(name):
+    """Return the full version of a stage, including the model it runs when model-backed."""
+    return extractor_common.stage_version(EXTRACTOR, name)
+
+def article_cache_key(title, content):
+    """Build the result cache key from normalised content plus extractor and stage versions."""
+    stage_versions = {name: stage_version(name) for name in STAGE_VERSIONS}
+    return content_hash(clean_text(title), clean_text(content), EXTRACTOR_VERSION, stage_versions)
+
+def results_version():
+    """Version of the results as a whole; near-duplicates only reuse results of the same version."""
+    return content_hash(EXTRACTOR_VERSION, {name: stage_version(name) for name in STAGE_VERSIONS})
+
 # Main extraction function with GPU optimization
-def process_article(file_path):
-    """Process an article file and extract structured data."""
+def process_article(file_path, cache=None, runner=None, dedup=None, gate=None):
+    """Process an article file and extract structured data.
+    
+    With a NearDuplicateIndex, an article close enough to one processed
+    before is patched from the earlier result instead of running the models.
+    With a RelevanceGate, an article scoring below its min_score gets a light
+    result (see light_result); light results are not cached or indexed.
+    """
+    if runner is None:
+        runner = StageRunner()
+    runner.begin_article(os.path.basename(file_path))
+    
+    def stage(name, func, *args, key=None):
+        return runner.run(name, stage_version(name), func, *args, key=key)
+    
     # Extract the content
-    article_data = extract_content_from_html(file_path)
+    article_data = stage("content", extract_content_from_html, file_path, key=(file_digest(file_path),))
     title = article_data["title"]
     content = article_data["content"]
     
@@ -463,23 +545,55 @@ def process_article(file_path):
             "extraction_error": "Insufficient content extracted"
         }
     
+    # Reuse a previous result for identical content without touching the models
+    cache_key = None
+    if cache is not None:
+        cache_key = article_cache_key(title, content)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached["source"] = os.path.basename(file_path)
+            cached["processedAt"] = datetime.datetime.now().isoformat()
+            return cached
+    
+    # Republished or lightly edited articles reuse the earlier article's model outputs
+    signature = None
+    if dedup is not None:
+        match, signature = dedup.find(content, results_version())
+        if match is not None:
+            result = patch_near_duplicate(EXTRACTOR, match, article_data, os.path.basename(file_path), stage)
+            if cache_key:
+                cache.put(cache_key, result)
+            return result
+    
+    # Corporate news, recruitment and reports skip the models.  Checked after the
+    # near-duplicate lookup, so the gate's counts and timings only cover articles
+    # that would otherwise run the models
+    started = time.perf_counter()
+    if gate is not None:
+        relevant, score = gate.check(title, content)
+        if not relevant:
+            result = light_result(EXTRACTOR, article_data, os.path.basename(file_path), stage, score)
+            gate.record_light(time.perf_counter() - started)
+            return result
+    
     # Entity extraction using spaCy
-    spacy_entities = extract_entities_spacy(content)
+    spacy_entities = stage("spacy_entities", extract_entities_spacy, content)
     
     # Extract perpetrators
-    perpetrators = extract_perpetrators(content, spacy_entities["people"])
+    perpetrators = stage("perpetrators", extract_perpetrators, content, spacy_entities["people"])
+    victims = stage("victims", extract_victims, content)
     
     # Extract sentences, charges, money, drugs
-    sentences = extract_sentences(content)
-    charges = extract_charges(content)
-    money_amounts = extract_money_amounts(content)
-    drug_quantities = extract_drug_quantities(content)
+    sentences = stage("sentences", extract_sentences, content)
+    charges = stage("charges", extract_charges, content)
+    money_amounts = stage("money_amounts", extract_money_amounts, content)
+    drug_quantities = stage("drug_quantities", extract_drug_quantities, content)
     
     # Extract timeline
-    timeline = extract_timeline(content, spacy_entities["dates"])
+    timeline = stage("timeline", extract_timeline, content, spacy_entities["dates"])
     
     # Crime categorization
-    crime_categories = categorize_crime(content) if models_loaded else []
+    crime_categories = stage("categories", categorize_crime, content)
     
     # Compile and return the results
     result = {
@@ -491,17 +605,41 @@ def process_article(file_path):
         "organizations": spacy_entities["organizations"],
         "timeline": timeline,
         "perpetrators": perpetrators,
+        "victims": victims,
         "sentences": sentences,
         "charges": charges,
         "moneyAmounts": money_amounts,
         "drugQuantities": drug_quantities,
-        "categories": [c["category"] for c in crime_categories if c["confidence"] > 0.4]
+        "categories": [c["category"] for c in crime_categories if c["confidence"] > 0.4],
+        **(article_data.get("page") or {})
     }
     
+    if cache_key:
+        cache.put(cache_key, result)
+    if signature is not None:
+        dedup.add(signature, os.path.basename(file_path), results_version(), result)
+    if gate is not None:
+        gate.record_full(time.perf_counter() - started)
+    
     return result
 
-def process_folder_with_gpu(folder_path, output_file=None, batch_size=8):
-    """Process HTML files in a folder with GPU-aware batching for optimal performance."""
+def process_folder_with_gpu(folder_path, output_file=None, batch_size=8, cache=None, runner=None, fsync_every=10,
+                            sinks=None, profiler=None, dedup=None, gate=None):
+    """Process HTML files in a folder with GPU-aware batching for optimal performance.
+    
+    An output_file ending in .jsonl streams one record per article and skips
+    sources already present in it; the returned list is then empty. Each
+    result is also passed to every sink in sinks (objects with write/close,
+    e.g. ParquetWriter), which are closed at the end. Per-stage, per-article
+    and per-batch timings are collected in runner.metrics and summarised at
+    the end.
+    
+    When runner.metrics has a MemoryTracker with a ceiling, a batch that peaks
+    above it halves the batch size (growing back once memory is calm), so a
+    few huge pages landing together do not exhaust a small worker. With a
+    StageProfiler, sampled articles are profiled. With a NearDuplicateIndex,
+    near-duplicates of earlier articles are patched from their results.
+    """
     if not os.path.isdir(folder_path):
         print(f"Error: {folder_path} is not a valid directory")
         return
@@ -513,6 +651,14 @@ def process_folder_with_gpu(folder_path, output_file=None, batch_size=8):
         print(f"No HTML files found in {folder_path}")
         return
     
+    if runner is None:
+        runner = StageRunner()
+    if runner.metrics is None:
+        runner.metrics = StageMetrics()
+    metrics = runner.metrics
+    if profiler is None:
+        profiler = StageProfiler(None)
+    
     # Process files in batches for optimal GPU utilization
     results = []
     total_files = len(html_files)
@@ -524,34 +670,95 @@ def process_folder_with_gpu(folder_path, output_file=None, batch_size=8):
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
     
-    for i in range(0, total_files, batch_size):
-        batch_files = html_files[i:i+batch_size]
+    # Streaming mode appends to the output as we go and resumes after a crash
+    writer = None
+    if is_streaming_output(output_file):
+        writer = JsonlWriter(output_file, fsync_every)
+        completed = writer.completed_sources()
+        if completed:
+            html_files = [f for f in html_files if os.path.basename(f) not in completed]
+            total_files = len(html_files)
+            print(f"Resuming: {len(completed)} articles already in {output_file}, {total_files} left")
+    
+    sizer = BatchSizer(batch_size, metrics.memory)
+    i = 0
+    batch_num = 0
+    while i < total_files:
+        batch_files = html_files[i:i+sizer.size]
         batch_results = []
+        batch_num += 1
         
-        for file_idx, file_path in enumerate(batch_files):
-            file_num = i + file_idx + 1
-            print(f"Processing file {file_num}/{total_files}: {os.path.basename(file_path)}")
-            try:
-                result = process_article(file_path)
-                batch_results.append(result)
-                print(f"  Successfully processed: {os.path.basename(file_path)}")
-            except Exception as e:
-                print(f"  Error processing {os.path.basename(file_path)}: {str(e)}")
-                batch_results.append({
-                    "error": str(e),
-                    "source": os.path.basename(file_path),
-                    "processedAt": datetime.datetime.now().isoformat()
-                })
+        with metrics.timer(f"batch-{batch_num}", "batch") as batch_timer:
+            for file_idx, file_path in enumerate(batch_files):
+                file_num = i + file_idx + 1
+                print(f"Processing file {file_num}/{total_files}: {os.path.basename(file_path)}")
+                try:
+                    with metrics.timer(os.path.basename(file_path), "article") as timer, \
+                            profiler.article(os.path.basename(file_path)):
+                        result = process_article(file_path, cache, runner, dedup, gate)
+                        timer.output = [result]
+                    batch_results.append(result)
+                    print(f"  Successfully processed: {os.path.basename(file_path)}")
+                except Exception as e:
+                    print(f"  Error processing {os.path.basename(file_path)}: {str(e)}")
+                    batch_results.append({
+                        "error": str(e),
+                        "source": os.path.basename(file_path),
+                        "processedAt": datetime.datetime.now().isoformat()
+                    })
+            batch_timer.output = batch_results
+        i += len(batch_files)
         
-        # Extend results with this batch
-        results.extend(batch_results)
+        # Stream or keep the results of this batch
+        for sink in sinks or []:
+            for result in batch_results:
+                sink.write(result)
+        if writer is not None:
+            for result in batch_results:
+                writer.write(result)
+        else:
+            results.extend(batch_results)
         
-        # Optional: Free up GPU memory between batches
-        if torch.cuda.is_available():
+        if batch_timer.memory:
+            # Memory is measured: shrink the next batch (and free caches) only when over the ceiling
+            sizer.update(batch_timer.memory["peakRssMb"])
+        elif torch.cuda.is_available():
+            # Optional: Free up GPU memory between batches
             torch.cuda.empty_cache()
     
+    if cache is not None:
+        cache.evict()
+        stats = cache.stats()
+        cache.save_stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.0%}), {stats['entries']} entries")
+    
+    if runner.store is not None:
+        runner.store.evict()
+        reused = sum(runner.reused.values())
+        computed = sum(runner.computed.values())
+        print(f"Stages: {reused} reused, {computed} recomputed")
+        for name, counts in runner.summary().items():
+            if counts["computed"]:
+                print(f"  {name}: {counts['computed']} recomputed, {counts['reused']} reused")
+    
+    if dedup is not None:
+        dedup.print_summary()
+    if gate is not None:
+        gate.print_summary()
+    
+    metrics.print_summary()
+    registry.print_summary()
+    metrics.close()
+    profiler.close()
+    
     # Save results to a JSON file if output_file is specified
-    if output_file:
+    for sink in sinks or []:
+        sink.close()
+    if writer is not None:
+        writer.close()
+        print(f"Streamed {writer.written} results to {output_file}")
+    elif output_file:
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
         print(f"Results saved to {output_file}")
@@ -590,12 +797,17 @@ def transfer_results_to_n8n(local_file_path, remote_server="crimestories.co.uk",
 
 # Main execution
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python nlp_extractor_gpu.py <html_file_or_folder> [output_file]")
+    args = sys.argv[1:]
+    options = pop_common_options(args)
+    
+    if len(args) < 1:
+        print(f"Usage: python nlp_extractor_gpu.py <html_file_or_folder> [output_file|output.jsonl] {COMMON_USAGE}")
         sys.exit(1)
     
-    path = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    path = args[0]
+    output_file = args[1] if len(args) > 1 else None
+    
+    cache, runner, profiler, dedup, gate = build_pipeline(options)
     
     # Print GPU information if available
     if torch.cuda.is_available():
@@ -607,7 +819,9 @@ if __name__ == "__main__":
     
     if os.path.isdir(path):
         # Process all HTML files in the folder with GPU optimization
-        results = process_folder_with_gpu(path, output_file)
+        sinks = build_sinks(options)
+        results = process_folder_with_gpu(path, output_file, cache=cache, runner=runner, fsync_every=options["fsync_every"],
+                                          sinks=sinks, profiler=profiler, dedup=dedup, gate=gate)
         if not output_file:
             # Print the results as JSON if no output file is specified
             print(json.dumps(results, indent=2, ensure_ascii=False))
@@ -617,7 +831,8 @@ if __name__ == "__main__":
     else:
         # Process a single file
         try:
-            result = process_article(path)
+            with profiler.article(os.path.basename(path)):
+                result = process_article(path, cache, runner, dedup, gate)
             # Print the result as JSON
             print(json.dumps(result, indent=2, ensure_ascii=False))
             
@@ -639,4 +854,7 @@ if __name__ == "__main__":
                 "error": str(e),
                 "source": os.path.basename(path),
                 "processedAt": datetime.datetime.now().isoformat()
-            }, indent=2, ensure_ascii=False))
\ No newline at end of file
+            }, indent=2, ensure_ascii=False))
+        finally:
+            runner.metrics.close()
+            profiler.close()
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+import argparse
+import datetime
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoTokenizer
+
+from model_settings import BACKENDS
+from quantization import (PRECISIONS, MODEL_CLASSES, load_sample, timed, latency_summary,
+                          ner_agreement, classifier_agreement, ner_pipeline_for, zero_shot_pipeline_for)
+
+try:
+    import onnxruntime as ort
+    onnxruntime_available = True
+except ImportError:
+    onnxruntime_available = False
+
+# ONNX Runtime inference backend for the transformer NER and zero-shot models.
+#
+# Each model is exported to ONNX once (input_ids/attention_mask -> logits)
+# and the graph cached on disk; int8 precision quantises the exported graph
+# with onnxruntime's dynamic quantisation.  Tokenisation, entity aggregation
+# ("simple", as the transformers pipeline does it) and the zero-shot NLI
+# scoring are done here, so callers get the same output format as the
+# pipeline objects while the thread pools are configurable:
+#
+#   NCA_BACKEND=onnx                 use this backend (default: pytorch)
+#   NCA_ORT_INTRA_OP_THREADS=N       threads used inside an operator
+#   NCA_ORT_INTER_OP_THREADS=N       threads running independent operators
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nca_onnx")
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+
+def env_threads(name):
+    value = os.environ.get(name)
+    return int(value) if value else 0
+
+
+def onnx_path(model_id, precision="fp32", cache_dir=None):
+    cache_dir = cache_dir or os.environ.get("NCA_ONNX_CACHE", DEFAULT_CACHE_DIR)
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', model_id)
+    return os.path.join(cache_dir, name, f"model.{precision}.onnx")
+
+
+class LogitsOnly(torch.nn.Module):
+    """Wraps a transformers model so the exported graph has plain tensor inputs and a logits output."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_model(kind, model_id, precision="fp32", cache_dir=None):
+    """Export (and for int8 quantise) a model to ONNX unless already cached; returns the graph path."""
+    path = onnx_path(model_id, precision, cache_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    if precision == "int8":
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(export_model(kind, model_id, "fp32", cache_dir), tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, path)
+        return path
+
+    started = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = MODEL_CLASSES[kind].from_pretrained(model_id).eval()
+    if kind == "ner":
+        sample = tokenizer("Officers from the NCA arrested John Smith in Liverpool.", return_tensors="pt")
+        logits_axes = {0: "batch", 1: "sequence"}
+    else:
+        sample = tokenizer("Officers arrested a man in Liverpool.", HYPOTHESIS_TEMPLATE.format("Fraud"),
+                           return_tensors="pt")
+        logits_axes = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsOnly(model), (sample["input_ids"], sample["attention_mask"]), tmp_path,
+            input_names=["input_ids", "attention_mask"], output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": logits_axes
+            },
+            opset_version=14, do_constant_folding=True)
+    os.replace(tmp_path, path)
+    print(f"Exported {model_id} to {path} in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def softmax(logits, axis=-1):
+    shifted = np.exp(logits - logits.max(axis=axis, keepdims=True))
+    return shifted / shifted.sum(axis=axis, keepdims=True)
+
+
+class OnnxModel:
+    """An exported model in an ONNX Runtime session, with its tokenizer and config."""
+
+    kind = None
+
+    def __init__(self, model_id, precision="fp32", cache_dir=None, intra_op_threads=None, inter_op_threads=None):
+        if not onnxruntime_available:
+            raise ImportError("onnxruntime is not installed")
+        self.model_id = model_id
+        self.precision = precision
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.config = AutoConfig.from_pretrained(model_id)
+        self.max_length = min(self.tokenizer.model_max_length, self.config.max_position_embeddings)
+        self.path = export_model(self.kind, model_id, precision, cache_dir)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads if intra_op_threads is not None else env_threads("NCA_ORT_INTRA_OP_THREADS")
+        options.inter_op_num_threads = inter_op_threads if inter_op_threads is not None else env_threads("NCA_ORT_INTER_OP_THREADS")
+        if options.inter_op_num_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.model = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+
+    def logits(self, encoding):
+        feed = {name: encoding[name].astype(np.int64) for name in ("input_ids", "attention_mask")}
+        return self.model.run(["logits"], feed)[0]
+
+
+class OnnxTokenClassifier(OnnxModel):
+    """Drop-in for pipeline("ner", aggregation_strategy="simple")."""
+
+    kind = "ner"
+
+    def __call__(self, text):
+        encoding = self.tokenizer(text, return_offsets_mapping=True, return_special_tokens_mask=True,
+                                  truncation=True, max_length=self.max_length, return_tensors="np")
+        scores = softmax(self.logits(encoding)[0])
+        input_ids = encoding["input_ids"][0]
+        offsets = encoding["offset_mapping"][0]
+        special = encoding["special_tokens_mask"][0]
+
+        tokens = []
+        for index, token_scores in enumerate(scores):
+            if special[index]:
+                continue
+            label_id = int(token_scores.argmax())
+            tokens.append({
+                "entity": self.config.id2label[label_id],
+                "score": float(token_scores[label_id]),
+                "word": self.tokenizer.convert_ids_to_tokens(int(input_ids[index])),
+                "start": int(offsets[index][0]),
+                "end": int(offsets[index][1])
+            })
+        return [group for group in self.group_entities(tokens) if group["entity_group"] != "O"]
+
+    @staticmethod
+    def split_tag(entity):
+        if entity.startswith("B-") or entity.startswith("I-"):
+            return entity[0], entity[2:]
+        return "I", entity
+
+    def group_entities(self, tokens):
+        """Merge consecutive tokens of the same type, starting a new group at each B- tag."""
+        groups, current = [], []
+        for token in tokens:
+            bi, tag = self.split_tag(token["entity"])
+            if current and (tag != self.split_tag(current[-1]["entity"])[1] or bi == "B"):
+                groups.append(self.merge(current))
+                current = []
+            current.append(token)
+        if current:
+            groups.append(self.merge(current))
+        return groups
+
+    def merge(self, tokens):
+        return {
+            "entity_group": self.split_tag(tokens[0]["entity"])[1],
+            "score": float(np.mean([token["score"] for token in tokens])),
+            "word": self.tokenizer.convert_tokens_to_string([token["word"] for token in tokens]),
+            "start": tokens[0]["start"],
+            "end": tokens[-1]["end"]
+        }
+
+
+class OnnxZeroShotClassifier(OnnxModel):
+    """Drop-in for pipeline("zero-shot-classification"); all labels run in one batch."""
+
+    kind = "classifier"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entailment_id = next((index for label, index in self.config.label2id.items()
+                                   if label.lower().startswith("entail")), -1)
+        self.contradiction_id = -1 if self.entailment_id == 0 else 0
+
+    def __call__(self, text, candidate_labels, multi_label=False, hypothesis_template=HYPOTHESIS_TEMPLATE):
+        if isinstance(candidate_labels, str):
+            candidate_labels = [label.strip() for label in candidate_labels.split(",") if label.strip()]
+        encoding = self.tokenizer([text] * len(candidate_labels),
+                                  [hypothesis_template.format(label) for label in candidate_labels],
+                                  padding=True, truncation="only_first", max_length=self.max_length,
+                                  return_tensors="np")
+        logits = self.logits(encoding)
+        if multi_label or len(candidate_labels) == 1:
+            scores = softmax(logits[:, [self.contradiction_id, self.entailment_id]])[:, 1]
+        else:
+            scores = softmax(logits[:, self.entailment_id], axis=0)
+        order = scores.argsort()[::-1]
+        return {
+            "sequence": text,
+            "labels": [candidate_labels[i] for i in order],
+            "scores": [float(scores[i]) for i in order]
+        }
+
+
+# Benchmark
+def run_benchmark(corpus_dir, size, kinds, precision="fp32", intra_op_threads=0, inter_op_threads=0):
+    """Compare the ONNX Runtime backend with the transformers pipelines on a fixed sample."""
+    texts, extractor = load_sample(corpus_dir, size)
+    if not texts:
+        raise ValueError(f"No articles with content in {corpus_dir}")
+    print(f"Benchmarking on {len(texts)} articles (precision {precision}, "
+          f"intra-op {intra_op_threads or 'default'}, inter-op {inter_op_threads or 'default'})")
+
+    specs = {
+        "ner": (extractor.NER_MODEL, ner_pipeline_for, OnnxTokenClassifier, ner_agreement,
+                [extractor.text_to_chunks(text)[0] for text in texts], {}),
+        "classifier": (extractor.CLASSIFIER_MODEL, zero_shot_pipeline_for, OnnxZeroShotClassifier,
+                       classifier_agreement, [text[:2000] for text in texts],
+                       {"candidate_labels": extractor.CRIME_CATEGORIES, "multi_label": True})
+    }
+    results = {}
+    for kind in kinds:
+        model_id, pytorch_factory, onnx_class, agreement, inputs, kwargs = specs[kind]
+        result = {"model": model_id, "samples": len(inputs)}
+        outputs = {}
+        for backend in BACKENDS:
+            print(f"  {kind} {backend}: loading {model_id}")
+            started = time.perf_counter()
+            if backend == "pytorch":
+                runner = pytorch_factory(model_id, precision)
+            else:
+                runner = onnx_class(model_id, precision, intra_op_threads=intra_op_threads,
+                                    inter_op_threads=inter_op_threads)
+            load_seconds = time.perf_counter() - started
+            runner(inputs[0], **kwargs)
+            outputs[backend], latencies = timed(lambda item: runner(item, **kwargs), inputs)
+            result[backend] = dict(latency_summary(latencies), loadSeconds=round(load_seconds, 2))
+            del runner
+        result["speedup"] = round(result["pytorch"]["meanMs"] / result["onnx"]["meanMs"], 2)
+        result["agreement"] = agreement(outputs["pytorch"], outputs["onnx"])
+        results[kind] = result
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "corpus": os.path.abspath(corpus_dir),
+        "precision": precision,
+        "intraOpThreads": intra_op_threads,
+        "interOpThreads": inter_op_threads,
+        "torchThreads": torch.get_num_threads(),
+        "models": results
+    }
+
+
+def print_report(report):
+    print(f"\n{'model':<12}{'backend':<10}{'mean ms':>9}{'p50 ms':>9}{'load s':>9}")
+    for kind, result in report["models"].items():
+        for backend in BACKENDS:
+            row = result[backend]
+            print(f"{kind:<12}{backend:<10}{row['meanMs']:>9.1f}{row['p50Ms']:>9.1f}{row['loadSeconds']:>9.1f}")
+        agreement = ", ".join(f"{name} {value}" for name, value in result["agreement"].items())
+        print(f"{'':<12}speedup {result['speedup']}x; agreement with pytorch: {agreement}")
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ONNX Runtime backend for the transformer models")
+    parser.add_argument("--models", default="ner,classifier", help="Comma-separated: ner, classifier")
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("export", help="Export (and cache) the ONNX graphs")
+
+    bench = commands.add_parser("benchmark", help="Compare ONNX Runtime with the transformers pipelines")
+    bench.add_argument("corpus_dir", help="Folder of article HTML files (e.g. from benchmark.py generate)")
+    bench.add_argument("--sample", type=int, default=50, help="Number of articles (first N by name)")
+    bench.add_argument("--intra-op-threads", type=int, default=0, help="0 lets ONNX Runtime decide")
+    bench.add_argument("--inter-op-threads", type=int, default=0, help="0 lets ONNX Runtime decide")
+    bench.add_argument("--output", help="Write the JSON report here")
+
+    options = parser.parse_args()
+    kinds = [kind.strip() for kind in options.models.split(",") if kind.strip()]
+    unknown = set(kinds) - set(MODEL_CLASSES)
+    if unknown:
+        parser.error(f"Unknown model kind(s): {', '.join(sorted(unknown))}")
+    if not onnxruntime_available:
+        print("onnxruntime is not installed (pip install onnxruntime)")
+        raise SystemExit(1)
+
+    if options.command == "export":
+        os.environ.setdefault("NCA_SKIP_MODEL_LOAD", "1")
+        import nlp_extractor
+        model_ids = {"ner": nlp_extractor.NER_MODEL, "classifier": nlp_extractor.CLASSIFIER_MODEL}
+        for kind in kinds:
+            print(export_model(kind, model_ids[kind], options.precision))
+    else:
+        report = run_benchmark(options.corpus_dir, options.sample, kinds, options.precision,
+                               options.intra_op_threads, options.inter_op_threads)
+        print_report(report)
+        if options.output:
+            with open(options.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {options.output}")
@@ -8,20 +8,47 @@ import glob
 import subprocess
 import time
 import traceback
+from processing_state import ProcessingState, RUNNABLE, DONE, PROCESSING
+from run_log import RunLog
 
-# Global log for collecting messages
-log_messages = []
+# Helper modules imported by nlp_extractor_gpu.py, shipped alongside it
+SUPPORT_MODULES = [
+    "result_cache.py", "stage_runner.py", "result_writers.py", "article_index.py",
+    "stage_metrics.py", "memory_metrics.py", "stage_profiler.py", "model_registry.py",
+    "model_cache.py", "near_duplicates.py", "full_article_parser.py", "relevance_gate.py",
+    "extractor_common.py"
+]
 
-def log(message, level="INFO"):
-    """Log a message and print it"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    formatted = f"[{level}] {timestamp} - {message}"
-    print(formatted)
-    log_messages.append({"level": level, "message": message, "timestamp": timestamp})
+# Remote result cache; survives between runs for as long as the instance lives
+REMOTE_CACHE_DIR = "/workspace/cache"
 
-def prepare_gpu_processing():
+# Remote near-duplicate index (MinHash signatures of processed articles); None disables
+REMOTE_DEDUP_DB = "/workspace/cache/near_duplicates.db"
+
+# Articles with a keyword relevance score below this skip the models (see relevance_gate.py); None disables
+REMOTE_RELEVANCE_MIN_SCORE = None
+
+# RSS ceiling for the remote run in MB; batches shrink when one peaks above it (None disables)
+REMOTE_MEMORY_CEILING_MB = None
+
+# Local record of every article seen, its status, timings and output location
+STATE_DB_PATH = "/home/n8n/processing_state.db"
+
+# Full structured log (JSON lines, rotated); stdout only carries the final JSON summary
+LOG_FILE_PATH = "/home/n8n/logs/process_articles_gpu.log"
+
+# Messages kept in memory for the summary
+LOG_RETENTION = 200
+
+run_log = RunLog("process_articles_gpu", LOG_FILE_PATH, retention=LOG_RETENTION)
+
+def log(message, level="INFO", **fields):
+    """Log a message to stderr and the log file; large outputs go in fields"""
+    run_log.log(message, level, **fields)
+
+def prepare_gpu_processing(state):
     """
-    Prepare directories for GPU-based NLP processing
+    Stage pending and failed articles for GPU-based NLP processing
     """
     # Base directories
     base_dir = '/home/n8n'
@@ -34,25 +61,41 @@ def prepare_gpu_processing():
     os.makedirs(gpu_output_dir, exist_ok=True)
     log(f"Created or verified directories: {gpu_input_dir}, {gpu_output_dir}")
     
-    # Clean previous input files
-    removed_count = 0
-    for existing_file in glob.glob(os.path.join(gpu_input_dir, '*')):
-        os.remove(existing_file)
-        removed_count += 1
-    log(f"Cleaned {removed_count} previous files from {gpu_input_dir}")
-    
-    # Find HTML files in the input directory
-    html_files = glob.glob(os.path.join(input_dir, '*.html'))
+    # Articles left in processing by an interrupted run are retried
+    stale = state.reset_stale()
+    if stale:
+        log(f"Returned {stale} articles from an interrupted run to pending", "WARNING")
     
-    if not html_files:
-        log(f"No HTML files found in {input_dir}", "WARNING")
+    # Drop staged files whose content is already processed; keep the rest
+    staged_hashes = set()
+    removed_count = 0
+    for staged_file in glob.glob(os.path.join(gpu_input_dir, '*.html')):
+        content_hash, status = state.register(staged_file)
+        if status in RUNNABLE and content_hash not in staged_hashes:
+            staged_hashes.add(content_hash)
+        else:
+            os.remove(staged_file)
+            removed_count += 1
+    log(f"Removed {removed_count} finished or duplicate files from {gpu_input_dir}")
+    
+    # Copy only new or failed articles from the input directory
+    copied = 0
+    for html_file in glob.glob(os.path.join(input_dir, '*.html')):
+        content_hash, status = state.register(html_file)
+        if status in RUNNABLE and content_hash not in staged_hashes:
+            shutil.copy(html_file, gpu_input_dir)
+            state.register(os.path.join(gpu_input_dir, os.path.basename(html_file)))
+            staged_hashes.add(content_hash)
+            copied += 1
+    log(f"Copied {copied} new or failed HTML files to GPU processing directory")
+    
+    if not staged_hashes:
+        log(f"No pending articles in {input_dir} or {gpu_input_dir}", "WARNING")
         return False
     
-    # Copy HTML files to GPU processing directory
-    for file in html_files:
-        shutil.copy(file, gpu_input_dir)
-    
-    log(f"Copied {len(html_files)} HTML files to GPU processing directory")
+    for content_hash in staged_hashes:
+        state.mark_processing(content_hash)
+    log(f"Staged {len(staged_hashes)} articles for processing")
     return True
 
 def check_python_path():
@@ -74,10 +117,10 @@ def check_python_path():
     result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
     
     if result.returncode != 0:
-        log(f"SSH command failed: {result.stderr}", "ERROR")
+        log("SSH command failed", "ERROR", stderr=result.stderr, returncode=result.returncode)
         return None
         
-    log(f"Python paths on remote server: {result.stdout}")
+    log("Python paths on remote server", stdout=result.stdout)
     
     # Determine the best Python command to use
     if "python3" in result.stdout:
@@ -117,7 +160,7 @@ def install_required_packages(python_cmd):
     install_result = subprocess.run(install_cmd, shell=True, capture_output=True, text=True)
     
     if install_result.returncode != 0:
-        log(f"Package installation failed: {install_result.stderr}", "WARNING")
+        log("Package installation failed", "WARNING", stderr=install_result.stderr)
         return False
     else:
         log("Base packages installation successful")
@@ -128,7 +171,7 @@ def install_required_packages(python_cmd):
     spacy_result = subprocess.run(spacy_cmd, shell=True, capture_output=True, text=True)
     
     if spacy_result.returncode != 0:
-        log(f"spaCy model installation failed: {spacy_result.stderr}", "WARNING")
+        log("spaCy model installation failed", "WARNING", stderr=spacy_result.stderr)
         # Try with direct pip install as fallback
         alt_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} '{python_cmd} -m pip install en-core-web-sm'"
         log(f"Trying fallback model installation: {alt_cmd}")
@@ -161,7 +204,8 @@ def run_gpu_nlp_processing():
         return None
     
     # Check for Python
-    python_cmd = check_python_path()
+    with run_log.step("check_python"):
+        python_cmd = check_python_path()
     if not python_cmd:
         log("Failed to determine Python command on remote server", "ERROR")
         return None
@@ -169,7 +213,8 @@ def run_gpu_nlp_processing():
     log(f"Using Python command: {python_cmd}")
     
     # Install required packages
-    install_required_packages(python_cmd)
+    with run_log.step("install_packages"):
+        install_required_packages(python_cmd)
     
     # Create remote directories
     mkdir_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} 'mkdir -p /workspace/input /workspace/output'"
@@ -177,7 +222,7 @@ def run_gpu_nlp_processing():
     mkdir_result = subprocess.run(mkdir_cmd, shell=True, capture_output=True, text=True)
     
     if mkdir_result.returncode != 0:
-        log(f"Failed to create remote directories: {mkdir_result.stderr}", "ERROR")
+        log("Failed to create remote directories", "ERROR", stderr=mkdir_result.stderr)
         return None
     
     # Check if input files exist locally
@@ -190,19 +235,22 @@ def run_gpu_nlp_processing():
     log("Copying HTML files to vast.ai instance...")
     scp_cmd = f"scp -i {ssh_key_path} -P {vastai_port} {gpu_input_dir}/* root@{vastai_host}:/workspace/input/"
     log(f"Running file transfer: {scp_cmd}")
-    scp_result = subprocess.run(scp_cmd, shell=True, capture_output=True, text=True)
+    with run_log.step("upload_articles"):
+        scp_result = subprocess.run(scp_cmd, shell=True, capture_output=True, text=True)
     
     if scp_result.returncode != 0:
-        log(f"File transfer failed: {scp_result.stderr}", "ERROR")
+        log("File transfer failed", "ERROR", stderr=scp_result.stderr)
         return None
     
-    # Copy the NLP script to vast.ai
-    scp_script_cmd = f"scp -i {ssh_key_path} -P {vastai_port} {base_dir}/nlp_extractor_gpu.py root@{vastai_host}:/workspace/"
+    # Copy the NLP script and its helper modules to vast.ai
+    script_paths = " ".join(os.path.join(base_dir, name) for name in ["nlp_extractor_gpu.py"] + SUPPORT_MODULES)
+    scp_script_cmd = f"scp -i {ssh_key_path} -P {vastai_port} {script_paths} root@{vastai_host}:/workspace/"
     log(f"Transferring NLP script: {scp_script_cmd}")
-    scp_script_result = subprocess.run(scp_script_cmd, shell=True, capture_output=True, text=True)
+    with run_log.step("upload_scripts"):
+        scp_script_result = subprocess.run(scp_script_cmd, shell=True, capture_output=True, text=True)
     
     if scp_script_result.returncode != 0:
-        log(f"NLP script transfer failed: {scp_script_result.stderr}", "ERROR")
+        log("NLP script transfer failed", "ERROR", stderr=scp_script_result.stderr)
         return None
     
     # Run the NLP processing on vast.ai with explicit command
@@ -212,7 +260,7 @@ def run_gpu_nlp_processing():
     # Check if conda or other environments are available
     env_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} 'ls -la /opt/conda/bin 2>/dev/null || echo \"No conda\"; echo $PATH'"
     env_result = subprocess.run(env_cmd, shell=True, capture_output=True, text=True)
-    log(f"Environment check results: {env_result.stdout}")
+    log("Environment check results", stdout=env_result.stdout)
     
     # Try with conda Python if available
     if "/opt/conda/bin" in env_result.stdout and "No conda" not in env_result.stdout:
@@ -223,14 +271,23 @@ def run_gpu_nlp_processing():
         log(f"Using system Python for processing: {python_cmd}")
     
     # Execute NLP processing
-    ssh_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} '{python_path} /workspace/nlp_extractor_gpu.py /workspace/input /workspace/output/{output_file}'"
+    remote_options = f"--cache-dir {REMOTE_CACHE_DIR}"
+    if REMOTE_MEMORY_CEILING_MB:
+        remote_options += f" --memory-ceiling-mb {REMOTE_MEMORY_CEILING_MB}"
+    if REMOTE_DEDUP_DB:
+        remote_options += f" --dedup-db {REMOTE_DEDUP_DB}"
+    if REMOTE_RELEVANCE_MIN_SCORE is not None:
+        remote_options += f" --relevance-gate --relevance-min-score {REMOTE_RELEVANCE_MIN_SCORE}"
+    ssh_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} '{python_path} /workspace/nlp_extractor_gpu.py /workspace/input /workspace/output/{output_file} {remote_options}'"
     log(f"Executing NLP processing: {ssh_cmd}")
-    process_result = subprocess.run(ssh_cmd, shell=True, capture_output=True, text=True)
+    with run_log.step("remote_extract"):
+        process_result = subprocess.run(ssh_cmd, shell=True, capture_output=True, text=True)
     
     if process_result.returncode != 0:
-        log(f"NLP processing failed: {process_result.stderr}", "ERROR")
-        log(f"Process output: {process_result.stdout}", "INFO")
+        log("NLP processing failed", "ERROR", stderr=process_result.stderr, stdout=process_result.stdout,
+            returncode=process_result.returncode)
         return None
+    log("Remote NLP processing finished", stdout=process_result.stdout)
     
     # Wait and check for output file
     log("Waiting for processing to complete...")
@@ -239,7 +296,7 @@ def run_gpu_nlp_processing():
     # Check if output file exists
     check_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} 'ls -la /workspace/output/'"
     check_result = subprocess.run(check_cmd, shell=True, capture_output=True, text=True)
-    log(f"Output directory contents: {check_result.stdout}")
+    log("Output directory contents", stdout=check_result.stdout)
     
     # Try to locate our specific output file
     file_check_cmd = f"ssh -i {ssh_key_path} -p {vastai_port} root@{vastai_host} 'ls -la /workspace/output/{output_file}'"
@@ -269,27 +326,64 @@ def run_gpu_nlp_processing():
                 log(f"Successfully copied alternative file to {local_fallback}")
                 return fallback_filename
             else:
-                log(f"Failed to copy alternative file: {alt_copy_result.stderr}", "ERROR")
+                log("Failed to copy alternative file", "ERROR", stderr=alt_copy_result.stderr)
         else:
             log("No JSON output files found on remote server", "ERROR")
     
     # Copy results back
     copy_back_cmd = f"scp -i {ssh_key_path} -P {vastai_port} root@{vastai_host}:/workspace/output/{output_file} {gpu_output_dir}/"
     log(f"Copying results back: {copy_back_cmd}")
-    copy_result = subprocess.run(copy_back_cmd, shell=True, capture_output=True, text=True)
+    with run_log.step("download_results"):
+        copy_result = subprocess.run(copy_back_cmd, shell=True, capture_output=True, text=True)
     
     if copy_result.returncode != 0:
-        log(f"Failed to copy results: {copy_result.stderr}", "ERROR")
+        log("Failed to copy results", "ERROR", stderr=copy_result.stderr)
         return None
     
     log(f"Successfully copied results to {gpu_output_dir}/{output_file}")
     return output_file
 
-def move_processed_results():
+def record_results(state, result_path):
+    """
+    Mark staged articles done or failed from a results file
+    """
+    try:
+        with open(result_path, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    except Exception as e:
+        log(f"Could not read results from {result_path}: {str(e)}", "ERROR")
+        return
+    
+    if isinstance(results, dict):
+        results = [results]
+    
+    done = failed = 0
+    for result in results:
+        article = state.find_by_file_name(result.get("source", ""))
+        if article is None:
+            continue
+        error = result.get("error") or result.get("extraction_error")
+        if error:
+            state.mark_failed(article["content_hash"], error)
+            failed += 1
+        else:
+            state.mark_done(article["content_hash"], output_path=result_path)
+            done += 1
+    
+    # Anything still in processing was not returned by the remote run
+    missing = 0
+    for article in state.articles(PROCESSING):
+        state.mark_failed(article["content_hash"], "No result returned")
+        missing += 1
+    
+    log(f"Recorded {done} done, {failed} failed and {missing} missing articles")
+
+def move_processed_results(state, output_file):
     """
     Move processed results back to the original server
     """
     base_dir = '/home/n8n'
+    gpu_input_dir = os.path.join(base_dir, 'gpu_input_articles')
     gpu_output_dir = os.path.join(base_dir, 'gpu_processed_articles')
     processed_articles_dir = os.path.join(base_dir, 'ProcessedArticles')
     
@@ -312,6 +406,9 @@ def move_processed_results():
         except Exception as e:
             log(f"Error moving file {result_file}: {str(e)}", "ERROR")
     
+    # Record per-article outcomes for this run's results
+    record_results(state, os.path.join(processed_articles_dir, os.path.basename(output_file)))
+    
     # Define vastai connection parameters
     vastai_host = "70.26.213.157"
     vastai_port = "6297"
@@ -323,80 +420,97 @@ def move_processed_results():
     cleanup_result = subprocess.run(cleanup_cmd, shell=True, capture_output=True, text=True)
     
     if cleanup_result.returncode != 0:
-        log(f"Remote cleanup failed: {cleanup_result.stderr}", "WARNING")
+        log("Remote cleanup failed", "WARNING", stderr=cleanup_result.stderr)
     
-    # Remove local input files after successful processing
+    # Remove local copies of finished articles only; failed ones stay for the next run
     removed = 0
-    for file in glob.glob(os.path.join(base_dir, 'Output', '*.html')):
+    for file in glob.glob(os.path.join(base_dir, 'Output', '*.html')) + glob.glob(os.path.join(gpu_input_dir, '*.html')):
+        # By content, so copies saved under another name are removed with the one that was processed
+        try:
+            article = state.find_by_file(file)
+        except OSError:
+            continue
+        if article is None or article["status"] != DONE:
+            continue
         try:
             os.remove(file)
             removed += 1
         except Exception as e:
             log(f"Could not remove file {file}: {str(e)}", "WARNING")
     
-    log(f"Removed {removed} processed HTML files from input directory")
+    log(f"Removed {removed} processed HTML files from input directories")
     log("Cleanup completed")
     return True
 
 def print_summary():
-    """Print a summary of the execution"""
-    errors = sum(1 for msg in log_messages if msg["level"] == "ERROR")
-    warnings = sum(1 for msg in log_messages if msg["level"] == "WARNING")
-    
-    summary = {
-        "total_messages": len(log_messages),
-        "errors": errors,
-        "warnings": warnings,
-        "success": errors == 0,
-        "log": log_messages
-    }
-    
-    print("\n--- EXECUTION SUMMARY ---")
-    print(f"Total log entries: {len(log_messages)}")
-    print(f"Errors: {errors}")
-    print(f"Warnings: {warnings}")
-    print(f"Execution {'succeeded' if errors == 0 else 'failed with errors'}")
+    """Print a summary of the execution to stderr and return its compact form"""
+    summary = run_log.summary()
+    
+    print("\n--- EXECUTION SUMMARY ---", file=sys.stderr)
+    print(f"Total log entries: {summary['total_messages']}", file=sys.stderr)
+    print(f"Errors: {summary['errors']}", file=sys.stderr)
+    print(f"Warnings: {summary['warnings']}", file=sys.stderr)
+    for name, step in summary["steps"].items():
+        print(f"  {name}: {step['seconds']:.1f}s ({step['status']})", file=sys.stderr)
+    print(f"Execution {'succeeded' if summary['success'] else 'failed with errors'}", file=sys.stderr)
+    if summary["log_file"]:
+        print(f"Full log: {summary['log_file']}", file=sys.stderr)
     
     return summary
 
+def fail_staged(state, reason):
+    """Mark every article staged for this run as failed."""
+    for article in state.articles(PROCESSING):
+        state.mark_failed(article["content_hash"], reason)
+
 def main():
+    state = ProcessingState(STATE_DB_PATH)
     try:
         log("Starting GPU NLP processing workflow...")
         
         # Prepare articles for GPU processing
-        if not prepare_gpu_processing():
+        with run_log.step("prepare"):
+            prepared = prepare_gpu_processing(state)
+        if not prepared:
             log("No articles to process", "WARNING")
             summary = print_summary()
-            print(json.dumps({"status": "no_articles", "summary": summary}))
+            print(json.dumps({"status": "no_articles", "backlog": state.backlog(), "summary": summary}))
             return 0  # Return success for "no articles" case
         
         # Run NLP processing
-        output_file = run_gpu_nlp_processing()
+        with run_log.step("remote_processing"):
+            output_file = run_gpu_nlp_processing()
         
         if not output_file:
             log("NLP processing failed or no output was generated", "ERROR")
+            fail_staged(state, "NLP processing failed")
             summary = print_summary()
-            print(json.dumps({"status": "processing_failed", "summary": summary}))
+            print(json.dumps({"status": "processing_failed", "backlog": state.backlog(), "summary": summary}))
             return 1
         
         # Move processed results back
-        if not move_processed_results():
+        with run_log.step("collect_results"):
+            moved = move_processed_results(state, output_file)
+        if not moved:
             log("Failed to move results", "ERROR")
+            fail_staged(state, "Failed to move results")
             summary = print_summary()
-            print(json.dumps({"status": "move_failed", "summary": summary}))
+            print(json.dumps({"status": "move_failed", "backlog": state.backlog(), "summary": summary}))
             return 1
         
         log("GPU NLP processing completed successfully")
         summary = print_summary()
-        print(json.dumps({"status": "success", "output_file": output_file, "summary": summary}))
+        print(json.dumps({"status": "success", "output_file": output_file, "backlog": state.backlog(), "summary": summary}))
         return 0
     
     except Exception as e:
-        log(f"Critical error: {str(e)}", "ERROR")
-        log(traceback.format_exc(), "ERROR")
+        log(f"Critical error: {str(e)}", "ERROR", traceback=traceback.format_exc())
+        fail_staged(state, f"Critical error: {str(e)}")
         summary = print_summary()
         print(json.dumps({"status": "error", "error": str(e), "summary": summary}))
         return 1
+    finally:
+        state.close()
 
 if __name__ == '__main__':
     try:
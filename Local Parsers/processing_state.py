@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import sqlite3
+import datetime
+
+from stage_runner import file_digest
+
+# Persistent record of which articles were processed, when and with what result.
+#
+# Articles are identified by the SHA-256 of their raw HTML, so the same page
+# saved under several timestamped file names by the n8n Code4 node is only
+# processed once.  Every file name an article was seen under is kept, so a
+# result reported under any of them finds the article.  Status moves
+# pending -> processing -> done | failed, or timed_out when a supervised
+# worker was stopped at a deadline.
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+
+# Statuses picked up by the next run
+RUNNABLE = (PENDING, FAILED, TIMED_OUT)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    content_hash TEXT PRIMARY KEY,
+    url TEXT,
+    file_name TEXT,
+    source_path TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    first_seen TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    duration_seconds REAL,
+    output_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_status ON articles (status);
+CREATE INDEX IF NOT EXISTS articles_file_name ON articles (file_name);
+CREATE TABLE IF NOT EXISTS file_names (
+    file_name TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+"""
+
+URL_PATTERNS = [
+    r'<link[^>]+rel=["\']canonical["\'][^>]+href=["\']([^"\']+)["\']',
+    r'<link[^>]+href=["\']([^"\']+)["\'][^>]+rel=["\']canonical["\']',
+    r'<meta[^>]+property=["\']og:url["\'][^>]+content=["\']([^"\']+)["\']',
+    r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:url["\']'
+]
+
+
+def now_iso():
+    return datetime.datetime.now().isoformat()
+
+
+def extract_article_url(html_path):
+    """Return the canonical article URL declared in an HTML file, or None."""
+    try:
+        with open(html_path, 'r', encoding='utf-8', errors='replace') as f:
+            head = f.read(65536)
+    except OSError:
+        return None
+    for pattern in URL_PATTERNS:
+        match = re.search(pattern, head, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+
+class ProcessingState:
+    """SQLite-backed processing state for NCA articles."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, html_path, url=None):
+        """Record an article file, returning (content_hash, status).
+
+        New content is inserted as pending; known content keeps its status and
+        only has its latest file name and location updated.
+        """
+        content_hash = file_digest(html_path)
+        url = url or extract_article_url(html_path)
+        file_name = os.path.basename(html_path)
+        row = self.conn.execute(
+            "SELECT status FROM articles WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if row is None:
+            self.conn.execute(
+                "INSERT INTO articles (content_hash, url, file_name, source_path, status, first_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, url, file_name, html_path, PENDING, now_iso())
+            )
+            status = PENDING
+        else:
+            self.conn.execute(
+                "UPDATE articles SET file_name = ?, source_path = ?, url = COALESCE(?, url) "
+                "WHERE content_hash = ?",
+                (file_name, html_path, url, content_hash)
+            )
+            status = row["status"]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO file_names (file_name, content_hash) VALUES (?, ?)",
+            (file_name, content_hash)
+        )
+        self.conn.commit()
+        return content_hash, status
+
+    def mark_processing(self, content_hash):
+        self.conn.execute(
+            "UPDATE articles SET status = ?, started_at = ?, attempts = attempts + 1, error = NULL "
+            "WHERE content_hash = ?",
+            (PROCESSING, now_iso(), content_hash)
+        )
+        self.conn.commit()
+
+    def _finish(self, content_hash, status, output_path=None, error=None, duration=None):
+        row = self.conn.execute(
+            "SELECT started_at FROM articles WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        finished = datetime.datetime.now()
+        if duration is None and row is not None and row["started_at"]:
+            started = datetime.datetime.fromisoformat(row["started_at"])
+            duration = (finished - started).total_seconds()
+        self.conn.execute(
+            "UPDATE articles SET status = ?, finished_at = ?, duration_seconds = ?, "
+            "output_path = COALESCE(?, output_path), error = ? WHERE content_hash = ?",
+            (status, finished.isoformat(), duration, output_path, error, content_hash)
+        )
+        self.conn.commit()
+
+    def mark_done(self, content_hash, output_path=None, duration=None):
+        self._finish(content_hash, DONE, output_path=output_path, duration=duration)
+
+    def mark_failed(self, content_hash, error, duration=None):
+        self._finish(content_hash, FAILED, error=str(error), duration=duration)
+
+    def mark_timed_out(self, content_hash, error, duration=None):
+        self._finish(content_hash, TIMED_OUT, error=str(error), duration=duration)
+
+    def get(self, content_hash):
+        row = self.conn.execute(
+            "SELECT * FROM articles WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_by_file_name(self, file_name):
+        """Return the article last registered under file_name, or None.
+
+        Any name the content was saved under is found, not only its latest one.
+        """
+        row = self.conn.execute(
+            "SELECT a.* FROM file_names f JOIN articles a ON a.content_hash = f.content_hash WHERE f.file_name = ?",
+            (file_name,)
+        ).fetchone()
+        if row is None:
+            # Databases from before file_names only have each article's latest name
+            row = self.conn.execute(
+                "SELECT * FROM articles WHERE file_name = ? ORDER BY first_seen DESC LIMIT 1", (file_name,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_by_file(self, html_path):
+        """Return the article with the same content as html_path, or None."""
+        return self.get(file_digest(html_path))
+
+    def articles(self, status=None, limit=None):
+        """Return article rows, optionally filtered by status, oldest first."""
+        query = "SELECT * FROM articles"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY first_seen"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def reset_stale(self):
+        """Return articles left in processing by a crashed run to pending."""
+        cursor = self.conn.execute(
+            "UPDATE articles SET status = ? WHERE status = ?", (PENDING, PROCESSING)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def backlog(self):
+        """Return article counts per status plus the size of the outstanding backlog."""
+        counts = {PENDING: 0, PROCESSING: 0, DONE: 0, FAILED: 0, TIMED_OUT: 0}
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM articles GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        timing = self.conn.execute(
+            "SELECT AVG(duration_seconds) AS avg_s, MAX(finished_at) AS last FROM articles WHERE status = ?",
+            (DONE,)
+        ).fetchone()
+        return {
+            "counts": counts,
+            "backlog": counts[PENDING] + counts[FAILED] + counts[TIMED_OUT],
+            "total": sum(counts.values()),
+            "avgDurationSeconds": round(timing["avg_s"], 3) if timing["avg_s"] is not None else None,
+            "lastFinishedAt": timing["last"]
+        }
+
+
+# Main execution
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[2] not in ("backlog", "list", "reset-stale"):
+        print("Usage: python processing_state.py <state_db> backlog|list [status] [limit]|reset-stale")
+        sys.exit(1)
+
+    state = ProcessingState(sys.argv[1])
+    command = sys.argv[2]
+
+    if command == "backlog":
+        print(json.dumps(state.backlog(), indent=2))
+    elif command == "list":
+        status = sys.argv[3] if len(sys.argv) > 3 else None
+        limit = sys.argv[4] if len(sys.argv) > 4 else None
+        print(json.dumps(state.articles(status, limit), indent=2))
+    else:
+        print(json.dumps({"reset": state.reset_stale()}))
+
+    state.close()
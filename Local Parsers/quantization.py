@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import glob
+import time
+import argparse
+import datetime
+
+import torch
+from transformers import (AutoConfig, AutoTokenizer, AutoModelForTokenClassification,
+                          AutoModelForSequenceClassification, pipeline)
+
+from model_settings import PRECISIONS
+
+# Optional int8 inference for the CPU transformer models.
+#
+# Dynamic quantisation stores the weights of every nn.Linear layer as int8
+# and quantises activations on the fly, which cuts memory roughly 4x for
+# those layers and usually speeds up CPU inference.  Quantising takes a
+# while, so the quantised state dict is cached on disk per model and torch
+# version and later loads rebuild the quantised structure from the config.
+#
+# The precision of each model is chosen with NCA_NER_PRECISION and
+# NCA_CLASSIFIER_PRECISION (falling back to NCA_PRECISION, default fp32; see
+# model_settings.py).
+# "benchmark" compares fp32 with int8 on a fixed sample of articles so the
+# choice can be made per model.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nca_quantized")
+
+MODEL_CLASSES = {
+    "ner": AutoModelForTokenClassification,
+    "classifier": AutoModelForSequenceClassification
+}
+
+
+def quantized_path(model_id, cache_dir=None):
+    """Cache file for a model's quantised weights; keyed by torch version since the packing can change."""
+    cache_dir = cache_dir or os.environ.get("NCA_QUANTIZED_CACHE", DEFAULT_CACHE_DIR)
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', model_id)
+    torch_version = torch.__version__.split("+")[0]
+    return os.path.join(cache_dir, f"{name}-int8-torch{torch_version}.pt")
+
+
+def quantize(model):
+    """Apply dynamic int8 quantisation to the model's linear layers."""
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_model(kind, model_id, precision="fp32", cache_dir=None):
+    """Load a model at the given precision, quantising (and caching) it on first use."""
+    model_class = MODEL_CLASSES[kind]
+    if precision == "fp32":
+        return model_class.from_pretrained(model_id)
+
+    path = quantized_path(model_id, cache_dir)
+    if os.path.exists(path):
+        try:
+            # Build the quantised structure from the config, then load the cached int8 weights
+            model = quantize(model_class.from_config(AutoConfig.from_pretrained(model_id)))
+            # Our own cache file: the packed int8 parameters are not plain tensors
+            model.load_state_dict(torch.load(path, map_location="cpu", weights_only=False))
+            return model.eval()
+        except Exception as e:
+            print(f"Could not load quantised weights from {path}, rebuilding: {str(e)}")
+
+    started = time.perf_counter()
+    model = quantize(model_class.from_pretrained(model_id))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(model.state_dict(), tmp_path)
+        os.replace(tmp_path, path)
+        print(f"Quantised {model_id} in {time.perf_counter() - started:.1f}s, cached at {path}")
+    except OSError as e:
+        print(f"Could not cache quantised weights for {model_id}: {str(e)}")
+    return model
+
+
+def ner_pipeline_for(model_id, precision="fp32", cache_dir=None):
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = load_model("ner", model_id, precision, cache_dir)
+    return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple", device=-1)
+
+
+def zero_shot_pipeline_for(model_id, precision="fp32", cache_dir=None):
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = load_model("classifier", model_id, precision, cache_dir)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer, device=-1)
+
+
+def model_size_mb(model):
+    """Size of the model's state dict as torch would serialise it, in MB."""
+    path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"nca-model-size-{os.getpid()}.pt")
+    try:
+        torch.save(model.state_dict(), path)
+        return round(os.path.getsize(path) / (1024 * 1024), 1)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Benchmark
+def load_sample(corpus_dir, size):
+    """The first `size` articles of the corpus (sorted by name so the sample is fixed)."""
+    os.environ.setdefault("NCA_SKIP_MODEL_LOAD", "1")
+    import nlp_extractor
+
+    texts = []
+    for html_path in sorted(glob.glob(os.path.join(corpus_dir, "*.html")))[:size]:
+        article = nlp_extractor.extract_content_from_html(html_path)
+        content = nlp_extractor.clean_text(article.get("content", ""))
+        if content:
+            texts.append(content)
+    return texts, nlp_extractor
+
+
+def timed(func, inputs):
+    outputs, latencies = [], []
+    for item in inputs:
+        started = time.perf_counter()
+        outputs.append(func(item))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return outputs, latencies
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "meanMs": round(sum(ordered) / len(ordered), 2),
+        "p50Ms": round(ordered[len(ordered) // 2], 2),
+        "maxMs": round(ordered[-1], 2)
+    }
+
+
+def ner_agreement(reference, candidate):
+    """Entity-level precision/recall/F1 of candidate against reference, by (group, word)."""
+    matched = expected = found = 0
+    for ref, cand in zip(reference, candidate):
+        ref_set = {(e["entity_group"], e["word"]) for e in ref}
+        cand_set = {(e["entity_group"], e["word"]) for e in cand}
+        matched += len(ref_set & cand_set)
+        expected += len(ref_set)
+        found += len(cand_set)
+    precision = matched / found if found else 1.0
+    recall = matched / expected if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+
+def classifier_agreement(reference, candidate, threshold=0.4):
+    """Top-label agreement, agreement of the thresholded category sets and mean score drift."""
+    top = same_set = 0
+    drift = []
+    for ref, cand in zip(reference, candidate):
+        ref_scores = dict(zip(ref["labels"], ref["scores"]))
+        cand_scores = dict(zip(cand["labels"], cand["scores"]))
+        top += ref["labels"][0] == cand["labels"][0]
+        same_set += ({l for l, s in ref_scores.items() if s > threshold}
+                     == {l for l, s in cand_scores.items() if s > threshold})
+        drift.extend(abs(ref_scores[label] - cand_scores.get(label, 0.0)) for label in ref_scores)
+    total = len(reference) or 1
+    return {
+        "topLabelAgreement": round(top / total, 4),
+        "categorySetAgreement": round(same_set / total, 4),
+        "meanScoreDrift": round(sum(drift) / len(drift), 4) if drift else 0.0
+    }
+
+
+def benchmark_model(kind, model_id, inputs, run, agreement, cache_dir=None):
+    """Run the same inputs through the fp32 and int8 versions of a model."""
+    report = {"model": model_id, "samples": len(inputs)}
+    outputs = {}
+    for precision in PRECISIONS:
+        print(f"  {kind} {precision}: loading {model_id}")
+        started = time.perf_counter()
+        model_pipeline = (ner_pipeline_for if kind == "ner" else zero_shot_pipeline_for)(model_id, precision, cache_dir)
+        load_seconds = time.perf_counter() - started
+        # One warm-up call so lazy initialisation is not counted against the first sample
+        run(model_pipeline, inputs[0])
+        outputs[precision], latencies = timed(lambda item: run(model_pipeline, item), inputs)
+        report[precision] = dict(latency_summary(latencies),
+                                 loadSeconds=round(load_seconds, 2),
+                                 sizeMb=model_size_mb(model_pipeline.model))
+        del model_pipeline
+    report["speedup"] = round(report["fp32"]["meanMs"] / report["int8"]["meanMs"], 2)
+    report["agreement"] = agreement(outputs["fp32"], outputs["int8"])
+    return report
+
+
+def run_benchmark(corpus_dir, size, kinds, threads=None, cache_dir=None):
+    if threads:
+        torch.set_num_threads(threads)
+    texts, extractor = load_sample(corpus_dir, size)
+    if not texts:
+        raise ValueError(f"No articles with content in {corpus_dir}")
+    print(f"Benchmarking on {len(texts)} articles ({torch.get_num_threads()} threads)")
+
+    results = {}
+    if "ner" in kinds:
+        # The first chunk of each article, as extract_entities_transformers sees it
+        chunks = [extractor.text_to_chunks(text)[0] for text in texts]
+        results["ner"] = benchmark_model(
+            "ner", extractor.NER_MODEL, chunks,
+            lambda ner, text: ner(text), ner_agreement, cache_dir)
+    if "classifier" in kinds:
+        results["classifier"] = benchmark_model(
+            "classifier", extractor.CLASSIFIER_MODEL, [text[:2000] for text in texts],
+            lambda classifier, text: classifier(text, candidate_labels=extractor.CRIME_CATEGORIES, multi_label=True),
+            classifier_agreement, cache_dir)
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "corpus": os.path.abspath(corpus_dir),
+        "torch": torch.__version__,
+        "threads": torch.get_num_threads(),
+        "models": results
+    }
+
+
+def print_report(report):
+    print(f"\n{'model':<12}{'precision':<11}{'mean ms':>9}{'p50 ms':>9}{'size MB':>9}")
+    for kind, result in report["models"].items():
+        for precision in PRECISIONS:
+            row = result[precision]
+            print(f"{kind:<12}{precision:<11}{row['meanMs']:>9.1f}{row['p50Ms']:>9.1f}{row['sizeMb']:>9.1f}")
+        agreement = ", ".join(f"{name} {value}" for name, value in result["agreement"].items())
+        print(f"{'':<12}speedup {result['speedup']}x; agreement with fp32: {agreement}")
+
+
+def build_cache(kinds, cache_dir=None):
+    """Quantise and cache the configured models ahead of time."""
+    os.environ.setdefault("NCA_SKIP_MODEL_LOAD", "1")
+    import nlp_extractor
+    model_ids = {"ner": nlp_extractor.NER_MODEL, "classifier": nlp_extractor.CLASSIFIER_MODEL}
+    for kind in kinds:
+        path = quantized_path(model_ids[kind], cache_dir)
+        if os.path.exists(path):
+            os.remove(path)
+        load_model(kind, model_ids[kind], "int8", cache_dir)
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Int8 quantisation of the CPU transformer models")
+    parser.add_argument("--cache-dir", help=f"Quantised weight cache (default $NCA_QUANTIZED_CACHE or {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--models", default="ner,classifier", help="Comma-separated: ner, classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("build", help="Quantise and cache the models")
+
+    bench = commands.add_parser("benchmark", help="Compare fp32 and int8 latency and agreement")
+    bench.add_argument("corpus_dir", help="Folder of article HTML files (e.g. from benchmark.py generate)")
+    bench.add_argument("--sample", type=int, default=50, help="Number of articles (first N by name)")
+    bench.add_argument("--threads", type=int, help="torch intra-op threads")
+    bench.add_argument("--output", help="Write the JSON report here")
+
+    options = parser.parse_args()
+    kinds = [kind.strip() for kind in options.models.split(",") if kind.strip()]
+    unknown = set(kinds) - set(MODEL_CLASSES)
+    if unknown:
+        parser.error(f"Unknown model kind(s): {', '.join(sorted(unknown))}")
+
+    if options.command == "build":
+        build_cache(kinds, options.cache_dir)
+    else:
+        report = run_benchmark(options.corpus_dir, options.sample, kinds, options.threads, options.cache_dir)
+        print_report(report)
+        if options.output:
+            with open(options.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {options.output}")
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import glob
+import argparse
+import threading
+
+from full_article_parser import PERP_KEYWORDS, CATEGORY_KEYWORDS
+
+# Relevance gate in front of the model stages.
+#
+# Not every NCA news item is a prosecution story: corporate announcements,
+# recruitment and annual reports run through spaCy, BART and the
+# perpetrator search only to come back with nothing.  The gate scores an
+# article from the crime indicator and category keyword lists with a single
+# compiled pattern - one pass over the text - and articles scoring below
+# min_score get a light extraction (the pattern-based fields) instead.  The
+# gate errs towards letting articles through: a single court or arrest word
+# is enough, as are two category keywords.
+
+# Words near a name that mark the person as a perpetrator (extract_perpetrators)
+CRIME_INDICATORS = [
+    'convicted', 'sentenced', 'pleaded guilty', 'admitted', 'arrested',
+    'charged', 'jailed', 'imprisoned', 'smuggler', 'dealer', 'trafficker'
+]
+
+# Inflections the gate also counts; keywords match whole words only (plus a plural "s")
+STRONG_INFLECTIONS = [
+    'arrest', 'charge', 'convict', 'conviction', 'sentencing', 'pleaded', 'guilty', 'prosecuted', 'jail'
+]
+CATEGORY_INFLECTIONS = [
+    'drugs', 'laundered', 'laundering', 'hacked', 'hacking', 'hacker', 'children', 'exploited', 'trafficked'
+]
+
+# Court and arrest words count double, crime category words once
+STRONG_WEIGHT = 2
+CATEGORY_WEIGHT = 1
+DEFAULT_MIN_SCORE = 2
+
+
+def keyword_pattern(keywords):
+    """One case-insensitive alternation matching any keyword as a whole word, or its plural in "s".
+
+    The keyword itself is group 1.
+    """
+    ordered = sorted({keyword.lower() for keyword in keywords}, key=len, reverse=True)
+    return re.compile(r'\b(' + '|'.join(re.escape(keyword) for keyword in ordered) + r')s?\b', re.IGNORECASE)
+
+
+class RelevanceGate:
+    """Keyword relevance score of articles, with counts of those gated and the model time saved."""
+
+    def __init__(self, min_score=DEFAULT_MIN_SCORE):
+        self.min_score = min_score
+        self.strong = {keyword.lower() for keyword in CRIME_INDICATORS + PERP_KEYWORDS + STRONG_INFLECTIONS}
+        category_keywords = [keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords]
+        category_keywords += CATEGORY_INFLECTIONS
+        self.pattern = keyword_pattern(list(self.strong) + category_keywords)
+        # Shared by the extraction service's worker threads
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.gated = 0
+        self.light_seconds = 0.0
+        self.full_articles = 0
+        self.full_seconds = 0.0
+
+    def score(self, title, content):
+        """Return (score, matched keywords) of an article; every keyword counts once."""
+        hits = {match.group(1).lower() for match in self.pattern.finditer(f"{title}\n{content}")}
+        score = sum(STRONG_WEIGHT if hit in self.strong else CATEGORY_WEIGHT for hit in hits)
+        return score, sorted(hits)
+
+    def check(self, title, content):
+        """Score an article; returns (relevant, score)."""
+        score, _ = self.score(title, content)
+        relevant = score >= self.min_score
+        with self.lock:
+            self.checked += 1
+            if not relevant:
+                self.gated += 1
+        return relevant, score
+
+    def record_light(self, seconds):
+        with self.lock:
+            self.light_seconds += seconds
+
+    def record_full(self, seconds):
+        with self.lock:
+            self.full_articles += 1
+            self.full_seconds += seconds
+
+    def time_saved(self):
+        """Estimated seconds saved: the mean full-article time for each gated article, less the light ones."""
+        with self.lock:
+            if not self.full_articles:
+                return 0.0
+            return max(0.0, self.gated * self.full_seconds / self.full_articles - self.light_seconds)
+
+    def stats(self):
+        return {
+            "checked": self.checked,
+            "gated": self.gated,
+            "minScore": self.min_score,
+            "secondsSaved": round(self.time_saved(), 3)
+        }
+
+    def print_summary(self):
+        if not self.checked:
+            return
+        share = 100.0 * self.gated / self.checked
+        line = (f"Relevance gate: {self.gated}/{self.checked} articles ({share:.0f}%) scored below "
+                f"{self.min_score} and got a light extraction")
+        if self.gated and self.full_articles:
+            line += (f", ~{self.time_saved():.1f}s saved "
+                     f"(full articles took {self.full_seconds / self.full_articles:.2f}s each)")
+        print(line)
+
+
+# Main execution
+if __name__ == "__main__":
+    # Score a folder, e.g. to check what a --relevance-min-score would gate before using it
+    parser = argparse.ArgumentParser(description="Score the crime relevance of the articles in a folder")
+    parser.add_argument("folder", help="Folder of article HTML files")
+    parser.add_argument("--min-score", type=int, default=DEFAULT_MIN_SCORE)
+    options = parser.parse_args()
+
+    os.environ["NCA_SKIP_MODEL_LOAD"] = "1"
+    from nlp_extractor import extract_content_from_html
+
+    gate = RelevanceGate(options.min_score)
+    html_paths = sorted(glob.glob(os.path.join(options.folder, "*.html")))
+    if not html_paths:
+        print(f"No HTML files in {options.folder}")
+        sys.exit(1)
+    gated = 0
+    for html_path in html_paths:
+        article_data = extract_content_from_html(html_path)
+        score, hits = gate.score(article_data.get("title", ""), article_data.get("content", ""))
+        if score < options.min_score:
+            gated += 1
+        print(f"{score:3d}  {'light' if score < options.min_score else 'full '}  "
+              f"{os.path.basename(html_path)}  {', '.join(hits)}")
+    print(f"{gated}/{len(html_paths)} articles would be gated at min score {options.min_score}")
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+
+# Content-addressed on-disk cache for extractor results.
+#
+# Entries are JSON files named after a SHA-256 key and sharded into
+# two-character sub-directories.  The key is built by the caller from the
+# normalised article content plus extractor and model versions, so a
+# re-downloaded article that has not changed maps to the same entry no matter
+# which timestamped file it arrived in.
+
+STATS_FILE = "stats.json"
+
+
+def content_hash(*parts):
+    """Return a stable SHA-256 hex digest over strings or JSON-serialisable parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False, default=str)
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """JSON result cache with size/age-based eviction and hit-rate statistics."""
+
+    def __init__(self, cache_dir, max_bytes=None, max_age_days=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every cache entry."""
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _expired(self, mtime, now=None):
+        if not self.max_age_seconds:
+            return False
+        return (now or time.time()) - mtime > self.max_age_seconds
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if self._expired(stat.st_mtime):
+                os.remove(path)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        # Touch the entry so size-based eviction drops least recently used first
+        os.utime(path, None)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store value under key, replacing any existing entry atomically."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.writes += 1
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        now = time.time()
+        kept = []
+        removed = 0
+        for path, size, mtime in self._entries():
+            if self._expired(mtime, now):
+                os.remove(path)
+                removed += 1
+            else:
+                kept.append((mtime, size, path))
+
+        if self.max_bytes:
+            total = sum(size for _, size, _ in kept)
+            for mtime, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                removed += 1
+
+        self.evictions += removed
+        return removed
+
+    def stats(self):
+        """Return hit-rate statistics for this run plus the current cache footprint."""
+        entries = 0
+        total_bytes = 0
+        for _, size, _ in self._entries():
+            entries += 1
+            total_bytes += size
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": total_bytes
+        }
+
+    def save_stats(self):
+        """Fold this run's counters into the cumulative stats file and return them."""
+        path = os.path.join(self.cache_dir, STATS_FILE)
+        totals = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "runs": 0}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                totals.update(json.load(f))
+        except (FileNotFoundError, ValueError):
+            pass
+
+        totals["hits"] += self.hits
+        totals["misses"] += self.misses
+        totals["writes"] += self.writes
+        totals["evictions"] += self.evictions
+        totals["runs"] += 1
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = round(totals["hits"] / lookups, 4) if lookups else 0.0
+        totals["updatedAt"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(totals, f, indent=2)
+        return totals
+
+
+# Main execution
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[2] not in ("stats", "evict"):
+        print("Usage: python result_cache.py <cache_dir> stats|evict [max_mb] [max_age_days]")
+        sys.exit(1)
+
+    cache_dir = sys.argv[1]
+    max_mb = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    max_age_days = float(sys.argv[4]) if len(sys.argv) > 4 else None
+    cache = ResultCache(cache_dir, int(max_mb * 1024 * 1024) if max_mb else None, max_age_days)
+
+    if sys.argv[2] == "evict":
+        print(f"Evicted {cache.evict()} entries")
+
+    report = cache.stats()
+    try:
+        with open(os.path.join(cache_dir, STATS_FILE), 'r', encoding='utf-8') as f:
+            report["cumulative"] = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pass
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import datetime
+
+from result_cache import content_hash
+
+# Columnar export is optional; only needed for ParquetWriter
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    arrow_available = True
+except ImportError:
+    arrow_available = False
+
+# Incremental result writers for process_folder.
+#
+# Writers receive one result dict per article as soon as it is produced, so
+# memory no longer grows with the corpus and a crash only loses the article
+# in flight.
+
+
+def is_streaming_output(path):
+    """Return True when an output path selects the streaming JSONL mode."""
+    return bool(path) and path.endswith(".jsonl")
+
+
+def read_jsonl(path):
+    """Yield records from a JSONL file, skipping a torn final line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class JsonlWriter:
+    """Append-only JSONL writer with periodic fsync and resume support."""
+
+    def __init__(self, path, fsync_every=10):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.written = 0
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self._truncate_torn_line()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _truncate_torn_line(self):
+        """Drop a partial last record left by a crash so appends stay line-aligned."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line
+            position = size - 1
+            while position > 0:
+                step = min(65536, position)
+                f.seek(position - step)
+                block = f.read(step)
+                newline = block.rfind(b"\n")
+                if newline != -1:
+                    f.truncate(position - step + newline + 1)
+                    return
+                position -= step
+            f.truncate(0)
+
+    def completed_sources(self):
+        """Return the sources already written successfully, for resuming a run.
+
+        Quick records of a tiered run ("complete": false) do not count, so an
+        article interrupted before enrichment is processed again.
+        """
+        sources = set()
+        for record in read_jsonl(self.path):
+            if record.get("source") and "error" not in record and record.get("complete", True):
+                sources.add(record["source"])
+        return sources
+
+    def write(self, result):
+        self.file.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self.file.flush()
+        self.written += 1
+        if self.written % self.fsync_every == 0:
+            os.fsync(self.file.fileno())
+
+    def flush(self):
+        """Force everything written so far to disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+
+def article_id(result):
+    """Return a stable article identifier: the content hash, or the source for empty results."""
+    if result.get("content"):
+        return content_hash(result["content"])[:32]
+    return content_hash(result.get("source", ""))[:32]
+
+
+def parse_timestamp(value):
+    try:
+        return datetime.datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_age(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def arrow_schemas():
+    """Return the schema of each normalised table written by ParquetWriter."""
+    return {
+        "articles": pa.schema([
+            ("article_id", pa.string()),
+            ("source", pa.string()),
+            ("title", pa.string()),
+            ("processed_at", pa.timestamp("us")),
+            ("content_chars", pa.int32()),
+            ("error", pa.string())
+        ]),
+        "entities": pa.schema([
+            ("article_id", pa.string()),
+            ("entity_type", pa.dictionary(pa.int8(), pa.string())),
+            ("value", pa.string()),
+            ("age", pa.int16()),
+            ("location", pa.string())
+        ]),
+        "money_amounts": pa.schema([
+            ("article_id", pa.string()),
+            ("original", pa.string()),
+            ("amount_gbp", pa.float64())
+        ]),
+        "drug_quantities": pa.schema([
+            ("article_id", pa.string()),
+            ("original", pa.string()),
+            ("drug", pa.dictionary(pa.int8(), pa.string())),
+            ("quantity", pa.float64()),
+            ("unit", pa.dictionary(pa.int8(), pa.string())),
+            ("kg_equivalent", pa.float64())
+        ]),
+        "charges": pa.schema([
+            ("article_id", pa.string()),
+            ("charge", pa.string())
+        ])
+    }
+
+
+class ParquetWriter:
+    """Writes results as normalised Parquet tables, one row group per batch of articles.
+
+    Each table is a directory (articles/, entities/, money_amounts/,
+    drug_quantities/, charges/) holding one part file per run, so a resumed
+    run adds a part instead of rewriting earlier ones and the directory can be
+    read as a single dataset.
+    """
+
+    def __init__(self, output_dir, row_group_articles=500):
+        if not arrow_available:
+            raise RuntimeError("pyarrow is required for Parquet export (pip install pyarrow)")
+        self.output_dir = output_dir
+        self.row_group_articles = max(1, row_group_articles)
+        self.schemas = arrow_schemas()
+        self.part_name = f"part-{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}.parquet"
+        self.writers = {}
+        self.buffered_articles = 0
+        self.written = 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self.buffers = {
+            name: {field.name: [] for field in schema}
+            for name, schema in self.schemas.items()
+        }
+        self.buffered_articles = 0
+
+    def _append(self, table, **row):
+        columns = self.buffers[table]
+        for name in columns:
+            columns[name].append(row.get(name))
+
+    def write(self, result):
+        aid = article_id(result)
+        self._append(
+            "articles",
+            article_id=aid,
+            source=result.get("source"),
+            title=result.get("title"),
+            processed_at=parse_timestamp(result.get("processedAt")),
+            content_chars=len(result.get("content") or ""),
+            error=result.get("error") or result.get("extraction_error")
+        )
+
+        for entity_type, key in (("location", "locations"), ("organization", "organizations"),
+                                 ("timeline", "timeline"), ("sentence", "sentences"),
+                                 ("category", "categories"), ("victim", "victims")):
+            for value in result.get(key) or []:
+                self._append("entities", article_id=aid, entity_type=entity_type, value=value)
+        for perpetrator in result.get("perpetrators") or []:
+            if isinstance(perpetrator, dict):
+                self._append("entities", article_id=aid, entity_type="perpetrator",
+                             value=perpetrator.get("name"), age=parse_age(perpetrator.get("age")),
+                             location=perpetrator.get("location") or None)
+            else:
+                self._append("entities", article_id=aid, entity_type="perpetrator", value=perpetrator)
+
+        for money in result.get("moneyAmounts") or []:
+            self._append("money_amounts", article_id=aid, original=money.get("original"),
+                         amount_gbp=money.get("amount"))
+        for drug in result.get("drugQuantities") or []:
+            self._append("drug_quantities", article_id=aid, original=drug.get("original"),
+                         drug=drug.get("drug"), quantity=drug.get("quantity"), unit=drug.get("unit"),
+                         kg_equivalent=drug.get("kgEquivalent"))
+        for charge in result.get("charges") or []:
+            self._append("charges", article_id=aid, charge=charge)
+
+        self.buffered_articles += 1
+        self.written += 1
+        if self.buffered_articles >= self.row_group_articles:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as one row group per table."""
+        if not self.buffered_articles:
+            return
+        for name, columns in self.buffers.items():
+            table = pa.Table.from_pydict(columns, schema=self.schemas[name])
+            if name not in self.writers:
+                table_dir = os.path.join(self.output_dir, name)
+                os.makedirs(table_dir, exist_ok=True)
+                self.writers[name] = pq.ParquetWriter(
+                    os.path.join(table_dir, self.part_name), self.schemas[name], compression="zstd"
+                )
+            self.writers[name].write_table(table)
+        self._reset_buffers()
+
+    def close(self):
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+def export_parquet(jsonl_path, output_dir, row_group_articles=500):
+    """Convert a JSONL result file into the normalised Parquet tables."""
+    writer = ParquetWriter(output_dir, row_group_articles)
+    for record in read_jsonl(jsonl_path):
+        writer.write(record)
+    writer.close()
+    return writer.written
+
+
+def export_json(jsonl_path, json_path):
+    """Write a JSONL result file as one indented JSON array.
+
+    Records are streamed, and when a source appears more than once (a retried
+    article) only its last record is kept.
+    """
+    last_line = {}
+    for index, record in enumerate(read_jsonl(jsonl_path)):
+        last_line[record.get("source") or index] = index
+
+    keep = set(last_line.values())
+    count = 0
+    with open(json_path, 'w', encoding='utf-8') as out:
+        out.write("[")
+        for index, record in enumerate(read_jsonl(jsonl_path)):
+            if index not in keep:
+                continue
+            body = json.dumps(record, indent=2, ensure_ascii=False)
+            out.write(("," if count else "") + "\n  " + body.replace("\n", "\n  "))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    return count
+
+
+# Main execution
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("export", "export-parquet"):
+        print("Usage: python result_writers.py export <results.jsonl> <results.json>")
+        print("       python result_writers.py export-parquet <results.jsonl> <parquet_dir>")
+        sys.exit(1)
+
+    if sys.argv[1] == "export":
+        exported = export_json(sys.argv[2], sys.argv[3])
+    else:
+        exported = export_parquet(sys.argv[2], sys.argv[3])
+    print(f"Exported {exported} records to {sys.argv[3]}")
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import contextlib
+from collections import Counter, deque
+from logging.handlers import RotatingFileHandler
+
+# Structured, bounded logging for long-running orchestration scripts.
+#
+# Every message goes to stderr and, in full, to a rotating JSON-lines log
+# file.  Only counts per level, per-step durations and the most recent
+# messages (truncated, in a fixed-size ring buffer) are kept in memory, so
+# the summary printed for n8n stays small however large the run.
+
+
+def truncate(text, limit):
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"... [{len(text) - limit} more chars]"
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "step": getattr(record, "step", None),
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last capacity records (truncated), the last warnings/errors and a count of every level."""
+
+    def __init__(self, capacity=200, max_chars=500):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        # Kept apart so a burst of INFO messages cannot push recent problems out
+        self.notable = deque(maxlen=capacity)
+        self.max_chars = max_chars
+        self.counts = Counter()
+
+    def emit(self, record):
+        self.counts[record.levelname] += 1
+        entry = {
+            "level": record.levelname,
+            "timestamp": datetime.datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S"),
+            "message": truncate(record.getMessage(), self.max_chars)
+        }
+        if getattr(record, "step", None):
+            entry["step"] = record.step
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = truncate(value, self.max_chars) if isinstance(value, str) else value
+        self.records.append(entry)
+        if record.levelno >= logging.WARNING:
+            self.notable.append(entry)
+
+
+class RunLog:
+    """Levelled logger with step timings, a ring buffer and an optional rotating log file."""
+
+    def __init__(self, name, log_file=None, retention=200, max_chars=500, max_file_mb=10, backups=5):
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(logging.Formatter("[%(levelname)s] %(asctime)s - %(message)s", "%Y-%m-%d %H:%M:%S"))
+        console.setLevel(logging.INFO)
+        self.logger.addHandler(console)
+
+        self.buffer = RingBufferHandler(retention, max_chars)
+        self.buffer.setLevel(logging.INFO)
+        self.logger.addHandler(self.buffer)
+
+        self.steps = {}
+        self.active_steps = []
+        self.started = time.perf_counter()
+
+        self.log_file = None
+        if log_file:
+            try:
+                log_dir = os.path.dirname(log_file)
+                if log_dir:
+                    os.makedirs(log_dir, exist_ok=True)
+                file_handler = RotatingFileHandler(log_file, maxBytes=int(max_file_mb * 1024 * 1024),
+                                                   backupCount=backups, encoding='utf-8')
+                file_handler.setFormatter(JsonLineFormatter())
+                self.logger.addHandler(file_handler)
+                self.log_file = log_file
+            except OSError as e:
+                self.log(f"Could not open log file {log_file}: {str(e)}", "WARNING")
+
+    def log(self, message, level="INFO", **fields):
+        """Log a message; keyword fields (e.g. stdout=..., returncode=...) are kept as structured data."""
+        if level in ("ERROR", "CRITICAL"):
+            for name in self.active_steps:
+                self.steps[name]["errors"] += 1
+        step = self.active_steps[-1] if self.active_steps else None
+        self.logger.log(logging.getLevelName(level), message, extra={"fields": fields, "step": step})
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Time a named step; errors logged inside it (or a nested step) mark it failed."""
+        entry = self.steps.setdefault(name, {"seconds": 0.0, "runs": 0, "errors": 0, "status": "ok"})
+        entry["runs"] += 1
+        self.active_steps.append(name)
+        started = time.perf_counter()
+        try:
+            yield entry
+        except Exception:
+            entry["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            entry["seconds"] = round(entry["seconds"] + elapsed, 3)
+            if entry["errors"]:
+                entry["status"] = "failed"
+            self.active_steps.pop()
+            self.logger.debug(f"Step {name} finished in {elapsed:.2f}s",
+                              extra={"fields": {"seconds": round(elapsed, 3)}, "step": name})
+
+    def summary(self, recent=20):
+        """Compact, machine-readable summary: counts, step timings and recent warnings/errors."""
+        counts = self.buffer.counts
+        errors = counts["ERROR"] + counts["CRITICAL"]
+        notable = list(self.buffer.notable)
+        return {
+            "success": errors == 0,
+            "errors": errors,
+            "warnings": counts["WARNING"],
+            "total_messages": sum(counts.values()),
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "steps": self.steps,
+            "recent": notable[-recent:],
+            "log_file": self.log_file
+        }
+
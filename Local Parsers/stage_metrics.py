@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import math
+import time
+from collections import defaultdict
+
+# Per-stage timing and throughput instrumentation for process_article.
+#
+# One record is kept per (article, stage) with wall time, CPU time (process
+# wide, so multi-threaded torch inference can exceed wall time), input size
+# and number of items produced.  Records can be streamed to a JSONL file and
+# are summarised as percentiles at the end of a folder run.  With a
+# MemoryTracker each record also carries RSS delta and peak memory.
+
+# Timers that enclose other stages; excluded from the per-stage share
+SPAN_STAGES = ("article", "batch")
+
+
+def input_size(args):
+    """Return (chars, approximate tokens) over the string arguments of a stage."""
+    chars = 0
+    tokens = 0
+    for arg in args:
+        if isinstance(arg, str):
+            chars += len(arg)
+            tokens += arg.count(" ") + arg.count("\n") + 1
+    return chars, tokens
+
+
+def count_items(output):
+    """Return how many items a stage produced."""
+    if isinstance(output, dict):
+        return sum(len(v) if isinstance(v, (list, tuple, set)) else 1 for v in output.values())
+    if isinstance(output, (list, tuple, set)):
+        return len(output)
+    return 0 if output is None else 1
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class StageTimer:
+    """Measures one stage run; use as a context manager and set .output before exit."""
+
+    def __init__(self, metrics, article, stage, args):
+        self.metrics = metrics
+        self.article = article
+        self.stage = stage
+        self.args = args
+        self.output = None
+        self.reused = False
+        self.memory_span = None
+
+    def __enter__(self):
+        if self.metrics.memory is not None:
+            self.memory_span = self.metrics.memory.begin()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        self.memory = None
+        if self.memory_span is not None:
+            self.memory = self.metrics.memory.end(self.memory_span)
+        chars, tokens = input_size(self.args)
+        self.metrics.record(
+            self.article, self.stage, wall, cpu, chars, tokens,
+            count_items(self.output), reused=self.reused, failed=exc_type is not None, memory=self.memory
+        )
+        return False
+
+
+class StageMetrics:
+    """Collects per-stage records and summarises them."""
+
+    def __init__(self, records_path=None, memory=None):
+        # memory is a MemoryTracker; None skips memory accounting
+        self.memory = memory
+        self.records_path = records_path
+        self.records_file = None
+        if records_path:
+            records_dir = os.path.dirname(records_path)
+            if records_dir:
+                os.makedirs(records_dir, exist_ok=True)
+            self.records_file = open(records_path, 'a', encoding='utf-8')
+        self.wall = defaultdict(list)
+        self.cpu = defaultdict(float)
+        self.chars = defaultdict(int)
+        self.items = defaultdict(int)
+        self.reused = defaultdict(int)
+        self.failed = defaultdict(int)
+        self.peak_rss = defaultdict(float)
+        self.rss_delta = defaultdict(list)
+
+    def timer(self, article, stage, args=()):
+        return StageTimer(self, article, stage, args)
+
+    def record(self, article, stage, wall, cpu, chars=0, tokens=0, items=0, reused=False, failed=False,
+               memory=None):
+        self.wall[stage].append(wall)
+        self.cpu[stage] += cpu
+        self.chars[stage] += chars
+        self.items[stage] += items
+        self.reused[stage] += int(reused)
+        self.failed[stage] += int(failed)
+        if memory:
+            self.peak_rss[stage] = max(self.peak_rss[stage], memory.get("peakRssMb") or 0.0)
+            if memory.get("rssDeltaMb") is not None:
+                self.rss_delta[stage].append(memory["rssDeltaMb"])
+        if self.records_file:
+            record = {
+                "article": article,
+                "stage": stage,
+                "wallMs": round(wall * 1000, 3),
+                "cpuMs": round(cpu * 1000, 3),
+                "chars": chars,
+                "tokens": tokens,
+                "items": items,
+                "reused": reused,
+                "failed": failed,
+                "ts": time.time()
+            }
+            if memory:
+                record.update(memory)
+            self.records_file.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        """Return per-stage percentiles, totals and throughput."""
+        article_total = sum(self.wall.get("article", [])) or sum(
+            sum(values) for stage, values in self.wall.items() if stage not in SPAN_STAGES
+        )
+        summary = {}
+        for stage, values in self.wall.items():
+            ordered = sorted(values)
+            total = sum(ordered)
+            summary[stage] = {
+                "count": len(ordered),
+                "p50Ms": round(percentile(ordered, 0.50) * 1000, 3),
+                "p90Ms": round(percentile(ordered, 0.90) * 1000, 3),
+                "p99Ms": round(percentile(ordered, 0.99) * 1000, 3),
+                "maxMs": round(ordered[-1] * 1000, 3),
+                "totalS": round(total, 3),
+                "cpuS": round(self.cpu[stage], 3),
+                "share": round(total / article_total, 4) if article_total and stage not in SPAN_STAGES else None,
+                "charsPerS": round(self.chars[stage] / total) if total else None,
+                "items": self.items[stage],
+                "reused": self.reused[stage],
+                "failed": self.failed[stage]
+            }
+            if stage in self.peak_rss:
+                deltas = sorted(self.rss_delta[stage])
+                summary[stage]["peakRssMb"] = self.peak_rss[stage]
+                summary[stage]["maxRssDeltaMb"] = deltas[-1] if deltas else None
+        return summary
+
+    def print_summary(self, file=sys.stdout):
+        summary = self.summary()
+        if not summary:
+            return
+        with_memory = any("peakRssMb" in s for s in summary.values())
+        print("Stage timings (ms):", file=file)
+        print(f"  {'stage':<16}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'total s':>10}{'cpu s':>9}{'share':>8}"
+              + (f"{'peak MB':>10}{'max +MB':>10}" if with_memory else ""), file=file)
+        ordered = sorted(summary.items(), key=lambda item: (item[0] in SPAN_STAGES, -item[1]["totalS"]))
+        for stage, s in ordered:
+            share = f"{s['share']:.0%}" if s["share"] is not None else ""
+            line = (f"  {stage:<16}{s['count']:>6}{s['p50Ms']:>10.1f}{s['p90Ms']:>10.1f}{s['p99Ms']:>10.1f}"
+                    f"{s['totalS']:>10.2f}{s['cpuS']:>9.2f}{share:>8}")
+            if with_memory and "peakRssMb" in s:
+                delta = s["maxRssDeltaMb"]
+                line += f"{s['peakRssMb']:>10.1f}" + (f"{delta:>+10.1f}" if delta is not None else f"{'':>10}")
+            print(line, file=file)
+
+    def close(self):
+        if self.records_file:
+            self.records_file.close()
+            self.records_file = None
+
+
+def summarise_records(path):
+    """Rebuild a summary from a records JSONL file written by an earlier run."""
+    metrics = StageMetrics()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue
+            metrics.record(r["article"], r["stage"], r["wallMs"] / 1000, r["cpuMs"] / 1000,
+                           r.get("chars", 0), r.get("tokens", 0), r.get("items", 0),
+                           r.get("reused", False), r.get("failed", False),
+                           {key: r[key] for key in ("peakRssMb", "rssDeltaMb") if key in r} or None)
+    return metrics
+
+
+# Main execution
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python stage_metrics.py <metrics.jsonl> [--json]")
+        sys.exit(1)
+
+    metrics = summarise_records(sys.argv[1])
+    if "--json" in sys.argv:
+        print(json.dumps(metrics.summary(), indent=2))
+    else:
+        metrics.print_summary()
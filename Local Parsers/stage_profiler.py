@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+# Sampled profiling of process_article for the extractor CLIs (--profile).
+# Tiered runs enrich articles through process_content on a worker thread, so
+# the function a sampled stack starts from is passed in by the caller.
+#
+# A profiled article gets a stack sampler (a background thread reading the
+# processing thread's frames every few milliseconds) and/or cProfile.  The
+# sampled stacks are written in the collapsed format used by flamegraph.pl,
+# speedscope and inferno, with the running stage inserted as a frame
+# ("[stage spacy_entities]") so time can be attributed per stage.  Only one
+# article in every N is profiled, so the mode can stay on in production.
+
+MODES = ("sample", "cprofile", "both")
+
+
+def frame_label(code):
+    """Collapsed-stack label for a code object; ';' separates frames so it is not allowed."""
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":")
+
+
+def safe_name(name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name)[:120]
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=0.005, root="process_article"):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(frame_label(code))
+            # StageRunner._run holds the stage name; mark it so stacks group by stage
+            if code.co_name == "_run" and "stage_runner" in code.co_filename:
+                stage = frame.f_locals.get("name")
+                if stage:
+                    stack.append(f"[stage {stage}]")
+            if code.co_name == self.root:
+                break
+            frame = frame.f_back
+        if frame is None:
+            # Outside the root function (e.g. between articles)
+            return
+        stack.reverse()
+        self.counts[";".join(stack)] += 1
+        self.samples += 1
+
+
+def write_collapsed(path, counts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(counts.items()):
+            f.write(f"{stack} {count}\n")
+
+
+class ArticleProfile:
+    """Context manager profiling one article; a no-op when the article is not sampled."""
+
+    def __init__(self, profiler, article, enabled, root="process_article"):
+        self.profiler = profiler
+        self.article = article
+        self.enabled = enabled
+        self.root = root
+        self.sampler = None
+        self.cprofile = None
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        mode = self.profiler.mode
+        if mode in ("sample", "both"):
+            self.sampler = StackSampler(threading.get_ident(), self.profiler.interval, self.root)
+            self.sampler.start()
+        if mode in ("cprofile", "both"):
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.enabled:
+            return False
+        elapsed = time.perf_counter() - self.started
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.profiler.finish(self, elapsed)
+        return False
+
+
+class StageProfiler:
+    """Profiles one in every sample_every articles and writes per-article and aggregate profiles.
+
+    Per-article files (<article>.collapsed, <article>.prof) are written under
+    output_dir/articles, only for articles slower than slower_than_ms when
+    set; aggregate.collapsed and aggregate.prof cover every profiled article.
+    """
+
+    def __init__(self, output_dir, sample_every=1, mode="both", interval_ms=5.0, slower_than_ms=None):
+        if mode not in MODES:
+            raise ValueError(f"Profile mode must be one of {', '.join(MODES)}")
+        self.output_dir = output_dir
+        self.sample_every = max(1, int(sample_every))
+        self.mode = mode
+        self.interval = interval_ms / 1000.0
+        self.slower_than = slower_than_ms / 1000.0 if slower_than_ms else None
+        self.seen = 0
+        self.profiled = 0
+        self.kept = 0
+        self.aggregate = Counter()
+        self.aggregate_stats = None
+        if output_dir:
+            os.makedirs(os.path.join(output_dir, "articles"), exist_ok=True)
+
+    def article(self, name, root="process_article"):
+        """Return a context manager that profiles this article if it is sampled.
+
+        root is the function the article's work runs under on the calling
+        thread; sampled stacks start there and samples outside it are dropped.
+        """
+        if not self.output_dir:
+            return ArticleProfile(self, name, False, root)
+        self.seen += 1
+        return ArticleProfile(self, name, (self.seen - 1) % self.sample_every == 0, root)
+
+    def finish(self, profile, elapsed):
+        self.profiled += 1
+        keep = self.slower_than is None or elapsed >= self.slower_than
+        base = os.path.join(self.output_dir, "articles", safe_name(profile.article))
+        if profile.sampler is not None:
+            self.aggregate.update(profile.sampler.counts)
+            if keep:
+                write_collapsed(base + ".collapsed", profile.sampler.counts)
+        if profile.cprofile is not None:
+            profile.cprofile.create_stats()
+            if self.aggregate_stats is None:
+                self.aggregate_stats = pstats.Stats(profile.cprofile)
+            else:
+                self.aggregate_stats.add(profile.cprofile)
+            if keep:
+                profile.cprofile.dump_stats(base + ".prof")
+        if keep:
+            self.kept += 1
+            print(f"  Profiled {profile.article} ({elapsed * 1000:.0f} ms)")
+
+    def close(self):
+        """Write the aggregate profiles and a short report."""
+        if not self.output_dir or not self.profiled:
+            return
+        if self.aggregate:
+            write_collapsed(os.path.join(self.output_dir, "aggregate.collapsed"), self.aggregate)
+        if self.aggregate_stats is not None:
+            self.aggregate_stats.dump_stats(os.path.join(self.output_dir, "aggregate.prof"))
+            with open(os.path.join(self.output_dir, "aggregate_top.txt"), 'w', encoding='utf-8') as f:
+                stats = pstats.Stats(os.path.join(self.output_dir, "aggregate.prof"), stream=f)
+                stats.sort_stats("cumulative").print_stats(40)
+        print(f"Profiles: {self.profiled} of {self.seen} articles profiled, {self.kept} kept, "
+              f"written to {self.output_dir}")
+
+
+def stage_totals(collapsed_path):
+    """Return samples per stage from a collapsed-stack file."""
+    totals = Counter()
+    with open(collapsed_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            stages = re.findall(r'\[stage ([^\]]+)\]', stack)
+            totals[stages[-1] if stages else "(outside stages)"] += int(count)
+    return totals
+
+
+# Main execution
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python stage_profiler.py <aggregate.collapsed>")
+        sys.exit(1)
+
+    totals = stage_totals(sys.argv[1])
+    total = sum(totals.values()) or 1
+    for stage, samples in totals.most_common():
+        print(f"{stage:<24}{samples:>8}{samples / total:>8.0%}")
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import hashlib
+from collections import Counter
+
+from result_cache import content_hash
+
+# Stage-level incremental recomputation for process_article.
+#
+# Every stage is identified by a name and a version string.  Its persisted
+# output is keyed by (name, version, hash of its inputs), so after a change to
+# one extractor only that stage - and any stage consuming its output - misses
+# the store, while spaCy/BERT/BART outputs for unchanged content are reused.
+
+
+def file_digest(path):
+    """Return the SHA-256 of a file's raw bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageRunner:
+    """Runs process_article stages, reusing persisted outputs when version and inputs match."""
+
+    def __init__(self, store=None, metrics=None):
+        # store is a ResultCache (or anything with get/put); None disables reuse
+        self.store = store
+        # metrics is a StageMetrics collecting per-stage timings; None disables timing
+        self.metrics = metrics
+        self.article = None
+        self.reused = Counter()
+        self.computed = Counter()
+
+    def begin_article(self, article):
+        """Set the article that subsequent stage runs are attributed to."""
+        self.article = article
+
+    def run(self, name, version, func, *args, key=None):
+        """Run func(*args) as stage name, or return its stored output.
+
+        key overrides the values hashed as the stage input (defaults to args),
+        e.g. a file digest instead of the file path.
+        """
+        if self.metrics is None:
+            return self._run(name, version, func, args, key)
+        with self.metrics.timer(self.article, name, args) as timer:
+            timer.output = self._run(name, version, func, args, key, timer)
+        return timer.output
+
+    def _run(self, name, version, func, args, key, timer=None):
+        if self.store is None:
+            self.computed[name] += 1
+            return func(*args)
+
+        stage_key = content_hash(name, version, *(args if key is None else key))
+        stored = self.store.get(stage_key)
+        if stored is not None:
+            self.reused[name] += 1
+            if timer is not None:
+                timer.reused = True
+            return stored["output"]
+
+        output = func(*args)
+        self.store.put(stage_key, {"stage": name, "version": version, "output": output})
+        self.computed[name] += 1
+        return output
+
+    def summary(self):
+        """Return per-stage reuse counts."""
+        stages = sorted(set(self.reused) | set(self.computed))
+        return {
+            name: {"reused": self.reused[name], "computed": self.computed[name]}
+            for name in stages
+        }
+
+
+def cache_paths(cache_dir):
+    """Return the (results, stages) sub-directories used under a --cache-dir."""
+    return os.path.join(cache_dir, "results"), os.path.join(cache_dir, "stages")
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import sys
+import json
+import queue
+import argparse
+import threading
+
+from result_writers import read_jsonl
+
+# Two-tier output for the streaming extractor (--tiered).
+#
+# Each article is written twice to the JSONL output under the same source:
+# first a quick record with the pattern-based fields (sentences, charges,
+# money, drugs, victims and the page fields), produced without touching the
+# models, then the full result once spaCy and BART have run.  Records carry
+# "revision" and "complete", so a consumer keeps the highest revision per
+# source and knows the record is final when complete is true.  The model
+# stages run on an EnrichmentWorker thread; the caller keeps all writing.
+
+QUICK_REVISION = 1
+FULL_REVISION = 2
+
+
+class EnrichmentWorker:
+    """Runs enrich(item) for submitted items on one background thread, in order.
+
+    Outcomes are (item, result) pairs, where result is the exception enrich
+    raised if it failed.  At most max_pending items wait; submit() blocks
+    beyond that so the backlog's memory stays bounded.
+    """
+
+    def __init__(self, enrich, max_pending=256):
+        self.enrich = enrich
+        self.pending = queue.Queue(maxsize=max(1, max_pending))
+        self.done = queue.Queue()
+        self.submitted = 0
+        self.thread = threading.Thread(target=self._run, name="enrich", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.done.put(None)
+                return
+            try:
+                outcome = self.enrich(item)
+            except Exception as e:
+                outcome = e
+            self.done.put((item, outcome))
+
+    def submit(self, item):
+        self.submitted += 1
+        self.pending.put(item)
+
+    def finished(self):
+        """Outcomes ready now, without waiting."""
+        outcomes = []
+        while True:
+            try:
+                outcomes.append(self.done.get_nowait())
+            except queue.Empty:
+                return outcomes
+
+    def drain(self):
+        """Stop taking items and yield the remaining outcomes as they finish."""
+        self.pending.put(None)
+        while True:
+            outcome = self.done.get()
+            if outcome is None:
+                break
+            yield outcome
+        self.thread.join()
+
+
+def latest_revisions(path):
+    """The highest revision of every source in a tiered JSONL output, in first-seen order."""
+    latest = {}
+    for record in read_jsonl(path):
+        source = record.get("source")
+        if source is None:
+            continue
+        current = latest.get(source)
+        if current is None or record.get("revision", FULL_REVISION) >= current.get("revision", FULL_REVISION):
+            latest[source] = record
+    return latest
+
+
+# Main execution
+if __name__ == "__main__":
+    # Collapse a tiered output to one record per article, e.g. for consumers reading a snapshot
+    parser = argparse.ArgumentParser(description="Keep the latest revision of each article in a tiered JSONL output")
+    parser.add_argument("input", help="JSONL written by nlp_extractor.py --tiered")
+    parser.add_argument("output", nargs="?", help="JSONL to write (default: print a summary only)")
+    parser.add_argument("--complete-only", action="store_true", help="Leave out articles still being enriched")
+    options = parser.parse_args()
+
+    records = list(latest_revisions(options.input).values())
+    complete = sum(1 for record in records if record.get("complete", True))
+    print(f"{len(records)} articles, {complete} complete, {len(records) - complete} awaiting enrichment",
+          file=sys.stderr)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            for record in records:
+                if options.complete_only and not record.get("complete", True):
+                    continue
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+        print(f"Saved to {options.output}", file=sys.stderr)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+# The scripts in "Local Parsers" import each other by module name, as they
+# do when run from that folder; the models are never loaded under test.
+PARSERS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Local Parsers")
+sys.path.insert(0, PARSERS_DIR)
+os.environ.setdefault("NCA_SKIP_MODEL_LOAD", "1")
+
+
+@pytest.fixture
+def stand_in_models(monkeypatch):
+    """Returns a function installing benchmark.py's stand-in models on nlp_extractor for the test."""
+    import benchmark
+    import nlp_extractor
+
+    def install(latency_ms=0.0):
+        for name in ("nlp", "ner_pipeline", "classifier", "models_loaded"):
+            monkeypatch.setattr(nlp_extractor, name, getattr(nlp_extractor, name, None), raising=False)
+        benchmark.install_stand_ins(nlp_extractor, latency_ms)
+        return nlp_extractor
+
+    return install
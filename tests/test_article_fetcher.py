@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import sqlite3
+import asyncio
+
+import pytest
+
+import article_fetcher
+from article_fetcher import Fetcher, ValidatorStore, run_crawl, start_stand_in, article_filename
+from listing_parser import PAGE_SIZE
+
+
+def publish(site_dir, name, age):
+    """Write a stand-in article published age seconds ago (the listing is newest first)."""
+    path = os.path.join(site_dir, name + ".html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<html><body><h1>{name}</h1><p>Article {name}.</p></body></html>")
+    published = time.time() - age
+    os.utime(path, (published, published))
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A stand-in site with two and a half listing pages of articles; yields (site dir, listing URL)."""
+    site_dir = str(tmp_path / "site")
+    os.makedirs(site_dir)
+    for index in range(PAGE_SIZE * 2 + 5):
+        publish(site_dir, f"article-{index:02d}", 1000 + index)
+    server, listing_url = start_stand_in(site_dir)
+    yield site_dir, listing_url
+    server.shutdown()
+    server.server_close()
+
+
+def crawl(tmp_path, listing_url, seen=False):
+    return run_crawl(listing_url, str(tmp_path / "articles"), str(tmp_path / "fetch.db"),
+                     str(tmp_path / "seen.db") if seen else None)
+
+
+def test_cold_crawl_then_not_modified(tmp_path, site):
+    _, listing_url = site
+    outcomes, cold = crawl(tmp_path, listing_url)
+    assert len(outcomes) == PAGE_SIZE * 2 + 5
+    assert {outcome["outcome"] for outcome in outcomes} == {"fetched"}
+    # Three listing pages, then an empty ?start= page past the end
+    assert cold["fetched"] == len(outcomes) + 4
+    assert all(os.path.exists(outcome["path"]) for outcome in outcomes)
+
+    outcomes, again = crawl(tmp_path, listing_url)
+    assert {outcome["outcome"] for outcome in outcomes} == {"not_modified"}
+    assert again["not_modified"] == len(outcomes) + 4
+    assert (again["fetched"], again["bytesDownloaded"]) == (0, 0)
+    assert again["bytesSaved"] > 0
+
+
+def test_seen_store_stops_at_the_first_page_with_nothing_new(tmp_path, site):
+    site_dir, listing_url = site
+    crawl(tmp_path, listing_url, seen=True)
+    publish(site_dir, "breaking-news", 0)
+    outcomes, summary = crawl(tmp_path, listing_url, seen=True)
+    assert [os.path.basename(outcome["path"]) for outcome in outcomes] == \
+        [article_filename(listing_url.replace("all-news", "breaking-news"))]
+    # Page 1 has the new article, page 2 only seen ones; page 3 is never requested
+    assert summary["requests"] == 2 + 1
+
+    outcomes, summary = crawl(tmp_path, listing_url, seen=True)
+    assert outcomes == []
+    assert summary["requests"] == 1
+
+
+def forget_validators(state_db):
+    """Make the store look like it came from a server without ETag or Last-Modified."""
+    conn = sqlite3.connect(state_db)
+    conn.execute("UPDATE validators SET etag = NULL, last_modified = NULL")
+    conn.commit()
+    conn.close()
+
+
+def test_unchanged_body_is_not_rewritten(tmp_path, site):
+    _, listing_url = site
+    outcomes, _ = crawl(tmp_path, listing_url)
+    kept, processed = outcomes[0]["path"], outcomes[1]["path"]
+    inode = os.stat(kept).st_ino
+    # The extractor has picked one article up and removed it
+    os.remove(processed)
+    forget_validators(str(tmp_path / "fetch.db"))
+
+    outcomes, summary = crawl(tmp_path, listing_url)
+    assert {outcome["outcome"] for outcome in outcomes} == {"unchanged"}
+    assert summary["fetched"] == 0
+    assert os.stat(kept).st_ino == inode
+    assert not os.path.exists(processed)
+    assert outcomes[1]["path"] is None
+
+
+def test_urllib_fallback(tmp_path, site, monkeypatch):
+    _, listing_url = site
+    monkeypatch.setattr(article_fetcher, "aiohttp_available", False)
+    store = ValidatorStore(str(tmp_path / "fetch.db"))
+    url = listing_url.replace("all-news", "article-00")
+    path = str(tmp_path / "articles" / article_filename(url))
+
+    async def fetch_twice():
+        async with Fetcher(str(tmp_path / "articles"), store) as fetcher:
+            assert fetcher.client.name == "urllib"
+            first = await fetcher.fetch(url, path)
+            second = await fetcher.fetch(url, path)
+            missing = await fetcher.fetch(listing_url.replace("all-news", "no-such-article"), path + ".missing")
+            return first, second, missing
+
+    try:
+        first, second, missing = asyncio.run(fetch_twice())
+    finally:
+        store.close()
+    assert first == {"url": url, "outcome": "fetched", "path": path}
+    # urllib raises HTTPError for a 304; the client turns it back into a status
+    assert second["outcome"] == "not_modified"
+    assert missing["outcome"] == "failed"
+    assert missing["error"] == "HTTP 404"
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from article_index import ArticleIndex, parse_date, published_date, normalise_since, normalise_until
+
+RESULTS = [
+    {
+        "source": "cocaine-liverpool.html",
+        "title": "Liverpool dealer jailed for cocaine plot",
+        "content": "A Liverpool man was jailed after officers seized cocaine and heroin hidden in a lorry.",
+        "url": "https://www.nationalcrimeagency.gov.uk/news/cocaine-liverpool",
+        "date": "14 February 2023",
+        "perpetrators": [{"name": "John Smith"}],
+        "locations": ["Liverpool"],
+        "organizations": ["National Crime Agency"],
+        "charges": ["conspiracy to import class A drugs"],
+        "categories": ["Drug trafficking"],
+        "drugQuantities": [{"drug": "cocaine", "quantity": 2, "unit": "kg"}],
+        "processedAt": "2023-02-15T10:00:00"
+    },
+    {
+        "source": "fraud-london.html",
+        "title": "Fraud network dismantled",
+        "content": "A London fraud network that laundered millions was dismantled by the agency.",
+        "timeline": ["3 May 2024", "12 January 2031"],
+        "perpetrators": [{"name": "Rebecca Stone"}],
+        "locations": ["London"],
+        "charges": ["money laundering"],
+        "categories": ["Money laundering"],
+        "processedAt": "2024-05-04T09:00:00"
+    },
+    {
+        "source": "cannabis-liverpool.html",
+        "title": "Cannabis factory found in Liverpool",
+        "content": "Officers found a cannabis factory in a Liverpool warehouse.",
+        "date": "30 April 2024",
+        "locations": ["Liverpool"],
+        "categories": ["Drug trafficking"],
+        "processedAt": "2024-05-01T09:00:00"
+    }
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ArticleIndex(str(tmp_path / "index.db"))
+    for result in RESULTS:
+        index.write(result)
+    index.flush()
+    yield index
+    index.close()
+
+
+def sources(matches):
+    return [match["source"] for match in matches]
+
+
+def test_full_text_search_stems_and_snippets(index):
+    matches = index.query("seize")
+    assert sources(matches) == ["cocaine-liverpool.html"]
+    assert "[seized]" in matches[0]["snippet"]
+    assert sources(index.query("Liverpool AND cannabis")) == ["cannabis-liverpool.html"]
+
+
+def test_entity_filters(index):
+    assert sources(index.query(entities=[("location", "liverpool")])) == \
+        ["cannabis-liverpool.html", "cocaine-liverpool.html"]
+    assert sources(index.query(entities=[("person", "John Smith")])) == ["cocaine-liverpool.html"]
+    # Charges match as a substring; drugs also come from the content
+    assert sources(index.query(entities=[("charge", "import")])) == ["cocaine-liverpool.html"]
+    assert sources(index.query(entities=[("drug", "heroin"), ("location", "Liverpool")])) == \
+        ["cocaine-liverpool.html"]
+    assert index.query(entities=[("location", "Leeds")]) == []
+
+
+def test_full_text_with_entity_and_date_range(index):
+    assert sources(index.query("Liverpool", [("category", "Drug trafficking")], since="2024")) == \
+        ["cannabis-liverpool.html"]
+    assert sources(index.query(until=normalise_until("2024-04"))) == \
+        ["cannabis-liverpool.html", "cocaine-liverpool.html"]
+    assert sources(index.query(since=normalise_since("2024-05"), until=normalise_until("2024"))) == \
+        ["fraud-london.html"]
+
+
+def test_reprocessed_article_replaces_its_entities(index):
+    # Same content (same article id) processed again with different entities
+    index.write(dict(RESULTS[0], locations=["Leeds"], source="cocaine-liverpool-2.html"))
+    index.flush()
+    assert sources(index.query(entities=[("location", "Leeds")])) == ["cocaine-liverpool-2.html"]
+    assert sources(index.query("cocaine")) == ["cocaine-liverpool-2.html"]
+    assert index.stats()["articles"] == 3
+
+
+def test_published_date():
+    assert parse_date("Published March 5th, 2022") == "2022-03-05"
+    assert parse_date("Updated 2021-11-30") == "2021-11-30"
+    assert parse_date("31 February 2020") is None
+    assert published_date(RESULTS[0]) == "2023-02-14"
+    # Timeline dates after processing are ignored
+    assert published_date(RESULTS[1]) == "2024-05-03"
+    assert published_date({"processedAt": "2024-06-01T00:00:00"}) == "2024-06-01"
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024", "2024-12-31"),
+    ("2024-02", "2024-02-29"),
+    ("2023-02", "2023-02-28"),
+    ("2024-04-15", "2024-04-15"),
+    (None, None)
+])
+def test_until_runs_to_the_end_of_the_period(value, expected):
+    assert normalise_until(value) == expected
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+
+import pytest
+
+import nlp_extractor
+from article_workers import SupervisedWorkers, ArticleStopped
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="supervised workers need fork")
+
+# Seconds the stand-in "sentences" stage sleeps, by file name (others are instant)
+DELAYS = {}
+
+
+def stand_in_article(file_path, cache=None, runner=None, dedup=None, gate=None):
+    """Stands in for process_article: a quick content stage, then a sentences stage that may sleep."""
+    name = os.path.basename(file_path)
+    article = runner.run("content", "1", lambda path: {"title": name, "content": "text", "page": {}}, file_path)
+    delay = DELAYS.get(name, 0.0)
+    sentences = runner.run("sentences", "1", lambda text: time.sleep(delay) or ["sentence"], article["content"])
+    return {"title": name, "source": name, "sentences": sentences}
+
+
+def process(file_path, runner):
+    return stand_in_article(file_path, runner=runner)
+
+
+def make_folder(tmp_path, names):
+    folder = tmp_path / "articles"
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_text(f"<html>{name}</html>", encoding="utf-8")
+    return folder
+
+
+def run_all(pool, file_paths, timeout_factor=1.0):
+    try:
+        return dict(pool.run(file_paths, timeout_factor))
+    finally:
+        pool.close()
+
+
+def test_stage_deadline_kills_only_the_stuck_article(tmp_path):
+    folder = make_folder(tmp_path, ["quick.html", "stuck.html"])
+    DELAYS.update({"stuck.html": 30.0})
+    pool = SupervisedWorkers(process, workers=2, article_timeout=20.0, stage_timeout=0.5)
+    started = time.monotonic()
+    outcomes = run_all(pool, [str(folder / "quick.html"), str(folder / "stuck.html")])
+    assert time.monotonic() - started < 10
+    assert outcomes[str(folder / "quick.html")]["sentences"] == ["sentence"]
+    stopped = outcomes[str(folder / "stuck.html")]
+    assert isinstance(stopped, ArticleStopped)
+    assert stopped.stage == "sentences"
+    assert "stage deadline" in str(stopped)
+    # The finished stage's output is handed back for a partial result
+    assert stopped.outputs["content"]["title"] == "stuck.html"
+    assert pool.stopped["stage"] == 1
+
+
+def test_article_deadline_and_longer_retry_deadlines(tmp_path):
+    folder = make_folder(tmp_path, ["slow.html"])
+    DELAYS.update({"slow.html": 0.8})
+    pool = SupervisedWorkers(process, workers=1, article_timeout=0.5, stage_timeout=5.0)
+    try:
+        first = dict(pool.run([str(folder / "slow.html")]))
+        retried = dict(pool.run([str(folder / "slow.html")], timeout_factor=4.0))
+    finally:
+        pool.close()
+    assert isinstance(first[str(folder / "slow.html")], ArticleStopped)
+    assert "article deadline" in str(first[str(folder / "slow.html")])
+    assert retried[str(folder / "slow.html")]["sentences"] == ["sentence"]
+
+
+def test_process_folder_retries_stopped_articles_last_and_keeps_partial_results(tmp_path, monkeypatch):
+    names = ["a-slow.html", "b-stuck.html", "c-quick.html", "d-quick.html"]
+    folder = make_folder(tmp_path, names)
+    # Past the stage deadline once, within it on the retry; past it both times
+    DELAYS.update({"a-slow.html": 0.6, "b-stuck.html": 30.0})
+    monkeypatch.setattr(nlp_extractor, "process_article", stand_in_article)
+    output_file = str(tmp_path / "results.jsonl")
+    nlp_extractor.process_folder(str(folder), output_file, workers=2, article_timeout=60.0, stage_timeout=0.4)
+    with open(output_file, encoding="utf-8") as f:
+        results = [json.loads(line) for line in f]
+    order = [result["source"] for result in results]
+    # The quick articles finish first; the stopped ones follow once retried with longer deadlines
+    assert sorted(order[:2]) == ["c-quick.html", "d-quick.html"]
+    assert sorted(order[2:]) == ["a-slow.html", "b-stuck.html"]
+    by_source = {result["source"]: result for result in results}
+    assert by_source["a-slow.html"]["sentences"] == ["sentence"]
+    partial = by_source["b-stuck.html"]
+    assert partial["complete"] is False
+    assert partial["timedOut"] == "sentences"
+    assert partial["title"] == "b-stuck.html"
+
+
+def test_worker_counters_are_summed_back(tmp_path):
+    folder = make_folder(tmp_path, ["a.html", "b.html", "c.html"])
+    totals = {"articles": 0}
+
+    def counting(file_path, runner):
+        totals["articles"] += 1
+        return process(file_path, runner)
+
+    pool = SupervisedWorkers(counting, workers=2, counters=lambda: dict(totals))
+    run_all(pool, [str(folder / name) for name in ("a.html", "b.html", "c.html")])
+    assert pool.counters["articles"] == 3
+    # The parent's own copy is untouched; process_folder adds pool.counters back in
+    assert totals["articles"] == 0
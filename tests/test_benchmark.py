@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+
+from benchmark import generate_corpus, compare_reports
+
+
+def test_generated_corpus_is_reproducible(tmp_path):
+    first = generate_corpus(str(tmp_path / "a"), articles=3, seed=7)
+    second = generate_corpus(str(tmp_path / "b"), articles=3, seed=7)
+    assert first == second
+    assert len(first["files"]) == 3
+    for entry in first["files"]:
+        path = tmp_path / "a" / entry["file"]
+        assert os.path.getsize(path) == entry["bytes"]
+        assert (tmp_path / "b" / entry["file"]).read_bytes() == path.read_bytes()
+    with open(tmp_path / "a" / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f) == first
+
+
+def report(rate, p50, p99, rss, stage_p50):
+    return {"extractors": {"cpu": {"articlesPerSec": rate, "p50Ms": p50, "p99Ms": p99, "peakRssMb": rss,
+                                   "stages": {"sentences": {"p50Ms": stage_p50}}}}}
+
+
+def test_compare_flags_regressions_beyond_the_threshold():
+    rows = compare_reports(report(100.0, 10.0, 40.0, 500.0, 0.2), report(80.0, 10.5, 60.0, 520.0, 0.4))
+    flagged = {row["metric"]: row["regression"] for row in rows}
+    assert flagged == {
+        "articlesPerSec": True,
+        "p50Ms": False,
+        "p99Ms": True,
+        "peakRssMb": False,
+        # Doubled, but both below the 1 ms noise floor
+        "stages.sentences.p50Ms": False
+    }
+    assert next(row for row in rows if row["metric"] == "articlesPerSec")["change"] == -0.2
+
+
+def test_compare_skips_failed_or_missing_extractors():
+    failed = {"extractors": {"cpu": {"error": "model missing"}}}
+    assert compare_reports(report(100.0, 10.0, 40.0, 500.0, 2.0), failed) == []
+    assert compare_reports(report(100.0, 10.0, 40.0, 500.0, 2.0), {"extractors": {}}) == []
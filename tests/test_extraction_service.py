@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from extraction_service import MicroBatcher
+
+
+def upper_batch(inputs, options):
+    if any(item == "bad" for item in inputs):
+        raise ValueError("bad input")
+    return [item.upper() for item in inputs]
+
+
+def submit_together(batcher, items):
+    """Submit items from separate threads so they share a batch; returns outputs or exceptions by item."""
+    outcomes = {}
+    barrier = threading.Barrier(len(items))
+
+    def call(item):
+        barrier.wait()
+        try:
+            outcomes[item] = batcher.submit(item, {})
+        except Exception as e:
+            outcomes[item] = e
+
+    threads = [threading.Thread(target=call, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_failed_batch_falls_back_to_single_calls():
+    batcher = MicroBatcher("test", upper_batch, max_batch=8, max_wait_ms=200)
+    outcomes = submit_together(batcher, ["a", "bad", "c"])
+    assert outcomes["a"] == "A"
+    assert outcomes["c"] == "C"
+    assert isinstance(outcomes["bad"], ValueError)
+    assert batcher.stats()["fallbacks"] >= 1
+
+
+def test_single_failing_call_raises():
+    batcher = MicroBatcher("test", upper_batch, max_batch=8, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.submit("bad", {})
+    assert batcher.submit("ok", {}) == "OK"
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from folder_watcher import FolderWatcher
+
+
+def make_watcher(folder, **kwargs):
+    options = dict(settle_seconds=0.05, max_wait_seconds=5.0, poll_interval=0.05, idle_exit_seconds=0.3,
+                   open_timeout_seconds=0.2, use_inotify=False)
+    options.update(kwargs)
+    return FolderWatcher(str(folder), **options)
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_empty_file_is_skipped_and_idle_exit_still_fires(tmp_path):
+    write(tmp_path / "a.html", "<html>a</html>")
+    write(tmp_path / "empty.html", "")
+    watcher = make_watcher(tmp_path)
+    started = time.monotonic()
+    batches = list(watcher.batches())
+    assert batches == [[str(tmp_path / "a.html")]]
+    # The batch did not wait out max_wait for the empty file to settle
+    assert time.monotonic() - started < 2.0
+    assert str(tmp_path / "empty.html") in watcher.skipped
+    assert not watcher.pending
+
+
+def test_skipped_empty_file_is_picked_up_once_written(tmp_path):
+    empty = tmp_path / "late.html"
+    write(empty, "")
+    watcher = make_watcher(tmp_path)
+    watcher.rescan(0.0)
+    assert watcher.ready(1.0) == []
+    assert str(empty) in watcher.skipped
+    write(empty, "<html>late</html>")
+    watcher.touch("late.html", 2.0)
+    assert watcher.ready(3.0) == [str(empty)]
+
+
+def test_prune_forgets_files_that_left_the_folder(tmp_path):
+    kept = tmp_path / "kept.html"
+    gone = tmp_path / "gone.html"
+    write(kept, "<html>kept</html>")
+    write(gone, "<html>gone</html>")
+    watcher = make_watcher(tmp_path)
+    assert sorted(path for batch in watcher.batches() for path in batch) == sorted([str(gone), str(kept)])
+    os.remove(gone)
+    watcher.prune(time.monotonic())
+    assert list(watcher.handed_out) == [str(kept)]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+
+import pytest
+
+import full_article_parser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "full_article")
+
+# Fields the Python port must reproduce exactly; victims comes from the JS
+# extractPeople(content, 'victim') since processFolder never writes it
+PARITY_FIELDS = ("url", "intro", "date", "imageUrl", "victims", "categories")
+
+# Pages with unclosed paragraphs and stray end tags, which html.parser nests
+# differently from cheerio's HTML5 parser
+BROKEN_MARKUP = {"05-modern-slavery-bristol.html"}
+
+PARSERS = ["html.parser"] + (["html5lib"] if full_article_parser.html5lib_available else [])
+
+
+def load_expected():
+    with open(os.path.join(FIXTURES, "report.json"), encoding="utf-8") as f:
+        return {report["source"]: report for report in json.load(f)}
+
+
+EXPECTED = load_expected()
+
+
+@pytest.fixture(scope="module", params=PARSERS)
+def reports(request, tmp_path_factory):
+    """(parser, reports by source) for each available HTML parser."""
+    output_folder = tmp_path_factory.mktemp("reports")
+    reports, output_path = full_article_parser.process_folder(FIXTURES, str(output_folder), request.param)
+    assert os.path.exists(output_path)
+    return request.param, {report["source"]: report for report in reports}
+
+
+def expect_parity(request, parser, source):
+    if parser == "html.parser" and source in BROKEN_MARKUP:
+        request.applymarker(pytest.mark.xfail(strict=True, reason="html.parser nests unclosed <p> elements"))
+
+
+def test_every_fixture_is_processed(reports):
+    _, by_source = reports
+    assert sorted(by_source) == sorted(EXPECTED)
+
+
+@pytest.mark.parametrize("source", sorted(EXPECTED))
+def test_fields_match_js_parser(request, reports, source):
+    parser, by_source = reports
+    expect_parity(request, parser, source)
+    assert {field: by_source[source][field] for field in PARITY_FIELDS + ("title",)} == \
+        {field: EXPECTED[source][field] for field in PARITY_FIELDS + ("title",)}
+
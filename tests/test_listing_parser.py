@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from listing_parser import SeenStore, parse_listing, next_page_url, BASE_URL
+
+ITEM = """
+<div class="item column-1">
+  <div class="pull-left item-image"><a href="{link}"><img src="/images/{slug}.jpg"></a></div>
+  <div class="page-header"><h3><a href="{link}">  {title}
+  </a></h3></div>
+  <div class="intro-date">{date}</div>
+  <div class="intro-text"><p>{intro}</p></div>
+  <div class="tags"><a>{category}</a></div>
+</div>
+"""
+
+
+def listing(*items):
+    return '<html><body><div class="items-row">' + "".join(ITEM.format(**item) for item in items) + \
+           '</div></body></html>'
+
+
+JAILED = {"link": "/news/dealer-jailed", "slug": "dealer", "title": "Dealer jailed", "date": "22 September 2019",
+          "intro": "A drug dealer   has been jailed.", "category": "Drug trafficking"}
+CHARGED = {"link": "https://www.nationalcrimeagency.gov.uk/news/men-charged", "slug": "charged",
+           "title": "Men charged", "date": "23 September 2019", "intro": "Two men were charged.",
+           "category": "Firearms"}
+
+
+def test_parse_listing_reads_every_item():
+    articles = parse_listing(listing(JAILED, CHARGED))
+    assert articles[0] == {
+        "title": "Dealer jailed",
+        "url": BASE_URL + "/news/dealer-jailed",
+        "intro": "A drug dealer has been jailed.",
+        "date": "22 September 2019",
+        "imageUrl": BASE_URL + "/images/dealer.jpg",
+        "category": "Drug trafficking"
+    }
+    assert articles[1]["url"] == CHARGED["link"]
+    assert articles[1]["category"] == "Firearms"
+
+
+def test_items_without_title_are_skipped():
+    assert parse_listing('<div class="items-row"><div class="item column-1"><p>No link</p></div></div>') == []
+
+
+def test_next_page_url_advances_start():
+    page = BASE_URL + "/news/all-news?start=10"
+    assert next_page_url(listing(JAILED), page) == BASE_URL + "/news/all-news?start=20"
+    assert next_page_url("<html><body></body></html>", page) is None
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SeenStore(str(tmp_path / "seen.db"))
+    yield store
+    store.close()
+
+
+def test_diff_reports_new_then_only_changed_articles(store):
+    articles = parse_listing(listing(JAILED, CHARGED))
+    assert [article["listingStatus"] for article in store.diff(articles)] == ["new", "new"]
+    store.mark_seen(articles)
+    assert store.diff(articles) == []
+    assert store.count() == 2
+    changed = parse_listing(listing(dict(JAILED, intro="A drug dealer has been jailed for ten years."), CHARGED))
+    fresh = store.diff(changed)
+    assert [(article["url"], article["listingStatus"]) for article in fresh] == \
+        [(BASE_URL + "/news/dealer-jailed", "changed")]
+    store.mark_seen(fresh)
+    assert store.diff(changed) == []
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import sys
+import tracemalloc
+
+import pytest
+
+from memory_metrics import MemoryTracker
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs /proc/self/status")
+def test_outer_peak_keeps_what_it_reached_before_an_inner_span():
+    tracker = MemoryTracker(use_tracemalloc=True)
+    outer = tracker.begin()
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b"x" * len(block[::4096])
+    del block
+    inner = tracker.begin()
+    inner_memory = tracker.end(inner)
+    outer_memory = tracker.end(outer)
+    tracemalloc.stop()
+    assert outer_memory["tracedPeakMb"] >= 64
+    assert inner_memory["tracedPeakMb"] < 64
+    assert outer_memory["peakRssMb"] >= inner_memory["peakRssMb"]
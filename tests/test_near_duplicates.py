@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from near_duplicates import NearDuplicateIndex, lsh_params, shingles, minhash, similarity, NUM_PERM
+
+BASE = ("A man from Leeds has been jailed for eight years after National Crime Agency officers found "
+        "two kilos of cocaine hidden in a lorry at Dover. He pleaded guilty to importing class A drugs "
+        "at Canterbury Crown Court and was sentenced on Friday. Investigators traced the shipment to an "
+        "organised crime group operating across the north of England and seized cash and phones.")
+REPUBLISHED = BASE + " The NCA said the sentence sends a clear message."
+UNRELATED = ("The agency has published its annual report and accounts, setting out how its budget was "
+             "spent on training, recruitment and new offices during the last financial year.")
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.85, 0.95])
+def test_lsh_candidate_threshold_does_not_exceed_the_threshold(threshold):
+    bands, rows = lsh_params(threshold)
+    assert bands * rows == NUM_PERM
+    assert (1.0 / bands) ** (1.0 / rows) <= threshold
+
+
+def test_lsh_params_pick_the_highest_banding_below_the_threshold():
+    # 8 bands of 16 would start at 0.88; 16 bands of 8 start at 0.71
+    assert lsh_params(0.85) == (16, 8)
+    # Nothing is below an impossible threshold: fall back to the lowest candidate threshold
+    assert lsh_params(0.0) == (NUM_PERM, 1)
+
+
+def test_shingles_and_signature_similarity():
+    assert shingles("One two three", size=5) == {"one two three"}
+    assert shingles("") == set()
+    same = minhash(shingles(BASE))
+    assert similarity(same, minhash(shingles(BASE))) == 1.0
+    assert similarity(same, minhash(shingles(UNRELATED))) < 0.2
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.db"), threshold=0.8)
+    yield index
+    index.close()
+
+
+def test_near_duplicate_reuses_the_stored_result(index):
+    match, signature = index.find(BASE, "v1")
+    assert match is None
+    index.add(signature, "first.html", "v1", {"title": "Jailed", "content": BASE, "charges": ["importing"]})
+    match, _ = index.find(REPUBLISHED, "v1")
+    assert match["source"] == "first.html"
+    assert match["similarity"] >= 0.8
+    # The content is not stored with the result
+    assert match["result"] == {"title": "Jailed", "charges": ["importing"]}
+    assert (index.checked, index.matched) == (2, 1)
+
+
+def test_different_article_or_version_does_not_match(index):
+    _, signature = index.find(BASE, "v1")
+    index.add(signature, "first.html", "v1", {"title": "Jailed"})
+    assert index.find(UNRELATED, "v1")[0] is None
+    assert index.find(BASE, "v2")[0] is None
+
+
+def test_index_survives_a_new_threshold(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    index = NearDuplicateIndex(path, threshold=0.8)
+    _, signature = index.find(BASE, "v1")
+    index.add(signature, "first.html", "v1", {"title": "Jailed"})
+    index.close()
+    rebanded = NearDuplicateIndex(path, threshold=0.6)
+    try:
+        assert rebanded.size() == 1
+        assert rebanded.find(REPUBLISHED, "v1")[0]["source"] == "first.html"
+    finally:
+        rebanded.close()
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, num_perm=64)
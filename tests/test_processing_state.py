@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from processing_state import ProcessingState, PENDING, PROCESSING, DONE, FAILED, TIMED_OUT
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = ProcessingState(str(tmp_path / "state" / "processing.db"))
+    yield state
+    state.close()
+
+
+def write_article(folder, name, body):
+    path = folder / name
+    path.write_text(f'<html><head><link rel="canonical" href="https://www.nationalcrimeagency.gov.uk/news/{body}">'
+                    f'</head><body><p>{body}</p></body></html>', encoding="utf-8")
+    return str(path)
+
+
+def test_new_article_is_pending_and_keeps_its_status(state, tmp_path):
+    path = write_article(tmp_path, "a.html", "first")
+    content_hash, status = state.register(path)
+    assert status == PENDING
+    state.mark_processing(content_hash)
+    assert state.register(path) == (content_hash, PROCESSING)
+
+
+def test_processing_to_done_records_attempt_and_output(state, tmp_path):
+    content_hash, _ = state.register(write_article(tmp_path, "a.html", "first"))
+    state.mark_processing(content_hash)
+    state.mark_done(content_hash, output_path="out/a.json", duration=1.5)
+    row = state.get(content_hash)
+    assert row["status"] == DONE
+    assert row["attempts"] == 1
+    assert row["output_path"] == "out/a.json"
+    assert row["duration_seconds"] == 1.5
+    assert row["error"] is None
+
+
+def test_failed_and_timed_out_are_retried(state, tmp_path):
+    failed, _ = state.register(write_article(tmp_path, "a.html", "first"))
+    stopped, _ = state.register(write_article(tmp_path, "b.html", "second"))
+    state.mark_processing(failed)
+    state.mark_failed(failed, ValueError("bad page"))
+    state.mark_processing(stopped)
+    state.mark_timed_out(stopped, "stage deadline")
+    assert state.get(failed)["status"] == FAILED
+    assert state.get(failed)["error"] == "bad page"
+    assert state.get(stopped)["status"] == TIMED_OUT
+    # A retry clears the error and counts another attempt
+    state.mark_processing(failed)
+    row = state.get(failed)
+    assert (row["status"], row["attempts"], row["error"]) == (PROCESSING, 2, None)
+
+
+def test_reset_stale_and_backlog(state, tmp_path):
+    hashes = [state.register(write_article(tmp_path, f"{i}.html", f"article-{i}"))[0] for i in range(4)]
+    state.mark_processing(hashes[0])
+    state.mark_done(hashes[0], duration=2.0)
+    state.mark_processing(hashes[1])
+    state.mark_failed(hashes[1], "boom")
+    state.mark_processing(hashes[2])
+    assert state.reset_stale() == 1
+    summary = state.backlog()
+    assert summary["counts"] == {PENDING: 2, PROCESSING: 0, DONE: 1, FAILED: 1, TIMED_OUT: 0}
+    assert summary["backlog"] == 3
+    assert summary["total"] == 4
+    assert summary["avgDurationSeconds"] == 2.0
+
+
+def test_same_content_under_several_names(state, tmp_path):
+    first = write_article(tmp_path, "2024-01-01-a.html", "same")
+    second = write_article(tmp_path, "2024-01-02-a.html", "same")
+    content_hash, _ = state.register(first)
+    state.mark_processing(content_hash)
+    state.mark_done(content_hash)
+    assert state.register(second) == (content_hash, DONE)
+    assert state.find_by_file_name("2024-01-01-a.html")["content_hash"] == content_hash
+    assert state.find_by_file_name("2024-01-02-a.html")["content_hash"] == content_hash
+    assert state.find_by_file(first)["status"] == DONE
+    assert state.find_by_file_name("missing.html") is None
+    assert len(state.articles()) == 1
+    assert state.get(content_hash)["url"] == "https://www.nationalcrimeagency.gov.uk/news/same"
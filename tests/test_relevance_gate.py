@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from relevance_gate import RelevanceGate, keyword_pattern, DEFAULT_MIN_SCORE, STRONG_WEIGHT, CATEGORY_WEIGHT
+
+
+def test_keywords_match_whole_words_only():
+    pattern = keyword_pattern(["gun", "dealer", "arrest"])
+    text = "Gunnar visited the dealership, arrestingly"
+    assert [match.group(1) for match in pattern.finditer(text)] == []
+
+
+def test_keywords_match_their_plural():
+    pattern = keyword_pattern(["gun", "dealer"])
+    assert [match.group(1).lower() for match in pattern.finditer("Guns seized from dealers")] == ["gun", "dealer"]
+
+
+def test_distinct_keywords_are_scored_once_by_weight():
+    gate = RelevanceGate()
+    score, hits = gate.score("Dealer jailed", "The dealer was jailed for supplying cocaine and heroin.")
+    assert hits == ["cocaine", "dealer", "heroin", "jailed"]
+    assert score == 2 * STRONG_WEIGHT + 2 * CATEGORY_WEIGHT
+
+
+def test_one_indicator_sentencing_article_gets_the_full_pipeline():
+    gate = RelevanceGate()
+    title = "Man sentenced at Crown Court"
+    content = "A 42-year-old man from Leeds was sentenced to six years at Leeds Crown Court on Friday."
+    assert gate.score(title, content) == (STRONG_WEIGHT, ["sentenced"])
+    assert gate.check(title, content) == (True, STRONG_WEIGHT)
+    assert gate.gated == 0
+
+
+def test_corporate_news_is_gated():
+    gate = RelevanceGate()
+    relevant, score = gate.check("NCA annual report published",
+                                 "The agency has published its annual report and accounts for the year.")
+    assert not relevant
+    assert score < DEFAULT_MIN_SCORE
+    assert (gate.checked, gate.gated) == (1, 1)
+
+
+def test_min_score_and_time_saved():
+    gate = RelevanceGate(min_score=STRONG_WEIGHT + 1)
+    assert gate.check("Man sentenced", "He was sentenced on Friday.") == (False, STRONG_WEIGHT)
+    gate.record_full(2.0)
+    gate.record_light(0.5)
+    assert gate.stats() == {"checked": 1, "gated": 1, "minScore": STRONG_WEIGHT + 1, "secondsSaved": 1.5}
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import benchmark
+from result_cache import ResultCache, content_hash
+
+
+def age(cache, key, seconds):
+    path = cache._path(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_content_hash_is_stable_and_ordered():
+    assert content_hash("a", {"y": 1, "x": 2}) == content_hash("a", {"x": 2, "y": 1})
+    assert content_hash("a", "b") != content_hash("b", "a")
+    # Parts are separated, so shifting text between them changes the key
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+
+
+def test_hits_misses_and_stats(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    key = content_hash("article")
+    assert cache.get(key) is None
+    cache.put(key, {"title": "Jailed"})
+    assert cache.get(key) == {"title": "Jailed"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (1, 1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert os.path.exists(os.path.join(str(tmp_path / "results"), key[:2], key + ".json"))
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"), max_age_days=1)
+    key = content_hash("old")
+    cache.put(key, {"title": "Old"})
+    age(cache, key, 2 * 86400)
+    assert cache.get(key) is None
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    keys = [content_hash(f"article {i}") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, {"content": "x" * 1000})
+        age(cache, key, 100 - i)
+    # Reading the oldest entry makes it the most recently used
+    cache.get(keys[0])
+    cache.max_bytes = cache.stats()["bytes"] - 1
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+
+def test_stats_accumulate_across_runs(tmp_path):
+    for _ in range(2):
+        cache = ResultCache(str(tmp_path / "results"))
+        cache.get(content_hash("missing"))
+        cache.put(content_hash("present"), {})
+        cache.get(content_hash("present"))
+        totals = cache.save_stats()
+    assert (totals["runs"], totals["hits"], totals["misses"], totals["writes"]) == (2, 2, 2, 2)
+    assert totals["hit_rate"] == 0.5
+
+
+def test_whole_article_hit_skips_the_models(tmp_path, stand_in_models):
+    nlp_extractor = stand_in_models()
+    corpus = str(tmp_path / "corpus")
+    benchmark.generate_corpus(corpus, articles=1, seed=5)
+    file_path = os.path.join(corpus, sorted(os.listdir(corpus))[0])
+    cache = ResultCache(str(tmp_path / "results"))
+    first = nlp_extractor.process_article(file_path, cache)
+    calls = (nlp_extractor.nlp.calls, nlp_extractor.classifier.calls)
+    assert calls[0] > 0
+    second = nlp_extractor.process_article(file_path, cache)
+    assert (nlp_extractor.nlp.calls, nlp_extractor.classifier.calls) == calls
+    assert cache.hits == 1
+    assert dict(second, processedAt=None) == dict(first, processedAt=None)
+
+
+def test_cache_key_ignores_whitespace_but_not_versions(monkeypatch):
+    import nlp_extractor
+    key = nlp_extractor.article_cache_key("Dealer jailed", "A dealer was jailed.\n\n  He appealed.")
+    assert nlp_extractor.article_cache_key("Dealer  jailed ", "A dealer was jailed. He appealed.") == key
+    monkeypatch.setitem(nlp_extractor.STAGE_VERSIONS, "charges", "2")
+    assert nlp_extractor.article_cache_key("Dealer jailed", "A dealer was jailed. He appealed.") != key
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import json
+
+from result_writers import JsonlWriter, read_jsonl, is_streaming_output
+
+
+def write_raw(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_torn_last_line_is_truncated_before_appending(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    write_raw(path, '{"source":"a.html"}\n{"source":"b.html"}\n{"source":"c.ht')
+    writer = JsonlWriter(path)
+    writer.write({"source": "d.html"})
+    writer.close()
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == '{"source":"a.html"}\n{"source":"b.html"}\n{"source":"d.html"}\n'
+
+
+def test_torn_only_line_leaves_an_empty_file(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    write_raw(path, '{"source":"a.ht')
+    JsonlWriter(path).close()
+    assert (tmp_path / "results.jsonl").read_text(encoding='utf-8') == ""
+
+
+def test_complete_file_is_left_alone(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    write_raw(path, '{"source":"a.html"}\n')
+    JsonlWriter(path).close()
+    assert (tmp_path / "results.jsonl").read_text(encoding='utf-8') == '{"source":"a.html"}\n'
+
+
+def test_read_jsonl_skips_torn_line_and_bad_records(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    write_raw(path, '{"source":"a.html"}\nnot json\n\n{"source":"b.html"}\n{"source":"c.ht')
+    assert [record["source"] for record in read_jsonl(path)] == ["a.html", "b.html"]
+
+
+def test_completed_sources_leave_out_errors_and_quick_records(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    records = [
+        {"source": "done.html"},
+        {"source": "failed.html", "error": "boom"},
+        {"source": "quick.html", "complete": False},
+        {"source": "enriched.html", "complete": False},
+        {"source": "enriched.html", "complete": True}
+    ]
+    write_raw(path, "".join(json.dumps(record) + "\n" for record in records))
+    writer = JsonlWriter(path)
+    try:
+        assert writer.completed_sources() == {"done.html", "enriched.html"}
+    finally:
+        writer.close()
+
+
+def test_is_streaming_output():
+    assert is_streaming_output("out/results.jsonl")
+    assert not is_streaming_output("out/results.json")
+    assert not is_streaming_output(None)
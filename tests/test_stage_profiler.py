@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import os
+
+import nlp_extractor
+import benchmark
+from stage_profiler import StageProfiler, stage_totals
+
+
+def profiled_run(tmp_path, tiered):
+    corpus = str(tmp_path / "corpus")
+    benchmark.generate_corpus(corpus, articles=2, paragraphs=(4, 4), seed=3)
+    profile_dir = str(tmp_path / "profiles")
+    profiler = StageProfiler(profile_dir, mode="sample", interval_ms=1.0)
+    nlp_extractor.process_folder(corpus, str(tmp_path / "results.jsonl"), profiler=profiler, tiered=tiered)
+    return profile_dir
+
+
+def test_tiered_run_samples_the_enrichment_thread(tmp_path, stand_in_models):
+    stand_in_models(latency_ms=20.0)
+    profile_dir = profiled_run(tmp_path, tiered=True)
+    aggregate = os.path.join(profile_dir, "aggregate.collapsed")
+    assert os.path.getsize(aggregate) > 0
+    with open(aggregate, encoding="utf-8") as f:
+        assert all(line.startswith("process_content ") for line in f)
+    articles = os.listdir(os.path.join(profile_dir, "articles"))
+    assert len(articles) == 2
+    assert all(os.path.getsize(os.path.join(profile_dir, "articles", name)) > 0 for name in articles)
+    # The model stages show up by name
+    assert set(stage_totals(aggregate)) - {"(outside stages)"}
+
+
+def test_untiered_run_samples_from_process_article(tmp_path, stand_in_models):
+    stand_in_models(latency_ms=20.0)
+    profile_dir = profiled_run(tmp_path, tiered=False)
+    with open(os.path.join(profile_dir, "aggregate.collapsed"), encoding="utf-8") as f:
+        lines = f.readlines()
+    assert lines
+    assert all(line.startswith("process_article ") for line in lines)
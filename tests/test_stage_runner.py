@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import os
+
+import benchmark
+from result_cache import ResultCache
+from stage_runner import StageRunner, file_digest
+
+
+def counting(calls):
+    def func(text):
+        calls.append(text)
+        return text.upper()
+    return func
+
+
+def test_stage_output_is_reused_until_its_version_changes(tmp_path):
+    store = ResultCache(str(tmp_path / "stages"))
+    calls = []
+    runner = StageRunner(store)
+    assert runner.run("charges", "1", counting(calls), "text") == "TEXT"
+    assert StageRunner(store).run("charges", "1", counting(calls), "text") == "TEXT"
+    assert calls == ["text"]
+    StageRunner(store).run("charges", "2", counting(calls), "text")
+    StageRunner(store).run("charges", "2", counting(calls), "other text")
+    assert calls == ["text", "text", "other text"]
+
+
+def test_key_overrides_the_hashed_inputs(tmp_path):
+    runner = StageRunner(ResultCache(str(tmp_path / "stages")))
+    calls = []
+    runner.run("content", "1", counting(calls), "a.html", key=("same digest",))
+    assert runner.run("content", "1", counting(calls), "b.html", key=("same digest",)) == "A.HTML"
+    assert calls == ["a.html"]
+    assert runner.summary() == {"content": {"reused": 1, "computed": 1}}
+
+
+def test_without_a_store_every_stage_runs():
+    runner = StageRunner()
+    calls = []
+    runner.run("charges", "1", counting(calls), "text")
+    runner.run("charges", "1", counting(calls), "text")
+    assert calls == ["text", "text"]
+    assert runner.summary() == {"charges": {"reused": 0, "computed": 2}}
+
+
+def test_file_digest_follows_content_not_name(tmp_path):
+    (tmp_path / "a.html").write_bytes(b"<html>same</html>")
+    (tmp_path / "b.html").write_bytes(b"<html>same</html>")
+    (tmp_path / "c.html").write_bytes(b"<html>other</html>")
+    assert file_digest(str(tmp_path / "a.html")) == file_digest(str(tmp_path / "b.html"))
+    assert file_digest(str(tmp_path / "a.html")) != file_digest(str(tmp_path / "c.html"))
+
+
+def test_version_bump_recomputes_only_that_stage(tmp_path, stand_in_models, monkeypatch):
+    nlp_extractor = stand_in_models()
+    corpus = str(tmp_path / "corpus")
+    benchmark.generate_corpus(corpus, articles=1, seed=5)
+    file_path = os.path.join(corpus, sorted(os.listdir(corpus))[0])
+    store = ResultCache(str(tmp_path / "stages"))
+    nlp_extractor.process_article(file_path, runner=StageRunner(store))
+    spacy_calls = nlp_extractor.nlp.calls
+
+    monkeypatch.setitem(nlp_extractor.STAGE_VERSIONS, "categories", "2")
+    runner = StageRunner(store)
+    nlp_extractor.process_article(file_path, runner=runner)
+    summary = runner.summary()
+    assert summary.pop("categories") == {"reused": 0, "computed": 1}
+    assert all(counts == {"reused": 1, "computed": 0} for counts in summary.values())
+    # spaCy's output came from the store
+    assert nlp_extractor.nlp.calls == spacy_calls
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import json
+
+from tiered_output import latest_revisions, QUICK_REVISION, FULL_REVISION
+
+
+def test_latest_revision_of_each_source_in_first_seen_order(tmp_path):
+    path = tmp_path / "results.jsonl"
+    records = [
+        {"source": "a.html", "revision": QUICK_REVISION, "complete": False},
+        {"source": "b.html", "revision": QUICK_REVISION, "complete": False},
+        {"source": "a.html", "revision": FULL_REVISION, "complete": True},
+        {"error": "no source"},
+        {"source": "c.html"}
+    ]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    latest = latest_revisions(str(path))
+    assert list(latest) == ["a.html", "b.html", "c.html"]
+    assert latest["a.html"]["complete"] is True
+    assert latest["b.html"]["revision"] == QUICK_REVISION
+    # Records from an untiered run count as full
+    assert latest["c.html"] == {"source": "c.html"}
+
+
+def test_late_quick_record_does_not_replace_a_full_one(tmp_path):
+    path = tmp_path / "results.jsonl"
+    records = [
+        {"source": "a.html", "revision": FULL_REVISION, "title": "full"},
+        {"source": "a.html", "revision": QUICK_REVISION, "title": "quick"}
+    ]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + '{"source": "a.ht',
+                    encoding="utf-8")
+    assert latest_revisions(str(path))["a.html"]["title"] == "full"